@@ -0,0 +1,65 @@
+# Measures the per-step latency of a craftium environment with the different transports of the
+# Python<->Luanti channel ("tcp", "unix" and "shm") at several observation resolutions.
+#
+# Usage example:
+#   python benchmarks/channel_latency.py --env-id Craftium/ChopTree-v0 --resolutions 64x64 320x180
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import numpy as np
+import tyro
+
+import craftium
+
+
+@dataclass
+class Args:
+    env_id: str = "Craftium/Room-v0"
+    """the id of the environment to benchmark"""
+    transports: list[str] = field(default_factory=lambda: ["tcp", "unix", "shm"])
+    """transports to compare (tcp, unix and/or shm)"""
+    resolutions: list[str] = field(default_factory=lambda: ["64x64", "320x180"])
+    """observation resolutions to measure, as WIDTHxHEIGHT"""
+    num_steps: int = 1000
+    """number of steps to measure"""
+    warmup_steps: int = 50
+    """number of steps to run before starting to measure"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environment and the sampled actions"""
+
+
+def benchmark(transport, width, height, args):
+    env = gym.make(args.env_id, run_dir_prefix=args.mt_wd, obs_width=width, obs_height=height,
+                   transport=transport)
+    env.action_space.seed(args.seed)
+
+    env.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        env.step(env.action_space.sample())
+
+    latencies = np.empty(args.num_steps)
+    for t in range(args.num_steps):
+        start = time.perf_counter()
+        env.step(env.action_space.sample())
+        latencies[t] = time.perf_counter() - start
+
+    env.close()
+
+    return 1000 * latencies
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'resolution':<12}{'transport':<12}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for resolution in args.resolutions:
+        width, height = map(int, resolution.split("x"))
+        for transport in args.transports:
+            lat = benchmark(transport, width, height, args)
+            print(f"{resolution:<12}{transport:<12}{lat.mean():>10.3f}{np.median(lat):>10.3f}"
+                  f"{np.percentile(lat, 99):>10.3f}", flush=True)
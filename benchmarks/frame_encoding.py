@@ -0,0 +1,70 @@
+# Compares the "raw" and "delta" frame encodings of the Python<->Luanti channel: per-step latency
+# and average size of the messages sent by Luanti, at several observation resolutions.
+#
+# Usage example:
+#   python benchmarks/frame_encoding.py --env-id Craftium/OpenWorld-v0 --resolutions 320x180 640x360
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import numpy as np
+import tyro
+
+import craftium
+
+
+@dataclass
+class Args:
+    env_id: str = "Craftium/OpenWorld-v0"
+    """the id of the environment to benchmark"""
+    encodings: list[str] = field(default_factory=lambda: ["raw", "delta"])
+    """frame encodings to compare (raw and/or delta)"""
+    resolutions: list[str] = field(default_factory=lambda: ["320x180", "640x360"])
+    """observation resolutions to measure, as WIDTHxHEIGHT"""
+    transport: str = "tcp"
+    """transport of the channel (tcp or unix)"""
+    num_steps: int = 1000
+    """number of steps to measure"""
+    warmup_steps: int = 50
+    """number of steps to run before starting to measure"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environment and the sampled actions"""
+
+
+def benchmark(encoding, width, height, args):
+    env = gym.make(args.env_id, run_dir_prefix=args.mt_wd, obs_width=width, obs_height=height,
+                   transport=args.transport, frame_encoding=encoding)
+    env.action_space.seed(args.seed)
+    chann = env.unwrapped.mt_chann
+
+    env.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        env.step(env.action_space.sample())
+
+    latencies = np.empty(args.num_steps)
+    start_bytes = chann.bytes_received
+    for t in range(args.num_steps):
+        start = time.perf_counter()
+        env.step(env.action_space.sample())
+        latencies[t] = time.perf_counter() - start
+    msg_bytes = (chann.bytes_received - start_bytes) / args.num_steps
+
+    env.close()
+
+    return 1000 * latencies, msg_bytes / 1024
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'resolution':<12}{'encoding':<12}{'mean ms':>10}{'p99 ms':>10}{'KiB/msg':>10}")
+    for resolution in args.resolutions:
+        width, height = map(int, resolution.split("x"))
+        for encoding in args.encodings:
+            lat, kib = benchmark(encoding, width, height, args)
+            print(f"{resolution:<12}{encoding:<12}{lat.mean():>10.3f}{np.percentile(lat, 99):>10.3f}"
+                  f"{kib:>10.1f}", flush=True)
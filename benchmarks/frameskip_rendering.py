@@ -0,0 +1,61 @@
+# Measures the throughput (steps per second) of a craftium environment with frameskip, drawing
+# all the frames or only the observed ones (see the `render_skipped_frames` option of CraftiumEnv).
+#
+# Usage example:
+#   python benchmarks/frameskip_rendering.py --env-id Craftium/ChopTree-v0 --frameskips 1 4 8
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import tyro
+
+import craftium
+
+
+@dataclass
+class Args:
+    env_id: str = "Craftium/ChopTree-v0"
+    """the id of the environment to benchmark"""
+    frameskips: list[int] = field(default_factory=lambda: [1, 4])
+    """frameskip values to measure"""
+    num_steps: int = 1000
+    """number of steps to measure"""
+    warmup_steps: int = 50
+    """number of steps to run before starting to measure"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environment and the sampled actions"""
+
+
+def benchmark(frameskip, render_skipped_frames, args):
+    env = gym.make(args.env_id, run_dir_prefix=args.mt_wd, frameskip=frameskip,
+                   render_skipped_frames=render_skipped_frames)
+    env.action_space.seed(args.seed)
+
+    env.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        env.step(env.action_space.sample())
+
+    start = time.perf_counter()
+    for _ in range(args.num_steps):
+        _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+        if terminated or truncated:
+            env.reset()
+    elapsed = time.perf_counter() - start
+
+    env.close()
+
+    return args.num_steps / elapsed
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'frameskip':<12}{'render skipped':<16}{'steps/s':>10}")
+    for frameskip in args.frameskips:
+        for render_skipped_frames in [True, False]:
+            sps = benchmark(frameskip, render_skipped_frames, args)
+            print(f"{frameskip:<12}{str(render_skipped_frames):<16}{sps:>10.1f}", flush=True)
@@ -0,0 +1,61 @@
+# Compares the throughput of the regular and the pipelined (`pipelined=True`) stepping modes,
+# simulating an agent that takes `policy_ms` milliseconds to compute each action.
+#
+# Usage example:
+#   python benchmarks/pipelined_stepping.py --env-id Craftium/ChopTree-v0 --policy-ms 0 5 20
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import tyro
+
+import craftium
+
+
+@dataclass
+class Args:
+    env_id: str = "Craftium/Room-v0"
+    """the id of the environment to benchmark"""
+    policy_ms: list[float] = field(default_factory=lambda: [0.0, 5.0, 20.0])
+    """simulated time (in milliseconds) spent by the agent computing each action"""
+    frameskip: int = 4
+    """frameskip of the environment"""
+    num_steps: int = 500
+    """number of steps to measure"""
+    warmup_steps: int = 50
+    """number of steps to run before starting to measure"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environment and the sampled actions"""
+
+
+def benchmark(pipelined, policy_ms, args):
+    env = gym.make(args.env_id, run_dir_prefix=args.mt_wd, frameskip=args.frameskip, pipelined=pipelined)
+    env.action_space.seed(args.seed)
+
+    env.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        env.step(env.action_space.sample())
+
+    start = time.perf_counter()
+    for _ in range(args.num_steps):
+        time.sleep(policy_ms / 1000)
+        env.step(env.action_space.sample())
+    elapsed = time.perf_counter() - start
+
+    env.close()
+
+    return args.num_steps / elapsed
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'policy ms':<12}{'mode':<12}{'steps/s':>10}")
+    for policy_ms in args.policy_ms:
+        for pipelined in [False, True]:
+            sps = benchmark(pipelined, policy_ms, args)
+            print(f"{policy_ms:<12}{'pipelined' if pipelined else 'regular':<12}{sps:>10.1f}", flush=True)
@@ -0,0 +1,78 @@
+# Compares the throughput (steps per second) of different vector environment implementations
+# over craftium environments: Gymnasium's `SyncVectorEnv` and `AsyncVectorEnv`, and craftium's
+# `ThreadedVectorEnv` and `BatchedVectorEnv`.
+#
+# Usage example:
+#   python benchmarks/vector_envs.py --env-ids Craftium/ChopTree-v0 Craftium/Speleo-v0 --num-envs 4
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import tyro
+
+import craftium
+
+
+@dataclass
+class Args:
+    env_ids: list[str] = field(default_factory=lambda: ["Craftium/Room-v0", "Craftium/ChopTree-v0",
+                                                        "Craftium/Speleo-v0", "Craftium/SpidersAttack-v0"])
+    """the ids of the environments to benchmark"""
+    vector_envs: list[str] = field(default_factory=lambda: ["sync", "async", "threaded", "batched"])
+    """vector environment implementations to compare (sync, async, threaded and/or batched)"""
+    num_envs: int = 4
+    """number of environments per vector environment"""
+    num_steps: int = 1000
+    """number of (vectorized) steps to measure"""
+    warmup_steps: int = 50
+    """number of (vectorized) steps to run before starting to measure"""
+    frameskip: int = 4
+    """number of frames to skip between observations"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environments and the sampled actions"""
+
+
+VECTOR_ENVS = {
+    "sync": gym.vector.SyncVectorEnv,
+    "async": gym.vector.AsyncVectorEnv,
+    "threaded": craftium.ThreadedVectorEnv,
+    "batched": craftium.BatchedVectorEnv,
+}
+
+
+def make_env(env_id, args):
+    def thunk():
+        return gym.make(env_id, run_dir_prefix=args.mt_wd, frameskip=args.frameskip)
+    return thunk
+
+
+def benchmark(env_id, vector_env, args):
+    envs = VECTOR_ENVS[vector_env]([make_env(env_id, args) for _ in range(args.num_envs)])
+    envs.action_space.seed(args.seed)
+
+    envs.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        envs.step(envs.action_space.sample())
+
+    start = time.perf_counter()
+    for _ in range(args.num_steps):
+        envs.step(envs.action_space.sample())
+    elapsed = time.perf_counter() - start
+
+    envs.close()
+
+    return args.num_steps * args.num_envs / elapsed
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'env id':<30}{'vector env':<12}{'steps/s':>10}")
+    for env_id in args.env_ids:
+        for vector_env in args.vector_envs:
+            sps = benchmark(env_id, vector_env, args)
+            print(f"{env_id:<30}{vector_env:<12}{sps:>10.1f}", flush=True)
@@ -0,0 +1,78 @@
+# Measures the cost of the voxel observation in each of the registered tasks: steps per second and
+# time spent by Luanti extracting the voxels (the "voxels" phase of `timing_info`) and in the rest of
+# its step ("sim", including the globalsteps of the mods), with the voxel observation disabled and
+# with each of its formats. The voxels are only extracted in the steps sent to python, so their
+# cost per step shouldn't depend on the frameskip.
+#
+# Usage example:
+#   python benchmarks/voxel_obs_cost.py --env-ids Craftium/ChopTree-v0 Craftium/Speleo-v0 --frameskip 1 4
+import os
+import time
+from dataclasses import dataclass, field
+
+import gymnasium as gym
+import tyro
+
+import craftium
+
+# voxel observation configurations to compare, as name: arguments of the environment
+CONFIGS = {
+    "off": dict(enable_voxel_obs=False),
+    "legacy": dict(enable_voxel_obs=True, voxel_obs_format="legacy"),
+    "packed": dict(enable_voxel_obs=True, voxel_obs_format="packed"),
+    "delta": dict(enable_voxel_obs=True, voxel_obs_format="packed", voxel_obs_delta=True),
+}
+
+
+@dataclass
+class Args:
+    env_ids: list[str] = field(default_factory=lambda: [
+        "Craftium/Room-v0", "Craftium/SmallRoom-v0", "Craftium/ChopTree-v0", "Craftium/Speleo-v0",
+        "Craftium/SpidersAttack-v0", "Craftium/ProcDungeons-v0"])
+    """ids of the environments to benchmark"""
+    configs: list[str] = field(default_factory=lambda: list(CONFIGS.keys()))
+    """voxel observation configurations to compare (off, legacy, packed and/or delta)"""
+    frameskip: list[int] = field(default_factory=lambda: [1, 4])
+    """frameskip values of the environment to measure"""
+    num_steps: int = 500
+    """number of steps to measure"""
+    warmup_steps: int = 50
+    """number of steps to run before starting to measure"""
+    mt_wd: str = "./"
+    """directory where the Luanti working directories will be created"""
+    seed: int = 0
+    """random seed of the environment and the sampled actions"""
+
+
+def benchmark(env_id, config, frameskip, args):
+    env = gym.make(env_id, run_dir_prefix=args.mt_wd, frameskip=frameskip, timing_info=True,
+                   **CONFIGS[config])
+    env.action_space.seed(args.seed)
+
+    env.reset(seed=args.seed)
+    for _ in range(args.warmup_steps):
+        env.step(env.action_space.sample())
+    env.unwrapped.get_timing_stats(reset=True)
+
+    start = time.perf_counter()
+    for _ in range(args.num_steps):
+        env.step(env.action_space.sample())
+    elapsed = time.perf_counter() - start
+    stats = env.unwrapped.get_timing_stats()
+
+    env.close()
+
+    return args.num_steps / elapsed, stats
+
+
+if __name__ == "__main__":
+    args = tyro.cli(Args)
+    os.makedirs(args.mt_wd, exist_ok=True)
+
+    print(f"{'env':<28}{'frameskip':>10}  {'voxels':<10}{'steps/s':>10}{'voxels ms':>12}{'sim ms':>10}")
+    for env_id in args.env_ids:
+        for frameskip in args.frameskip:
+            for config in args.configs:
+                sps, stats = benchmark(env_id, config, frameskip, args)
+                print(f"{env_id:<28}{frameskip:>10}  {config:<10}{sps:>10.1f}{stats['voxels']:>12.3f}"
+                      f"{stats['sim']:>10.3f}", flush=True)
@@ -1,9 +1,3 @@
-voxel_radius = {
-	x = minetest.settings:get("voxel_obs_rx"),
-	y = minetest.settings:get("voxel_obs_ry"),
-	z = minetest.settings:get("voxel_obs_rz")
-}
-
 local rwd_objective = minetest.settings:get("rwd_objective")
 local rwd_kill_monster = minetest.settings:get("rwd_kill_monster")
 
@@ -185,12 +179,4 @@ minetest.register_globalstep(function(dtime)
 
 		reset_termination()
 	end
-
-	-- get voxel obs
-	if minetest.settings:get("voxel_obs") then
-		local voxel_data, voxel_light_data, voxel_param2_data = voxel_api:get_voxel_data(player:get_pos(), voxel_radius)
-		set_voxel_data(voxel_data)
-		set_voxel_light_data(voxel_light_data)
-		set_voxel_param2_data(voxel_param2_data)
-	end
 end)
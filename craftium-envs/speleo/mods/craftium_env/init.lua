@@ -1,9 +1,3 @@
-voxel_radius = {
-	x = minetest.settings:get("voxel_obs_rx"),
-	y = minetest.settings:get("voxel_obs_ry"),
-	z = minetest.settings:get("voxel_obs_rz")
-}
-
 -- Executed when the player joins the game
 minetest.register_on_joinplayer(function(player, _last_login)
 	-- Set the players initial position
@@ -27,12 +21,6 @@ minetest.register_globalstep(function(dtime)
 
 	-- if the player is connected:
 	local player_pos = player:get_pos()
-	if minetest.settings:get("voxel_obs") then
-		local voxel_data, voxel_light_data, voxel_param2_data = voxel_api:get_voxel_data(player_pos, voxel_radius)
-		set_voxel_data(voxel_data)
-		set_voxel_light_data(voxel_light_data)
-		set_voxel_param2_data(voxel_param2_data)
-	end
 
 	-- set the reward to the inverse of the player's
 	-- position on the Y axis (depth)
@@ -3,6 +3,9 @@ import os
 from .craftium_env import CraftiumEnv
 from .multiagent_env import MarlCraftiumEnv
 from .wrappers import BinaryActionWrapper, DiscreteActionWrapper
+from .vector_env import ThreadedVectorEnv, BatchedVectorEnv
+from .remote_env import EnvServer, RemoteVectorEnv
+from .mt_channel import unpack_voxels
 
 from gymnasium.envs.registration import register, WrapperSpec
 from typing import Any, Optional
@@ -1,7 +1,7 @@
 import os
 from typing import Optional, Any
 
-from .mt_channel import MtChannel
+from .mt_channel import MtChannel, SOCKET_NAME, ACTION_ENTRY_DTYPE, TIMING_PHASES
 from .minetest import Minetest
 
 import numpy as np
@@ -18,16 +18,38 @@ ACTION_ORDER = [
 ]
 
 
+def action_to_keys(action: dict, screen_width: int, screen_height: int):
+    """Converts an action of the `Dict` action space into the keys and mouse movement sent to MT.
+    Mouse movements in [-1, 1] are scaled by half the size of MT's screen."""
+    keys = [0]*21  # all commands (keys) except the mouse
+    mouse_x, mouse_y = 0, 0
+    for k, v in action.items():
+        if k == "mouse":
+            x, y = v[0], -v[1]
+            mouse_x = int(x*(screen_width // 2))
+            mouse_y = int(y*(screen_height // 2))
+        else:
+            keys[ACTION_ORDER.index(k)] = v
+    return keys, mouse_x, mouse_y
+
+
 class CraftiumEnv(Env):
     """The main class implementing Gymnasium's [Env](https://gymnasium.farama.org/api/env/) API.
 
+    If voxel observations are enabled with content IDs (any `voxel_obs_format` but `"classes"`), after every reset that (re)starts Luanti `node_vocabulary` maps the content IDs of the session to the names of their nodes (otherwise, it's `None`).
+
     :param env_dir: Directory of the environment to load (should contain `worlds` and `games` directories).
     :param obs_width: The width of the observation image in pixels.
     :param obs_height: The height of the observation image in pixels.
-    :param enable_voxel_obs: Whether to enable voxel observations. Can only be enabled if _voxel_obs_available is True. The voxel observation is a 3D grid of dimensions (2*voxel_obs_rx+1, 2*voxel_obs_ry+1, 2*voxel_obs_rz+1, 3). The last dimension contains the voxel node ID, the light data, and the param2 data for each voxel.
+    :param render_width: The width in pixels of the images rendered by Luanti, if larger than `obs_width`. Luanti renders the scene once at `render_width`x`render_height`, and area-averages the image down to the observation's size. Then, in `"rgb_array"` mode, `render()` returns the frame of the last step at the rendering resolution (e.g., for recording videos), which is only sent by Luanti when requested. Defaults to `obs_width`.
+    :param render_height: The height in pixels of the images rendered by Luanti. Defaults to `obs_height`, see `render_width`.
+    :param enable_voxel_obs: Whether to enable voxel observations. Can only be enabled if _voxel_obs_available is True. The voxel observation is a 3D grid of dimensions (2*voxel_obs_rx+1, 2*voxel_obs_ry+1, 2*voxel_obs_rz+1, 3). The last dimension contains the voxel node ID, the light data, and the param2 data for each voxel. The voxels are read from the map of Luanti's client, i.e., only the blocks the client has received from the server: the nodes of blocks not loaded yet (e.g., right after connecting or beyond the client's view range) are `CONTENT_IGNORE` (node ID 127, or the class of `"ignore"` with `node_classes`), and the light data is the client's, which can lag behind the server's.
     :param voxel_obs_rx: The radius of the voxel observation in the x-axis (North).
     :param voxel_obs_ry: The radius of the voxel observation in the y-axis (Up).
     :param voxel_obs_rz: The radius of the voxel observation in the z-axis (East).
+    :param voxel_obs_format: Layout of the voxel observation. `"legacy"` (default) is the uint32 grid described in `enable_voxel_obs`. `"packed"` is a grid without the last dimension of the `craftium.mt_channel.VOXEL_DTYPE` structured dtype, with the `"id"` (uint16), `"light"` (uint8) and `"param2"` (uint8) fields, which is three times smaller and received without any conversion. `craftium.unpack_voxels` converts it to the legacy layout. `"classes"` is a uint8 grid with the class of each voxel's node, mapped by Luanti from its name with `node_classes` (required, with classes below 256), which is twelve times smaller than the legacy layout and doesn't need any remapping.
+    :param voxel_obs_delta: If `True`, Luanti only sends the translation of the voxel observation since the previous step and the voxels that changed, instead of the whole grid, and they're applied to the previous observation (in C). The observations are the same. Not supported with the `"shm"` transport nor `BatchedVectorEnv`.
+    :param voxel_obs_keyframe_interval: With `voxel_obs_delta`, the whole grid is sent every this many steps (besides after connecting and resetting), or never if set to 0.
     :param init_frames: The number of frames to wait for Minetest to load.
     :param render_mode: Render mode ("human" or "rgb_array"), see [Env.render](https://gymnasium.farama.org/api/env/#gymnasium.Env.render).
     :param max_timesteps: Maximum number of timesteps until episode termination. Disabled if set to `None`.
@@ -41,15 +63,32 @@ class CraftiumEnv(Env):
     :param mt_listen_timeout: Number of milliseconds to wait for MT to connect to the TCP channel. If the timeout is reached a Timeout exception is raised. **WARNING:** When using multiple (serial) MT environments, timeout can be easily reached for the last environment. In this case, you might want to increase the value of this parameter according to the number of environments.
     :param mt_port: TCP port to employ for MT's internal client<->server communication. If not provided a random port in the [49152, 65535] range is used.
     :param frameskip: The number of frames skipped between steps, 1 by default (disabled). Note that `max_timesteps` and `init_frames` parameters will be divided by the frameskip value.
+    :param render_skipped_frames: If set to `False`, the frames skipped by `frameskip` still advance the simulation and the input, but they aren't drawn, as only the last frame of each step is observed (or the last `frameskip_max_pool` frames). This considerably speeds up environments with `frameskip > 1`, especially with software rendering.
+    :param frameskip_max_pool: Number of frames at the end of each step (up to `frameskip`) whose element-wise maximum is returned as the observation, e.g., 2 for the Atari-style max-pooling of the last two frames. 1 by default (disabled). Pooling is done by Luanti, so only the pooled frame is sent to python.
+    :param frameskip_reward_sum: If set to `True`, the reward of each step is the sum of the rewards of all its frames, instead of the reward of the last frame. Otherwise, only the reward value at the end of the step is reported, so rewards set in skipped frames can be overwritten before being reported.
     :param rgb_observations: Whether to use RGB images or gray scale images as observations. Note that RGB images are slower to send from MT to python via TCP. By default RGB images are used.
     :param gray_scale_keepdim: If `True`, a singleton dimension will be added, i.e. observations are of the shape WxHx1. Otherwise, they are of shape WxH.
     :param seed: Random seed. Affects minetest's map generation and Lua's RNG (in mods).
     :param sync_mode: If set to true, minetest's internal client and server steps are synchronized. This is useful for training models slower than realtime.
+    :param lockstep_dtime: If set (in seconds), Luanti runs in lockstep mode: every frame advances its client and server by exactly `lockstep_dtime` simulated seconds (i.e., `frameskip * lockstep_dtime` per step), without sleeping nor limiting the FPS (`fps_max` is ignored). The environment then runs as fast as the CPU allows, and the simulated time doesn't depend on the speed of the host or the latency of the agent. Note that lockstep only fixes `dtime`, it doesn't make episodes deterministic: the server doesn't wait for the client's packets (e.g., the player's position), so an action can take effect one server step later depending on thread timing, and map generation runs in its own threads. Implies `sync_mode`. Disabled by default (real time).
     :param pmul: Physics multiplier. As craftium agent's take actions by frame, default movement speeds make the agent move slowly. When set to > 1, minetest's movement velocity and acceleration increase helping the agent to move at acceptable relative speeds.
     :param soft_reset: If set to true, resets will have to be handled by the Lua mod and minetest won't be killed and rerun every call to restart. **IMPORTANT:** Only set this flag to `True` in environments that support this feature.
     :param offscreen_sdl: Whether to use the `offscreen` SDL driver or not (true by default).
     :param gpu_id: If a GPU id was passed, set `SDL_HINT_EGL_DEVICE` to render the environment using that GPU.
     :param human_screeen_size: Size (width, height) of the render screen when `render_mode` is set to `"human"`.
+    :param transport: How observations are sent from MT to python. `"tcp"` (default) sends every message through the loopback TCP socket. `"unix"` uses a unix domain socket placed in MT's run directory instead, avoiding the overhead of the TCP/IP stack. `"shm"` makes MT write messages into a ring of shared memory slots, using the socket only to signal which slot is ready, which is considerably faster for large observations. The observations aren't views of the shared memory, as MT reuses the slots: each message is still copied once out of its slot into the observation's arrays.
+    :param shm_slots: Number of shared memory slots of the `"shm"` transport. MT writes each message into the next slot, so with `pipelined` there must be at least two, as MT writes the next message while python copies the last one.
+    :param render_obs: If set to `False`, Luanti doesn't render the scene nor capture any frame, while the simulation, input handling and Lua mods keep running as usual. Observations are then empty images of shape `(obs_height, obs_width, 0)`, and the agent has to rely on the values in the info dict (e.g., the voxel observations, `player_pos`, or `player_yaw`). This is considerably faster than rendering every frame. Not compatible with `render_mode`.
+    :param frame_encoding: How frames are encoded by MT. `"raw"` (default) sends the full image in every step. `"delta"` sends the image XOR-ed with the previous one and run-length encoded, which is decoded before returning the observation. Consecutive frames are very similar, so this greatly reduces the size of the messages, which mostly pays off for large observations when the bandwidth matters (e.g., remote environments, see `RemoteVectorEnv`). Not supported by the `"shm"` transport.
+    :param pipelined: If set to `True`, MT simulates the next step while the agent computes its action: one action is always kept in flight, so the action passed to `step` is applied after the returned observation has been simulated, i.e., actions take effect with a delay of one step (reported in the `"action_delay"` entry of the info dict). The first step after a reset applies a no-op action. This keeps MT busy most of the time, considerably increasing the throughput when the agent is slow (e.g., large policies), at the cost of the delay.
+    :param depth_obs: If set to `True`, observations are dicts with the image in `"frame"` and a `(obs_height, obs_width)` float32 depth map in `"depth"`: the distance (in nodes) from the camera's plane to the node seen through each pixel. Computed by Luanti casting a ray through each pixel against the loaded map (approximating nodes by full cubes), which is much cheaper than voxel observations to provide geometric information. Doesn't require rendering, so it can be combined with `render_obs=False`.
+    :param segmentation_obs: If set to `True`, observations are dicts (see `depth_obs`) with a `(obs_height, obs_width)` uint16 segmentation map in `"segmentation"`: the class of the node seen through each pixel (see `node_classes`), computed by the same rays as the depth.
+    :param node_classes: Maps node names to the classes reported in the segmentation maps, e.g., `{"default:stone": 1, "default:*tree": 2}`. Names can contain `*` wildcards, the first matching pattern gives the class, and nodes that don't match any pattern (and pixels where no node is hit) are of class 0. If `None`, nodes are reported by their (session dependent) content ID.
+    :param depth_max_range: Maximum distance (in nodes) of the rays cast for the depth and segmentation maps. Pixels where no node is hit within this distance get this depth.
+    :param lidar_rays: If greater than 0, Luanti casts this number of rays from the player's eyes in the horizontal plane (a "lidar"), returning the distance (in nodes) to the first node hit by each ray in the `"lidar_distance"` entry of the info dict (float32), and the class of the hit node (see `node_classes`) in `"lidar_nodes"` (uint16). Rays are ordered from left to right. A compact and cheap alternative to voxel observations for navigation tasks, it doesn't require rendering.
+    :param lidar_fov: Angle (in degrees) covered by the lidar rays, centered on the player's yaw.
+    :param lidar_max_range: Maximum distance (in nodes) of the lidar rays. Rays that don't hit any node within this distance report this distance.
+    :param timing_info: If set to `True`, Luanti measures the time (in milliseconds) it spends in each phase of every step, returned as a dict in the `"timing"` entry of the info dict: `"render"` (drawing the scene), `"capture"` (reading, converting and pooling the image), `"voxels"` (extracting the voxel observation), `"raycast"` (depth, segmentation and lidar rays), `"send"` (sending the observation), `"wait"` (waiting for the agent's action) and `"sim"` (the rest of the simulation, including Lua mods). Times are summed over the frames of the step, and `"send"` and `"wait"` refer to the previous step. See also `get_timing_stats`.
     :param _minetest_conf: The default minetest configuration provided during environment registration.
     :param _voxel_obs_available: This flag indicates environments that support voxel observations during registration (do not manually override).
     """
@@ -60,10 +99,15 @@ class CraftiumEnv(Env):
             env_dir: os.PathLike,
             obs_width: int = 640,
             obs_height: int = 360,
+            render_width: Optional[int] = None,
+            render_height: Optional[int] = None,
             enable_voxel_obs: bool = False,
             voxel_obs_rx: int = 20,
             voxel_obs_ry: int = 10,
             voxel_obs_rz: int = 20,
+            voxel_obs_format: str = "legacy",
+            voxel_obs_delta: bool = False,
+            voxel_obs_keyframe_interval: int = 100,
             init_frames: int = 15,
             render_mode: Optional[str] = None,
             max_timesteps: Optional[int] = None,
@@ -77,16 +121,33 @@ class CraftiumEnv(Env):
             mt_listen_timeout: int = 60_000,
             mt_port: Optional[int] = None,
             frameskip: int = 1,
+            render_skipped_frames: bool = True,
+            frameskip_max_pool: int = 1,
+            frameskip_reward_sum: bool = False,
             rgb_observations: bool = True,
             gray_scale_keepdim: bool = False,
             seed: Optional[int] = None,
             sync_mode: bool = False,
             fps_max: int = 200,
+            lockstep_dtime: Optional[float] = None,
             pmul: int = 20,
             soft_reset: bool = False,
             offscreen_sdl: bool = True,
             gpu_id: Optional[int] = None,
             human_screen_size: tuple[int, int] = (720, 720),
+            transport: str = "tcp",
+            shm_slots: int = 2,
+            render_obs: bool = True,
+            frame_encoding: str = "raw",
+            pipelined: bool = False,
+            depth_obs: bool = False,
+            segmentation_obs: bool = False,
+            node_classes: Optional[dict[str, int]] = None,
+            depth_max_range: float = 64.0,
+            lidar_rays: int = 0,
+            lidar_fov: float = 360.0,
+            lidar_max_range: float = 32.0,
+            timing_info: bool = False,
             _minetest_conf: dict[str, Any] = dict(),
             _voxel_obs_available: bool = False,
     ):
@@ -99,20 +160,38 @@ class CraftiumEnv(Env):
                 raise ValueError("Voxel observations are not supported for this environment. Set `enable_voxel_obs` to `False` "
                                  "or use a different environment.")
 
+        assert voxel_obs_format != "classes" or (node_classes and max(node_classes.values()) < 256), \
+            "The \"classes\" voxel format requires node_classes, with classes below 256"
+
+        assert not pipelined or transport != "shm" or shm_slots >= 2, \
+            "The \"shm\" transport needs at least two slots with pipelined=True"
+
         _minetest_conf.update(minetest_conf)
 
+        render_width = render_width if render_width is not None else obs_width
+        render_height = render_height if render_height is not None else obs_height
+        downsampled = (render_width, render_height) != (obs_width, obs_height)
+
         #  out auto enlargement of fov for aspect ratios smaller than 16/10
-        aspect_ratio = obs_width / obs_height
+        aspect_ratio = render_width / render_height
         if aspect_ratio < 16/10 and 'fov' in _minetest_conf:
             _minetest_conf['fov'] = _minetest_conf['fov'] / np.clip(np.sqrt((16/10)/aspect_ratio), 1.0, 1.4)
 
         self.obs_width = obs_width
         self.obs_height = obs_height
+        self.render_width = render_width
+        self.render_height = render_height
         self.init_frames = init_frames // frameskip
         self.max_timesteps = max_timesteps
         self.gray_scale_keepdim = gray_scale_keepdim
         self.rgb_observations = rgb_observations
+        self.render_obs = render_obs
         self.soft_reset = soft_reset
+        self.pipelined = pipelined
+        # content ID -> node name of the current connection with MT, only requested (in `reset`) if the
+        # voxel observations hold content IDs
+        self.node_vocabulary = None
+        self.request_vocabulary = enable_voxel_obs and voxel_obs_format != "classes"
 
         # define the action space
         action_dict = {}
@@ -123,17 +202,28 @@ class CraftiumEnv(Env):
                     ] = Box(low=-1, high=1, shape=(2,), dtype=np.float32)
         self.action_space = Dict(action_dict)
 
-        # define the observation space
-        shape = [obs_width, obs_height]
-        if rgb_observations:
+        # define the observation space (images are received from MT as HxWxC arrays)
+        shape = [obs_height, obs_width]
+        if not render_obs:
+            shape.append(0)  # empty images, nothing is rendered
+        elif rgb_observations:
             shape.append(3)
         elif gray_scale_keepdim:
             shape.append(1)
 
         self.observation_space = Box(
             low=0, high=255, shape=shape, dtype=np.uint8)
+        if depth_obs or segmentation_obs:
+            # the depth and segmentation maps are returned along with the image
+            obs_spaces = {"frame": self.observation_space}
+            if depth_obs:
+                obs_spaces["depth"] = Box(low=0, high=depth_max_range, shape=(obs_height, obs_width), dtype=np.float32)
+            if segmentation_obs:
+                obs_spaces["segmentation"] = Box(low=0, high=0xFFFF, shape=(obs_height, obs_width), dtype=np.uint16)
+            self.observation_space = Dict(obs_spaces)
 
         assert render_mode is None or render_mode in self.metadata["render_modes"]
+        assert render_mode is None or render_obs, "render_mode can't be used when render_obs is False"
         self.render_mode = render_mode
 
         # initialize the Python<->Minetest communication channel (server side)
@@ -144,8 +234,19 @@ class CraftiumEnv(Env):
             voxel_obs_rx=voxel_obs_rx,
             voxel_obs_ry=voxel_obs_ry,
             voxel_obs_rz=voxel_obs_rz,
+            voxel_format=voxel_obs_format,
+            voxel_delta=voxel_obs_delta,
             listen_timeout=mt_listen_timeout,
             rgb_imgs=rgb_observations,
+            transport=transport,
+            shm_slots=shm_slots,
+            frame_encoding=frame_encoding,
+            frame_obs=render_obs,
+            full_frame_size=(render_width, render_height) if downsampled and render_obs else None,
+            depth_obs=depth_obs,
+            segmentation_obs=segmentation_obs,
+            lidar_rays=lidar_rays,
+            timing=timing_info,
         )
 
         # handles the MT configuration and process
@@ -158,23 +259,44 @@ class CraftiumEnv(Env):
             seed=seed,
             game_id=game_id,
             sync_dir=env_dir,
-            screen_w=obs_width,
-            screen_h=obs_height,
+            screen_w=render_width,
+            screen_h=render_height,
+            obs_w=obs_width if downsampled else None,
+            obs_h=obs_height if downsampled else None,
+            depth_max_range=depth_max_range,
+            node_classes=node_classes,
+            lidar_rays=lidar_rays,
+            lidar_fov=lidar_fov,
+            lidar_max_range=lidar_max_range,
             voxel_obs=enable_voxel_obs,
             voxel_obs_rx=voxel_obs_rx,
             voxel_obs_ry=voxel_obs_ry,
             voxel_obs_rz=voxel_obs_rz,
+            voxel_obs_packed=voxel_obs_format == "packed",
+            voxel_obs_classes=voxel_obs_format == "classes",
+            voxel_obs_keyframe_interval=voxel_obs_keyframe_interval,
             minetest_dir=minetest_dir,
             tcp_port=self.mt_chann.port,
             minetest_conf=_minetest_conf,
             pipe_proc=pipe_proc,
             mt_port=mt_port,
             frameskip=frameskip,
+            render_skipped_frames=render_skipped_frames,
+            frameskip_max_pool=frameskip_max_pool,
+            frameskip_reward_sum=frameskip_reward_sum,
             rgb_frames=rgb_observations,
             sync_mode=sync_mode,
             fps_max=fps_max,
+            lockstep_dtime=lockstep_dtime,
             pmul=pmul,
+            transport=transport,
+            socket_path=SOCKET_NAME if transport == "unix" else None,
+            shm_name=self.mt_chann.shm_name,
+            shm_slots=self.mt_chann.shm_slots,
         )
+        if transport == "unix":
+            # MT runs inside its run directory, so it finds the socket as `SOCKET_NAME`
+            self.mt_chann.bind_unix(os.path.join(self.mt.run_dir, SOCKET_NAME))
 
         # set up the pygame screen if `render_mode` is set to "human"
         self.pyg_closed = False
@@ -187,10 +309,60 @@ class CraftiumEnv(Env):
 
         self.last_observation = None  # used in render if "rgb_array"
         self.timesteps = 0  # the timesteps counter
+        self.waiting_step = False  # True between `step_async` and `step_wait`
+        # sum of the step timings (if `timing_info`) and number of steps, see `get_timing_stats`
+        self.timing_sum = np.zeros(len(TIMING_PHASES))
+        self.timing_steps = 0
 
     def _get_info(self):
         return dict()
 
+    def _action_to_keys(self, action):
+        """Converts an action of the `Dict` action space into the keys and mouse movement sent to MT."""
+        return action_to_keys(action, self.render_width, self.render_height)
+
+    def register_actions(self, actions: list[dict]):
+        """Registers a table of actions in MT. Then, `step` takes the index of an action in the table (an integer) instead of the action itself, and only this index is sent to MT, which expands it into the full action. This avoids building and encoding the full action in every step. `DiscreteActionWrapper` uses this method to register its actions.
+
+        The table is sent to MT when the connection is opened, thus, this method must be called before the first call to `reset`.
+
+        :param actions: A list of actions of the `Dict` action space.
+        """
+        table = np.zeros(len(actions), dtype=ACTION_ENTRY_DTYPE)
+        for i, action in enumerate(actions):
+            keys, mouse_x, mouse_y = self._action_to_keys(action)
+            table[i] = (sum(int(k > 0) << j for j, k in enumerate(keys)), mouse_x, mouse_y)
+        self.mt_chann.set_action_table(table)
+
+    def _process_observation(self, observation, voxobs, pos, vel, pitch, yaw, dtime, extra=None):
+        """Builds the observation and the info dict from the values received from MT."""
+        if not self.gray_scale_keepdim and not self.rgb_observations and self.render_obs:
+            observation = observation[:, :, 0]
+
+        self.last_observation = observation
+        extra = dict(extra or {})
+        lidar = {name: extra.pop(name) for name in ["lidar_distance", "lidar_nodes"] if name in extra}
+        timing = extra.pop("timing", None)
+        if extra:
+            observation = dict(frame=observation, **extra)
+
+        info = self._get_info()
+        info.update(lidar)
+        if timing is not None:
+            info["timing"] = dict(zip(TIMING_PHASES, timing.tolist()))
+            self.timing_sum += timing
+            self.timing_steps += 1
+        info["voxel_obs"] = voxobs
+        info["player_pos"] = pos
+        info["player_vel"] = vel
+        info["player_pitch"] = pitch
+        info["player_yaw"] = yaw
+        info["mt_dtime"] = dtime
+        if self.pipelined:
+            info["action_delay"] = 1
+
+        return observation, info
+
     def get_mt_config(self):
         return deepcopy(self.mt.config)
 
@@ -207,10 +379,12 @@ class CraftiumEnv(Env):
         :param seed: The random seed.
         :param options: Options dictionary.
         """
+        assert not self.waiting_step, "reset called with a pending step_async, call step_wait first"
         super().reset(seed=seed)
         self.timesteps = 0
 
-        if not self.soft_reset or not self.mt_chann.is_open():
+        new_conn = not self.soft_reset or not self.mt_chann.is_open()
+        if new_conn:
             if self.mt_chann.is_open():
                 self.mt_chann.send_kill()
                 self.mt_chann.close_conn()
@@ -249,23 +423,23 @@ class CraftiumEnv(Env):
             # TODO This "waiting" should be implemented in Minetest not in python
             for _ in range(self.init_frames):
                 _observation, _voxobs, _pos, _vel, _pitch, _yaw, _dtime, _reward, _term = self.mt_chann.receive()
-                self.mt_chann.send([0]*21, 0, 0)  # nop action
+                self.mt_chann.send_nop()
         else:
             self.mt_chann.send_soft_reset()
+            if self.pipelined:
+                # discard the observation of the step in flight, simulated before the reset
+                self.mt_chann.receive()
 
         observation, voxobs, pos, vel, pitch, yaw, dtime, _reward, _term = self.mt_chann.receive()
-        if not self.gray_scale_keepdim and not self.rgb_observations:
-            observation = observation[:, :, 0]
+        observation, info = self._process_observation(observation, voxobs, pos, vel, pitch, yaw, dtime,
+                                                      self.mt_chann.last_extra)
+        if new_conn and self.request_vocabulary:
+            # content IDs depend on the session, so their names are requested once per connection
+            self.node_vocabulary = self.mt_chann.request_node_vocabulary()
 
-        self.last_observation = observation
-
-        info = self._get_info()
-        info["voxel_obs"] = voxobs
-        info["player_pos"] = pos
-        info["player_vel"] = vel
-        info["player_pitch"] = pitch
-        info["player_yaw"] = yaw
-        info["mt_dtime"] = dtime
+        if self.pipelined:
+            # put an action in flight, so MT simulates the first step while the agent computes its action
+            self.mt_chann.send_nop()
 
         return observation, info
 
@@ -276,6 +450,17 @@ class CraftiumEnv(Env):
 
         :param action: An action provided by the agent.
         """
+        self.step_async(action)
+        return self.step_wait()
+
+    def step_async(self, action):
+        """Sends the action to MT and returns without waiting for the resulting observation, which must be collected with `step_wait`. Meanwhile, MT simulates the step, so the caller can do other work (e.g., step other environments or run the policy).
+
+        Note that wrappers are bypassed when calling this method through `env.unwrapped`, so the action must belong to the action space of `CraftiumEnv`.
+
+        :param action: An action provided by the agent (or its index if an action table is registered, see `register_actions`).
+        """
+        assert not self.waiting_step, "step_async called twice without calling step_wait"
         self.timesteps += 1
 
         # render the previous observation if needed
@@ -305,41 +490,55 @@ class CraftiumEnv(Env):
                 pygame.display.flip()
                 self.pyg_clock.tick(self.metadata["render_fps"])  # limits FPS
 
-        # convert the action dict to a format to be sent to MT through mt_chann
-        keys = [0]*21  # all commands (keys) except the mouse
-        mouse_x, mouse_y = 0, 0
-        for k, v in action.items():
-            if k == "mouse":
-                x, y = v[0], -v[1]
-                mouse_x = int(x*(self.obs_width // 2))
-                mouse_y = int(y*(self.obs_height // 2))
-            else:
-                keys[ACTION_ORDER.index(k)] = v
         # send the action to MT
-        self.mt_chann.send(keys, mouse_x, mouse_y)
+        if self.mt_chann.action_table is None:
+            self.mt_chann.send(*self._action_to_keys(action))
+        else:
+            self.mt_chann.send_index(int(action))
+        self.waiting_step = True
 
-        # receive the new info from minetest
-        observation, voxobs, pos, vel, pitch, yaw, dtime, reward, termination = self.mt_chann.receive()
-        if not self.gray_scale_keepdim and not self.rgb_observations:
-            observation = observation[:, :, 0]
+    def step_wait(self):
+        """Waits for the step started by `step_async` to finish.
 
-        self.last_observation = observation
+        :returns: The same values as `step`.
+        """
+        assert self.waiting_step, "step_wait called without a pending step_async"
+        self.waiting_step = False
 
-        info = self._get_info()
-        info["voxel_obs"] = voxobs
-        info["player_pos"] = pos
-        info["player_vel"] = vel
-        info["player_pitch"] = pitch
-        info["player_yaw"] = yaw
-        info["mt_dtime"] = dtime
+        # receive the new info from minetest
+        observation, voxobs, pos, vel, pitch, yaw, dtime, reward, termination = self.mt_chann.receive()
+        observation, info = self._process_observation(observation, voxobs, pos, vel, pitch, yaw, dtime,
+                                                      self.mt_chann.last_extra)
 
         truncated = self.max_timesteps is not None and self.timesteps >= self.max_timesteps
 
         return observation, reward, termination, truncated, info
 
+    def get_timing_stats(self, reset: bool = True) -> dict[str, float]:
+        """Returns the mean time (in milliseconds) per step spent by MT in each phase of the step (see `timing_info`), plus their sum in `"total"`, since the environment was created or the stats were reset.
+
+        :param reset: Whether to restart the stats after returning them.
+        """
+        assert "timing" in self.mt_chann.extra_sections, "Timings are only measured if timing_info is True"
+        mean = self.timing_sum / max(self.timing_steps, 1)
+        stats = dict(zip(TIMING_PHASES, mean.tolist()))
+        stats["total"] = float(mean.sum())
+        if reset:
+            self.timing_sum[:] = 0
+            self.timing_steps = 0
+        return stats
+
     def render(self):
         if self.render_mode == "rgb_array":
-            return self.last_observation
+            if self.mt_chann.full_frame_size is None:
+                return self.last_observation
+
+            assert not self.pipelined and not self.waiting_step, \
+                "The full resolution frame can't be requested while a step is in flight"
+            frame = self.mt_chann.request_full_frame()
+            if not self.gray_scale_keepdim and not self.rgb_observations:
+                frame = frame[:, :, 0]
+            return frame
 
     def close(self, clear: bool = True):
         """
@@ -350,9 +549,10 @@ class CraftiumEnv(Env):
         """
         if self.mt_chann.is_open():
             self.mt_chann.send_kill()
-            self.mt_chann.close()
+            self.mt_chann.close_conn()
             self.mt.close_pipes()
             self.mt.wait_close()
+        self.mt_chann.close()
 
         if clear:
             self.mt.clear()
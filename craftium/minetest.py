@@ -34,19 +34,37 @@ class Minetest():
             sync_dir: Optional[os.PathLike] = None,
             screen_w: int = 640,
             screen_h: int = 360,
+            obs_w: Optional[int] = None,
+            obs_h: Optional[int] = None,
+            depth_max_range: float = 64.0,
+            node_classes: Optional[dict[str, int]] = None,
+            lidar_rays: int = 0,
+            lidar_fov: float = 360.0,
+            lidar_max_range: float = 32.0,
             voxel_obs: bool = False,
             voxel_obs_rx: int = 20,
             voxel_obs_ry: int = 10,
             voxel_obs_rz: int = 20,
+            voxel_obs_packed: bool = False,
+            voxel_obs_classes: bool = False,
+            voxel_obs_keyframe_interval: int = 100,
             minetest_dir: Optional[str] = None,
             minetest_conf: dict[str, Any] = dict(),
             pipe_proc: bool = True,
             mt_port: Optional[int] = None,
             frameskip: int = 1,
+            render_skipped_frames: bool = True,
+            frameskip_max_pool: int = 1,
+            frameskip_reward_sum: bool = False,
             rgb_frames: bool = True,
             sync_mode: bool = False,
             fps_max: int = 200,
+            lockstep_dtime: Optional[float] = None,
             pmul: int = 1,
+            transport: str = "tcp",
+            socket_path: Optional[str] = None,
+            shm_name: Optional[str] = None,
+            shm_slots: int = 2,
     ):
         self.pipe_proc = pipe_proc
 
@@ -88,6 +106,9 @@ class Minetest():
             voxel_obs_rx=voxel_obs_rx,
             voxel_obs_ry=voxel_obs_ry,
             voxel_obs_rz=voxel_obs_rz,
+            voxel_obs_packed=voxel_obs_packed,
+            voxel_obs_classes=voxel_obs_classes,
+            voxel_obs_keyframe_interval=voxel_obs_keyframe_interval,
             vsync=False,
             fps_max=fps_max,
             fps_max_unfocused=fps_max,
@@ -95,7 +116,23 @@ class Minetest():
             # fov=self.fov_y,
 
             craftium_port=tcp_port,
+            # size of the frames sent to python, downsampled from the screen (0 if not downsampled)
+            craftium_obs_w=obs_w if obs_w is not None else 0,
+            craftium_obs_h=obs_h if obs_h is not None else 0,
+            craftium_depth_max_range=depth_max_range,
+            # node name patterns to classes, as "pattern=class,pattern=class"
+            craftium_node_classes=",".join(f"{k}={v}" for k, v in (node_classes or {}).items()),
+            craftium_lidar_rays=lidar_rays,
+            craftium_lidar_fov=lidar_fov,
+            craftium_lidar_max_range=lidar_max_range,
+            craftium_transport=transport,
+            craftium_socket_path=socket_path if socket_path is not None else "",
+            craftium_shm_name=shm_name if shm_name is not None else "",
+            craftium_shm_slots=shm_slots,
             frameskip=frameskip,
+            render_skipped_frames=render_skipped_frames,
+            frameskip_max_pool=frameskip_max_pool,
+            frameskip_reward_sum=frameskip_reward_sum,
             rgb_frames=rgb_frames,
 
             # port used for MT's internal client<->server comm.
@@ -103,6 +140,7 @@ class Minetest():
             remote_port=port,
 
             sync_env_mode=sync_mode,
+            lockstep_dtime=lockstep_dtime if lockstep_dtime is not None else 0,
 
             # Adapt HUD size to display size, based on (1024, 600) default
             # hud_scaling=self.display_size[0] / 1024,
@@ -2,9 +2,102 @@ import socket
 import struct
 import os
 from typing import Optional
+from uuid import uuid4
+from multiprocessing.shared_memory import SharedMemory
 import numpy as np
 import mt_server
 
+# transports available to receive observations from MT
+TRANSPORTS = ["tcp", "unix", "shm"]
+
+# encodings of the frames sent by MT: "raw" sends the full image, and "delta" the image XOR-ed
+# with the previous one and run-length encoded (decoded in `recv_into`)
+FRAME_ENCODINGS = ["raw", "delta"]
+
+# name of the socket file created in MT's run directory by the "unix" transport
+SOCKET_NAME = "craftium.sock"
+
+# size of the header at the beginning of each message sent by MT: magic (u4), protocol version (u2),
+# included sections (u2), step counter (u8) and the size of each section (16 * u4)
+HEADER_BYTES = 80
+# size of the header of the voxels delta section: keyframe flag (u1), voxel bytes (u1), shift
+# (3 * i2), dimensions (3 * u2), reserved (u2) and number of changes (u4)
+VOXELS_DELTA_HEADER_BYTES = 20
+
+# sections that a message sent by MT can include. These are negotiated when MT connects (see
+# `MtChannel.open_conn`), and included in the message in this order. Each value is the index of
+# the section's bit in the flags and of its size in the header.
+SECTION_FRAME = 0
+SECTION_VOXELS = 1
+SECTION_STATE = 2
+SECTION_FRAME_DELTA = 3
+# the last frame at the resolution of MT's screen, only sent when requested (see `request_full_frame`)
+SECTION_FULL_FRAME = 4
+# depth (float32) and node class (uint16) of each pixel of the frame, computed by MT casting a ray
+# through each pixel
+SECTION_DEPTH = 5
+SECTION_SEGMENTATION = 6
+# distance (float32) and class of the hit node (uint16) of each lidar ray cast by MT from the player
+SECTION_LIDAR_DISTANCE = 7
+SECTION_LIDAR_NODES = 8
+# time (in milliseconds, float32) spent by MT in each phase of the step, see `TIMING_PHASES`
+SECTION_TIMING = 9
+# the voxel observation, encoded as the translation of the grid since the previous message and the
+# voxels that changed (or the whole grid, in keyframes)
+SECTION_VOXELS_DELTA = 10
+# the names of the nodes (content IDs), only sent when requested (see `request_node_vocabulary`)
+SECTION_NODE_VOCABULARY = 11
+# upper bound of the size of the node vocabulary section
+NODE_VOCABULARY_MAX_BYTES = 1 << 22
+
+# phases of MT's step in the timing section: drawing the scene, reading (and converting, downsampling
+# and pooling) the image, extracting the voxel observation, casting the depth/segmentation/lidar rays,
+# sending the message, waiting for the action (the last two, of the previous step), and the rest of
+# the client's step (including the sync with the server and its Lua globalsteps)
+TIMING_PHASES = ["render", "capture", "voxels", "raycast", "send", "wait", "sim"]
+
+# layouts of the voxel observation: "legacy" sends the content ID, light and param2 of each voxel
+# as uint32 channels, "packed" as a single `VOXEL_DTYPE` element (4 bytes instead of 12), and
+# "classes" only the class of the node (uint8), mapped by MT from its name (see `node_classes` in
+# `CraftiumEnv`)
+VOXEL_FORMATS = ["legacy", "packed", "classes"]
+VOXEL_DTYPE = np.dtype([
+    ("id", "<u2"),
+    ("light", "u1"),
+    ("param2", "u1"),
+])
+
+# layout of the state section
+STATE_DTYPE = np.dtype([
+    ("pos", "<f4", (3,)),
+    ("vel", "<f4", (3,)),
+    ("pitch", "<i4"),
+    ("yaw", "<i4"),
+    ("dtime", "<f4"),
+    ("reward", "<f8"),
+    ("termination", "u1"),
+])
+
+# entries of the action tables registered in MT (see `MtChannel.set_action_table`): a bitmask of
+# the pressed keys (bit i is the i-th key in `ACTION_ORDER`) and the mouse movement
+ACTION_ENTRY_DTYPE = np.dtype([
+    ("keys", "<u4"),
+    ("mouse_x", "<i2"),
+    ("mouse_y", "<i2"),
+])
+
+# values of the last byte of an action (the "kill" flag) that request the full resolution frame
+# and the node vocabulary
+CMD_FULL_FRAME = 2
+CMD_NODE_VOCABULARY = 3
+
+# indices with a reserved meaning when an action table is registered
+ACTION_NODE_VOCABULARY = 0xFFFB
+ACTION_FULL_FRAME = 0xFFFC
+ACTION_NOP = 0xFFFD
+ACTION_SOFT_RESET = 0xFFFE
+ACTION_KILL = 0xFFFF
+
 
 class MtChannel():
     def __init__(
@@ -17,7 +110,30 @@ class MtChannel():
             voxel_obs_rx: int = 20,
             voxel_obs_ry: int = 10,
             voxel_obs_rz: int = 20,
+            voxel_format: str = "legacy",
+            voxel_delta: bool = False,
+            transport: str = "tcp",
+            shm_slots: int = 2,
+            frame_encoding: str = "raw",
+            frame_obs: bool = True,
+            full_frame_size: Optional[tuple[int, int]] = None,
+            depth_obs: bool = False,
+            segmentation_obs: bool = False,
+            lidar_rays: int = 0,
+            timing: bool = False,
     ):
+        assert transport in TRANSPORTS, f"Unknown transport '{transport}', available transports are: {TRANSPORTS}"
+        assert 0 < shm_slots <= 256, "The number of shared memory slots must be in the [1, 256] range"
+        assert frame_encoding in FRAME_ENCODINGS, \
+            f"Unknown frame encoding '{frame_encoding}', available encodings are: {FRAME_ENCODINGS}"
+        assert frame_encoding == "raw" or transport != "shm", \
+            "The \"shm\" transport only supports the \"raw\" frame encoding"
+        assert full_frame_size is None or frame_obs, "Full resolution frames require frame observations"
+        assert voxel_format in VOXEL_FORMATS, \
+            f"Unknown voxel format '{voxel_format}', available formats are: {VOXEL_FORMATS}"
+        assert not voxel_delta or transport != "shm", \
+            "The \"shm\" transport doesn't support delta encoded voxels"
+
         self.img_width = img_width
         self.img_height = img_height
         self.voxel_obs_dx = 2 * voxel_obs_rx + 1
@@ -25,46 +141,291 @@ class MtChannel():
         self.voxel_obs_dz = 2 * voxel_obs_rz + 1
         self.listen_timeout = listen_timeout
 
-        self.port, self.sockfd = mt_server.init_server()
+        # with the "unix" transport the socket is bound later on (see `bind_unix`), as it's placed
+        # in MT's run directory, which doesn't exist yet
+        self.socket_path = None
+        if transport == "unix":
+            self.port, self.sockfd = None, None
+        else:
+            self.port, self.sockfd = mt_server.init_server()
 
-        # initialized in `reset_connection`
+        # initialized in `open_conn`
         self.connfd = None
+        self.mt_sections = None  # sections that MT can provide
+        self.action_table = None  # registered with `set_action_table`
+        self.step_counter = 0  # step of the next message expected from MT
+        self.bytes_received = 0  # total size of the messages received from MT
+        self.last_extra = {}  # optional sections of the last message received with `receive`
 
-        # pre-compute the number of bytes that we should receive from MT.
-        # the RGB image + 8 bytes of the reward + 1 of the soft-reset flag
-        self.n_chan = 3 if rgb_imgs else 1
+        # the sections to receive from MT, and the number of bytes of each message
+        # without frame observations, MT doesn't render nor send any image (frames have 0 channels)
+        self.n_chan = (3 if rgb_imgs else 1) if frame_obs else 0
         self.n_vox_chan = 3 if voxel_obs else 0
-        self.rec_bytes = (img_width*img_height*self.n_chan + 32 + 4 + 8 + 1
-                          + self.voxel_obs_dx*self.voxel_obs_dy*self.voxel_obs_dz*self.n_vox_chan*4)
+        self.voxel_format = voxel_format
+        voxel_bytes = {"packed": VOXEL_DTYPE.itemsize, "classes": 1}.get(voxel_format, self.n_vox_chan*4)
+        self.frame_encoding = frame_encoding
+        self.sections = (1 << SECTION_STATE) | (1 << SECTION_NODE_VOCABULARY)
+        if frame_obs:
+            self.sections |= 1 << (SECTION_FRAME_DELTA if frame_encoding == "delta" else SECTION_FRAME)
+        if voxel_obs:
+            self.sections |= 1 << (SECTION_VOXELS_DELTA if voxel_delta else SECTION_VOXELS)
+        # (width, height) of MT's screen, if the frames are downsampled and the full resolution
+        # ones can be requested
+        self.full_frame_size = full_frame_size
+        if full_frame_size is not None:
+            self.sections |= 1 << SECTION_FULL_FRAME
+
+        # optional sections received besides the frame, voxels and state, as name: (section,
+        # shape, dtype), see `make_extra_buffers`
+        self.extra_sections = {}
+        if depth_obs:
+            self.extra_sections["depth"] = (SECTION_DEPTH, (img_height, img_width), np.float32)
+        if segmentation_obs:
+            self.extra_sections["segmentation"] = (SECTION_SEGMENTATION, (img_height, img_width), np.uint16)
+        if lidar_rays > 0:
+            self.extra_sections["lidar_distance"] = (SECTION_LIDAR_DISTANCE, (lidar_rays,), np.float32)
+            self.extra_sections["lidar_nodes"] = (SECTION_LIDAR_NODES, (lidar_rays,), np.uint16)
+        if timing:
+            self.extra_sections["timing"] = (SECTION_TIMING, (len(TIMING_PHASES),), np.float32)
+        for section, shape, dtype in self.extra_sections.values():
+            self.sections |= 1 << section
+
+        self.rec_bytes = (HEADER_BYTES + img_width*img_height*self.n_chan + STATE_DTYPE.itemsize
+                          + (self.voxel_obs_dx*self.voxel_obs_dy*self.voxel_obs_dz*voxel_bytes if voxel_obs else 0))
+        self.rec_bytes += sum(int(np.prod(shape)) * np.dtype(dtype).itemsize
+                              for _, shape, dtype in self.extra_sections.values())
+
+        # with the "shm" transport MT writes each message into a ring of `shm_slots`
+        # slots in shared memory, and the socket is only used to signal the slot index.
+        # The slots are reused, so each message is still copied once into the section buffers
+        self.transport = transport
+        self.shm = None
+        # with the "delta" encoding, the frames are decoded against the previous one
+        self.prev_frame = None
+        if frame_obs and frame_encoding == "delta":
+            self.prev_frame = np.zeros((img_height, img_width, self.n_chan), dtype=np.uint8)
+        # and the same goes for the voxels, with `voxel_delta`
+        self.prev_voxels = None
+        if voxel_obs and voxel_delta:
+            self.prev_voxels = np.zeros_like(self.make_buffers()[1])
+        # the encoded delta sections are received into this buffer, instead of allocating one per step,
+        # which also holds a copy of the voxels to translate them (after the largest voxels delta section)
+        scratch_bytes = 0
+        if self.prev_frame is not None:
+            n = self.prev_frame.nbytes
+            scratch_bytes = n + 4 * (n // 0xFFFF + 2)
+        if self.prev_voxels is not None:
+            scratch_bytes = max(scratch_bytes, VOXELS_DELTA_HEADER_BYTES + 2 * self.prev_voxels.nbytes)
+        self._delta_scratch = np.empty(scratch_bytes, dtype=np.uint8) if scratch_bytes > 0 else None
+        self.shm_slots = shm_slots
+        if transport == "shm":
+            self.shm = SharedMemory(name=f"craftium-{uuid4().hex}", create=True,
+                                    size=self.rec_bytes*shm_slots)
+
+    @property
+    def shm_name(self) -> Optional[str]:
+        """Name of the shared memory object (as expected by `shm_open`), if the "shm" transport is used."""
+        return None if self.shm is None else f"/{self.shm.name}"
+
+    def bind_unix(self, path: os.PathLike):
+        """Binds the server to a unix domain socket at `path`. Only used by the "unix" transport.
+
+        :param path: Path of the socket file. Note that the length of the path is limited to 107 bytes.
+        """
+        assert self.transport == "unix", "bind_unix is only available with the \"unix\" transport"
+        assert self.sockfd is None, "The server socket is already bound"
+        self.sockfd = mt_server.init_server_unix(os.fspath(path))
+        self.socket_path = path
+
+    def set_action_table(self, table: np.ndarray):
+        """Sets the table of actions registered in MT when the connection is opened. Then, instead
+        of the full action, only the index of an action in the table is sent in each step (see
+        `send_index`). Must be called before opening the connection.
+
+        :param table: An array of up to 65530 `ACTION_ENTRY_DTYPE` elements.
+        """
+        assert not self.is_open(), "The action table must be set before opening the connection with MT"
+        assert 0 < len(table) < ACTION_NODE_VOCABULARY, \
+            f"The action table must have between 1 and {ACTION_NODE_VOCABULARY-1} entries"
+        self.action_table = np.ascontiguousarray(table, dtype=ACTION_ENTRY_DTYPE)
+        # the message of each index, pre-encoded to avoid packing them in every step
+        self._index_msgs = [struct.pack("<H", i) for i in range(len(table))]
+        self._index_msgs += [struct.pack("<H", i)
+                             for i in [ACTION_NODE_VOCABULARY, ACTION_FULL_FRAME, ACTION_NOP,
+                                       ACTION_SOFT_RESET, ACTION_KILL]]
+
+    def make_buffers(self, batch_size: Optional[int] = None):
+        """Allocates a set of buffers to be used with `recv_into`.
+
+        :param batch_size: If given, a leading batch dimension of this size is added to every buffer.
+        :returns: A tuple with the frame, voxels and state buffers.
+        """
+        batch = () if batch_size is None else (batch_size,)
+        frame = np.empty(batch + (self.img_height, self.img_width, self.n_chan), dtype=np.uint8)
+        voxels_shape = batch + (self.voxel_obs_dz, self.voxel_obs_dy, self.voxel_obs_dx)
+        if self.voxel_format == "packed" and self.n_vox_chan > 0:
+            voxels = np.empty(voxels_shape, dtype=VOXEL_DTYPE)
+        elif self.voxel_format == "classes" and self.n_vox_chan > 0:
+            voxels = np.empty(voxels_shape, dtype=np.uint8)
+        else:
+            voxels = np.empty(voxels_shape + (self.n_vox_chan,), dtype=np.uint32)
+        state = np.empty(batch + (1,), dtype=STATE_DTYPE)
+        return frame, voxels, state
+
+    def make_extra_buffers(self, batch_size: Optional[int] = None) -> dict[str, np.ndarray]:
+        """Allocates the buffers of the optional sections (e.g., `"depth"`) to be used with `recv_into`.
+
+        :param batch_size: If given, a leading batch dimension of this size is added to every buffer.
+        :returns: A dict with a buffer for each enabled optional section.
+        """
+        batch = () if batch_size is None else (batch_size,)
+        return {name: np.empty(batch + shape, dtype=dtype) for name, (_, shape, dtype) in self.extra_sections.items()}
+
+    def _section_buffers(self, frame, voxels, state, extra: Optional[dict] = None) -> list:
+        """Returns the list of buffers indexed by section expected by `mt_server`."""
+        by_section = {
+            SECTION_FRAME_DELTA if self.prev_frame is not None else SECTION_FRAME: frame,
+            SECTION_VOXELS_DELTA if self.prev_voxels is not None else SECTION_VOXELS: voxels,
+            SECTION_STATE: state,
+        }
+        for name, (section, _, _) in self.extra_sections.items():
+            by_section[section] = extra[name]
+        return [by_section.get(section) for section in range(max(by_section) + 1)]
+
+    def recv_into(self, frame: np.ndarray, voxels: Optional[np.ndarray], state: np.ndarray,
+                  extra: Optional[dict[str, np.ndarray]] = None):
+        """Receives the next message from MT directly into caller-owned buffers, without any
+        intermediate allocation or copy. Buffers must be writable and C-contiguous, so slices
+        of the batch arrays returned by `make_buffers(batch_size)` can be used (e.g. `frame[i]`
+        and `state[i]`).
+
+        Values in `state` are stored as sent by MT: position and velocity are scaled by
+        1000, and pitch and yaw by 100 (see `receive`).
+
+        The header of the message is checked against the negotiated sections, the size of the
+        buffers and the expected step counter, raising a `ConnectionError` on mismatch instead
+        of misparsing the message (e.g., if python and MT got desynchronized).
+
+        With the "delta" frame encoding, the frame is decoded (in C) against the previous one
+        and written into `frame`, and the same goes for the voxels with `voxel_delta`.
+
+        :param frame: Buffer of `img_height*img_width*n_chan` bytes for the image (empty without frame observations).
+        :param voxels: Buffer for the voxel observation. Can be `None` if voxel observations are disabled.
+        :param state: Buffer of a single `STATE_DTYPE` element for the remaining values.
+        :param extra: Buffers of the optional sections (see `make_extra_buffers`), if any is enabled.
+        :returns: The size in bytes of the received message.
+        """
+        buffers = self._section_buffers(frame, voxels, state, extra)
+        if self.shm is None:
+            n_bytes = mt_server.server_recv_into(self.connfd, self.step_counter, buffers, self.prev_frame,
+                                                 self.prev_voxels, self._delta_scratch)
+        else:
+            n_bytes = mt_server.server_recv_shm_into(self.connfd, self.shm.buf, self.rec_bytes, self.step_counter,
+                                                     buffers)
+        self.step_counter += 1
+        self.bytes_received += n_bytes
+        return n_bytes
 
     def receive(self):
-        img, vox_obs, pos, vel, pitch, yaw, dtime, reward, termination = mt_server.server_recv(
-            self.connfd,
-            self.rec_bytes,
-            self.img_width,
-            self.img_height,
-            self.n_chan,
-            self.n_vox_chan,
-            self.voxel_obs_dx,
-            self.voxel_obs_dy,
-            self.voxel_obs_dz,
-        )
-        return img, vox_obs, pos/1000., vel/1000., pitch/100., yaw/100., dtime, reward, termination # pos,vel / 1000 to match 1 unit = 1 node.
+        """Receives the next message from MT. The optional sections (see `make_extra_buffers`) of the
+        message are stored in `last_extra`."""
+        img, vox_obs, state = self.make_buffers()
+        self.last_extra = self.make_extra_buffers()
+        self.recv_into(img, vox_obs, state, self.last_extra)
+        return (img, vox_obs, *self.unpack_state(state))
 
-    def send(self, keys: list[int], mouse_x: int, mouse_y: int, soft_reset: bool = False, kill: bool = False):
+    @staticmethod
+    def unpack_state(state: np.ndarray):
+        """Converts a `STATE_DTYPE` buffer filled by `recv_into` into the values returned by `receive`.
+
+        :returns: A tuple with the position, velocity, pitch, yaw, dtime, reward and termination flag.
+        """
+        state = state.reshape(-1)[0]
+        # pos,vel / 1000 to match 1 unit = 1 node.
+        return (state["pos"]/1000., state["vel"]/1000., state["pitch"]/100., state["yaw"]/100.,
+                float(state["dtime"]), float(state["reward"]), bool(state["termination"]))
+
+    @staticmethod
+    def encode_action(keys: list[int], mouse_x: int, mouse_y: int, soft_reset: bool = False, kill: bool = False) -> bytes:
+        """Encodes an action as the message expected by MT."""
         assert len(keys) == 21, f"Keys list must be of length 21 and is {len(keys)}"
 
         mouse = list(struct.pack("<h", mouse_x)) + list(struct.pack("<h", mouse_y))
 
-        b = bytes(keys + mouse + [int(soft_reset)] + [int(kill)])
+        return bytes(keys + mouse + [int(soft_reset)] + [int(kill)])
+
+    def send(self, keys: list[int], mouse_x: int, mouse_y: int, soft_reset: bool = False, kill: bool = False):
+        assert self.action_table is None, "An action table is registered, actions must be sent with send_index"
+        mt_server.server_send(self.connfd, self.encode_action(keys, mouse_x, mouse_y, soft_reset, kill))
+
+    def send_index(self, index: int):
+        """Sends the index of an action of the registered table (see `set_action_table`), or one
+        of the reserved indices `ACTION_NOP`, `ACTION_SOFT_RESET` and `ACTION_KILL`."""
+        if 0 <= index < len(self.action_table):
+            msg = self._index_msgs[index]
+        elif ACTION_NODE_VOCABULARY <= index <= ACTION_KILL:
+            msg = self._index_msgs[len(self.action_table) + index - ACTION_NODE_VOCABULARY]
+        else:
+            raise ValueError(f"Invalid action index {index}: the action table has {len(self.action_table)} entries")
+        mt_server.server_send(self.connfd, msg)
 
-        mt_server.server_send(self.connfd, b)
+    def send_nop(self):
+        if self.action_table is None:
+            self.send(keys=[0]*21, mouse_x=0, mouse_y=0)
+        else:
+            self.send_index(ACTION_NOP)
 
     def send_soft_reset(self):
-        self.send(keys=[0]*21, mouse_x=0, mouse_y=0, soft_reset=True)
+        if self.action_table is None:
+            self.send(keys=[0]*21, mouse_x=0, mouse_y=0, soft_reset=True)
+        else:
+            self.send_index(ACTION_SOFT_RESET)
 
     def send_kill(self):
-        self.send(keys=[0]*21, mouse_x=0, mouse_y=0, kill=True)
+        if self.action_table is None:
+            self.send(keys=[0]*21, mouse_x=0, mouse_y=0, kill=True)
+        else:
+            self.send_index(ACTION_KILL)
+
+    def request_full_frame(self) -> np.ndarray:
+        """Requests the frame of the last received message at the resolution of MT's screen, before
+        its observation was downsampled to `img_width`x`img_height`. Must be called between receiving
+        a message and sending the next action, and only if `full_frame_size` was given.
+
+        :returns: An array of shape `(height, width, n_chan)` with the frame.
+        """
+        assert self.full_frame_size is not None, "Full resolution frames weren't requested (see `full_frame_size`)"
+        if self.action_table is None:
+            mt_server.server_send(self.connfd, bytes([0]*26 + [CMD_FULL_FRAME]))
+        else:
+            self.send_index(ACTION_FULL_FRAME)
+
+        width, height = self.full_frame_size
+        frame = np.empty((height, width, self.n_chan), dtype=np.uint8)
+        # the answer only includes the full frame section, with the step of the last message
+        buffers = [None] * SECTION_FULL_FRAME + [frame]
+        self.bytes_received += mt_server.server_recv_into(self.connfd, self.step_counter - 1, buffers)
+        return frame
+
+    def request_node_vocabulary(self) -> dict[int, str]:
+        """Requests the names of the nodes known by MT, which are needed to interpret the content IDs
+        of the voxel observation (these depend on the session). Like `request_full_frame`, must be
+        called between receiving a message and sending the next action.
+
+        :returns: A dict mapping each registered content ID to the name of its node.
+        """
+        if self.action_table is None:
+            mt_server.server_send(self.connfd, bytes([0]*26 + [CMD_NODE_VOCABULARY]))
+        else:
+            self.send_index(ACTION_NODE_VOCABULARY)
+
+        # the answer only includes the vocabulary section, with the step of the last message
+        vocabulary = np.empty(NODE_VOCABULARY_MAX_BYTES, dtype=np.uint8)
+        buffers = [None] * SECTION_NODE_VOCABULARY + [vocabulary]
+        n_bytes = mt_server.server_recv_into(self.connfd, self.step_counter - 1, buffers)
+        self.bytes_received += n_bytes
+        names = vocabulary[:n_bytes - HEADER_BYTES].tobytes().decode().split("\n")
+        return {content_id: name for content_id, name in enumerate(names) if name}
 
     def is_open(self):
         return self.connfd is not None
@@ -73,7 +434,17 @@ class MtChannel():
         """Close the MT connection and the listening server.
         """
         self.close_conn()
-        os.close(self.sockfd)
+        if self.sockfd is not None:
+            os.close(self.sockfd)
+            self.sockfd = None
+        if self.socket_path is not None:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.socket_path = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
 
     def close_conn(self):
         """Close the connection with MT, if it's open.
@@ -84,4 +455,56 @@ class MtChannel():
 
     def open_conn(self):
         self.close_conn()
+        assert self.sockfd is not None, "The server socket isn't bound, see `bind_unix`"
         self.connfd = mt_server.server_listen(self.sockfd, self.listen_timeout)
+        table = b"" if self.action_table is None else self.action_table.tobytes()
+        self.mt_sections = mt_server.server_handshake(self.connfd, self.sections, table)
+        self.step_counter = 0
+        if self.prev_frame is not None:
+            self.prev_frame.fill(0)  # MT encodes the first frame against an all zeros one
+        if self.prev_voxels is not None:
+            self.prev_voxels.fill(0)  # (and sends the first voxels as a keyframe)
+
+
+def step_batch(
+        channels: list[MtChannel],
+        actions: np.ndarray,
+        frames: np.ndarray,
+        voxels: Optional[np.ndarray],
+        states: np.ndarray,
+        extras: Optional[dict[str, np.ndarray]] = None,
+):
+    """Sends an action to each of the given MT instances and receives all their responses
+    in a single native call: all the actions are written first, and then the messages are
+    read (as they arrive) directly into the rows of the batch buffers. Thus, all the MT
+    instances render concurrently and there is no per-instance python overhead.
+
+    Only the "tcp" and "unix" transports, the "raw" frame encoding and non delta encoded voxels are
+    supported.
+
+    :param channels: The channels of the MT instances to step.
+    :param actions: A `(N, M)` uint8 matrix, where each row is an encoded action (see `MtChannel.encode_action`). If the channels have registered action tables, a `(N,)` uint16 array of action indices instead.
+    :param frames: Frames buffer with a leading dimension of size N (see `MtChannel.make_buffers`).
+    :param voxels: Voxels buffer with a leading dimension of size N, can be `None` if voxel observations are disabled.
+    :param states: `STATE_DTYPE` buffer with a leading dimension of size N.
+    :param extras: Buffers of the optional sections with a leading dimension of size N (see `MtChannel.make_extra_buffers`), if any is enabled.
+    """
+    assert all(c.shm is None for c in channels), "step_batch doesn't support the \"shm\" transport"
+    assert all(c.prev_frame is None for c in channels), "step_batch only supports the \"raw\" frame encoding"
+    assert all(c.prev_voxels is None for c in channels), "step_batch doesn't support delta encoded voxels"
+    steps = np.array([c.step_counter for c in channels], dtype=np.uint64)
+    mt_server.server_step_batch([c.connfd for c in channels], actions, steps,
+                                channels[0]._section_buffers(frames, voxels, states, extras))
+    for c in channels:
+        c.step_counter += 1
+        c.bytes_received += c.rec_bytes
+
+
+def unpack_voxels(voxels: np.ndarray) -> np.ndarray:
+    """Converts a voxel observation in the "packed" format (see `VOXEL_DTYPE`) into the "legacy" one:
+    a uint32 array with a trailing dimension of size 3 with the content ID, light and param2 of each
+    voxel. Arrays in the "legacy" (or "classes") format are returned as they are.
+    """
+    if voxels.dtype != VOXEL_DTYPE:
+        return voxels
+    return np.stack([voxels["id"], voxels["light"], voxels["param2"]], axis=-1).astype(np.uint32)
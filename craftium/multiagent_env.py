@@ -3,7 +3,7 @@ import time
 import signal
 from typing import Optional, Any
 
-from .craftium_env import ACTION_ORDER
+from .craftium_env import ACTION_ORDER, action_to_keys
 from .mt_channel import MtChannel
 from .minetest import MTServerOnly, MTClientOnly
 
@@ -132,12 +132,14 @@ class MarlCraftiumEnv():
         self.last_observations = [None]*num_agents
         self.timesteps = 0  # the timesteps counter
         self.current_agent_id = 0
+        self.waiting_step = False  # True between `step_async` and `step_wait`
 
     def _get_info(self):
         return dict()
 
     def reset(self, **kwargs):
         """Resets the environment."""
+        assert not self.waiting_step, "reset called with a pending step_async, call step_wait first"
 
         self.timesteps = 0
 
@@ -163,7 +165,7 @@ class MarlCraftiumEnv():
                 # TODO This "waiting" should be implemented in Minetest not in python
                 for _ in range(self.init_frames):
                     _observation, _voxobs, _pos, _vel, _pitch, _yaw, _dtime, _reward, _term = self.mt_channs[i].receive()
-                    self.mt_channs[i].send([0]*21, 0, 0)  # nop action
+                    self.mt_channs[i].send_nop()
 
                 # receive the new info from minetest
                 observation, _voxobs, _pos, _vel, _pitch, _yaw, _dtime, reward, _term = self.mt_channs[i].receive()
@@ -197,6 +199,7 @@ class MarlCraftiumEnv():
 
         :param action
         """
+        assert not self.waiting_step, "step_agent called with a pending step_async, call step_wait first"
         self.timesteps += 1
 
         if self.current_agent_id == self.num_agents:
@@ -204,19 +207,8 @@ class MarlCraftiumEnv():
         agent_id = self.current_agent_id
         self.current_agent_id += 1
 
-        # convert the action dict to a format to be sent to MT through mt_chann
-        keys = [0]*21  # all commands (keys) except the mouse
-        mouse_x, mouse_y = 0, 0
-        for k, v in action.items():
-            if k == "mouse":
-                x, y = v[0], -v[1]
-                mouse_x = int(x*(self.obs_width // 2))
-                mouse_y = int(y*(self.obs_height // 2))
-            else:
-                keys[ACTION_ORDER.index(k)] = v
-
         # send the action to MT
-        self.mt_channs[agent_id].send(keys, mouse_x, mouse_y)
+        self.mt_channs[agent_id].send(*action_to_keys(action, self.obs_width, self.obs_height))
 
         # receive the new info from minetest
         observation, _voxobs, _pos, _vel, _pitch, _yaw, _dtime, reward, termination = self.mt_channs[agent_id].receive()
@@ -237,6 +229,7 @@ class MarlCraftiumEnv():
         """
         assert len(
             actions) == self.num_agents, f"The number of actions ({len(actions)}) must match with the number of agents ({self.num_agents})"
+        assert not self.waiting_step, "step called with a pending step_async, call step_wait first"
 
         observations, rewards, terminations, truncations = [], [], [], []
         infos = dict()
@@ -257,6 +250,48 @@ class MarlCraftiumEnv():
         truncations = np.array(truncations)
         return observations, rewards, terminations, truncations, infos
 
+    def step_async(self, actions):
+        """Sends an action to each agent and returns without waiting for the resulting observations, which must be collected with `step_wait`. Meanwhile, the MT clients simulate the step concurrently, so the caller can do other work (e.g., run the policy).
+
+        :param actions: A list with an action per agent.
+        """
+        assert len(
+            actions) == self.num_agents, f"The number of actions ({len(actions)}) must match with the number of agents ({self.num_agents})"
+        assert not self.waiting_step, "step_async called twice without calling step_wait"
+
+        for agent_id in range(self.num_agents):
+            self.mt_channs[agent_id].send(*action_to_keys(actions[agent_id], self.obs_width, self.obs_height))
+        self.timesteps += self.num_agents
+        self.waiting_step = True
+
+    def step_wait(self):
+        """Waits for the step started by `step_async` to finish.
+
+        :returns: The same values as `step`.
+        """
+        assert self.waiting_step, "step_wait called without a pending step_async"
+        self.waiting_step = False
+
+        observations, rewards, terminations = [], [], []
+        for agent_id in range(self.num_agents):
+            observation, _voxobs, _pos, _vel, _pitch, _yaw, _dtime, reward, termination = self.mt_channs[agent_id].receive()
+            if not self.gray_scale_keepdim and not self.rgb_observations:
+                observation = observation[:, :, 0]
+            self.last_observations[agent_id] = observation
+            observations.append(observation)
+            rewards.append(reward)
+            terminations.append(termination)
+
+        truncated = self.max_timesteps is not None and self.timesteps >= self.max_timesteps
+
+        # stack the observations of each agent
+        observations = np.vstack([np.expand_dims(obs, 0)
+                                 for obs in observations])
+        rewards = np.array(rewards)
+        terminations = np.array(terminations)
+        truncations = np.full(self.num_agents, truncated)
+        return observations, rewards, terminations, truncations, self._get_info()
+
     def render(self):
         if self.render_mode == "rgb_array":
             return self.last_observations
@@ -0,0 +1,341 @@
+import json
+import socket
+import struct
+import traceback
+from typing import Optional, Union
+
+import numpy as np
+import gymnasium as gym
+from gymnasium.spaces import Space, Box, Discrete, MultiBinary, MultiDiscrete, Dict
+from gymnasium.vector import VectorEnv
+
+# Commands of the RPC protocol. Every request is a `REQUEST` header (command and payload size)
+# followed by the payload, and every response is a `RESPONSE` header (status and payload size)
+# followed by the payload.
+CMD_SPEC = 0
+CMD_RESET = 1
+CMD_STEP = 2
+CMD_CLOSE = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+REQUEST = struct.Struct("<BQ")
+RESPONSE = struct.Struct("<BQ")
+
+
+def space_to_dict(space: Space) -> dict:
+    """Converts a (single environment) space into a JSON serializable dict."""
+    if isinstance(space, Box):
+        # send the bounds as scalars if possible (e.g., image observations)
+        low = space.low.flat[0].item() if np.all(space.low == space.low.flat[0]) else space.low.tolist()
+        high = space.high.flat[0].item() if np.all(space.high == space.high.flat[0]) else space.high.tolist()
+        return dict(type="Box", low=low, high=high, shape=list(space.shape), dtype=space.dtype.str)
+    elif isinstance(space, Discrete):
+        return dict(type="Discrete", n=int(space.n), start=int(space.start))
+    elif isinstance(space, MultiBinary):
+        return dict(type="MultiBinary", n=np.asarray(space.n).tolist())
+    elif isinstance(space, MultiDiscrete):
+        return dict(type="MultiDiscrete", nvec=space.nvec.tolist())
+    elif isinstance(space, Dict):
+        return dict(type="Dict", spaces={k: space_to_dict(s) for k, s in space.spaces.items()})
+    raise ValueError(f"Spaces of type {type(space).__name__} can't be served")
+
+
+def space_from_dict(d: dict) -> Space:
+    """Inverse of `space_to_dict`."""
+    if d["type"] == "Box":
+        low = d["low"] if np.isscalar(d["low"]) else np.asarray(d["low"])
+        high = d["high"] if np.isscalar(d["high"]) else np.asarray(d["high"])
+        return Box(low=low, high=high, shape=tuple(d["shape"]), dtype=d["dtype"])
+    elif d["type"] == "Discrete":
+        return Discrete(d["n"], start=d["start"])
+    elif d["type"] == "MultiBinary":
+        return MultiBinary(d["n"])
+    elif d["type"] == "MultiDiscrete":
+        return MultiDiscrete(d["nvec"])
+    elif d["type"] == "Dict":
+        return Dict({k: space_from_dict(s) for k, s in d["spaces"].items()})
+    raise ValueError(f"Unknown space type: {d['type']}")
+
+
+def pack_arrays(arrays: dict[str, np.ndarray]) -> list:
+    """Packs a dict of arrays as a list of buffers: a small JSON header with the name, dtype and shape of each array, followed by the raw contents of the arrays."""
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    header = json.dumps([(k, v.dtype.str, v.shape) for k, v in arrays.items()]).encode()
+    return [struct.pack("<I", len(header)), header] + [v for v in arrays.values() if v.nbytes > 0]
+
+
+def unpack_arrays(buf: Union[bytes, bytearray, memoryview]) -> dict[str, np.ndarray]:
+    """Inverse of `pack_arrays`. The arrays are views of `buf`."""
+    buf = memoryview(buf)
+    header_size, = struct.unpack_from("<I", buf)
+    offset = 4 + header_size
+    arrays = {}
+    for name, dtype, shape in json.loads(bytes(buf[4:offset])):
+        dtype = np.dtype(dtype)
+        size = dtype.itemsize * int(np.prod(shape))
+        arrays[name] = np.frombuffer(buf[offset:offset+size], dtype=dtype).reshape(shape)
+        offset += size
+    return arrays
+
+
+def flatten_info(infos: dict) -> dict[str, np.ndarray]:
+    """Keeps the entries of a vector environment's info dict that can be sent as raw arrays. The final observations (of autoreset environments) are stacked, and entries holding a dict per environment (e.g., the `timing` of craftium environments) are split into an array per key of the dicts, named `"<entry>/<key>"` (see `unflatten_info`). Other entries of object dtype, including `final_info` and the values of the dicts that aren't numeric, are dropped."""
+    arrays = {}
+    for key, value in infos.items():
+        value = np.asarray(value)
+        if value.dtype != object:
+            arrays[key] = value
+        elif key == "final_observation":
+            ref = next(obs for obs in value if obs is not None)
+            arrays[key] = np.stack([np.zeros_like(ref) if obs is None else obs for obs in value])
+        elif key != "final_info" and all(d is None or isinstance(d, dict) for d in value):
+            for sub_key in dict.fromkeys(k for d in value if d is not None for k in d):
+                ref = np.asarray(next(d[sub_key] for d in value if d is not None and sub_key in d))
+                if ref.dtype != object:
+                    arrays[f"{key}/{sub_key}"] = np.stack([np.asarray(d[sub_key]) if d is not None and sub_key in d
+                                                           else np.zeros_like(ref) for d in value])
+    # drop the masks of the dropped entries
+    entries = {k.split("/", 1)[0] for k in arrays}
+    return {k: v for k, v in arrays.items() if not k.startswith("_") or k[1:] in entries}
+
+
+def unflatten_info(arrays: dict[str, np.ndarray]) -> dict:
+    """Inverse of `flatten_info` for the entries holding a dict per environment: the arrays named `"<entry>/<key>"` are gathered back into an object array with the dict of each environment (`None` for the environments masked out by `_<entry>`)."""
+    infos = {k: v for k, v in arrays.items() if "/" not in k}
+    for name in arrays:
+        entry = name.split("/", 1)[0]
+        if "/" not in name or entry in infos:
+            continue
+        keys = [k.split("/", 1)[1] for k in arrays if k.startswith(f"{entry}/")]
+        infos[entry] = np.full(len(arrays[name]), None, dtype=object)
+        for i in np.flatnonzero(infos[f"_{entry}"]):
+            infos[entry][i] = {key: arrays[f"{entry}/{key}"][i] for key in keys}
+    return infos
+
+
+def recv_exact(sock: socket.socket, buf: memoryview):
+    """Fills `buf` with data read from `sock`."""
+    while len(buf) > 0:
+        n = sock.recv_into(buf)
+        if n == 0:
+            raise ConnectionError("Connection closed by peer")
+        buf = buf[n:]
+
+
+def send_buffers(sock: socket.socket, buffers: list):
+    """Sends all the buffers with as few system calls as possible."""
+    views = [memoryview(b).cast("B") for b in buffers if len(memoryview(b).cast("B")) > 0]
+    while views:
+        n = sock.sendmsg(views)
+        while views and n >= len(views[0]):
+            n -= len(views[0])
+            views.pop(0)
+        if n > 0:
+            views[0] = views[0][n:]
+
+
+def send_message(sock: socket.socket, header: struct.Struct, kind: int, buffers: list):
+    size = sum(memoryview(b).nbytes for b in buffers)
+    send_buffers(sock, [header.pack(kind, size)] + buffers)
+
+
+def recv_header(sock: socket.socket, header: struct.Struct):
+    buf = bytearray(header.size)
+    recv_exact(sock, memoryview(buf))
+    return header.unpack(buf)
+
+
+class EnvServer():
+    """Serves a vector environment over a TCP socket, to be used from another process or host with `RemoteVectorEnv`. Clients are served one at a time, and the environments are kept alive between clients, until a client closes the server (see `RemoteVectorEnv.close`).
+
+    Observations and the other results are sent as raw contiguous buffers. Entries of the info dicts with object dtype are not sent, except the final observations of the environments that were autoreset and the entries holding a dict per environment with numeric values (e.g., `timing`), which are rebuilt by `RemoteVectorEnv`. In particular, `final_info` isn't sent.
+
+    :param envs: The vector environment to serve (e.g., a `ThreadedVectorEnv`).
+    :param host: Address where the server listens.
+    :param port: Port where the server listens. If `0`, a free port is chosen (see `EnvServer.port`).
+    """
+    def __init__(self, envs: VectorEnv, host: str = "127.0.0.1", port: int = 0):
+        self.envs = envs
+        self.sock = socket.create_server((host, port))
+        self.port = self.sock.getsockname()[1]
+
+    def serve_forever(self):
+        """Serves clients until one of them closes the server, then closes the environments."""
+        try:
+            while True:
+                conn, _addr = self.sock.accept()
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with conn:
+                    if not self._serve_client(conn):
+                        break
+        finally:
+            self.envs.close()
+            self.sock.close()
+
+    def _serve_client(self, conn: socket.socket) -> bool:
+        """Handles the requests of a client. Returns `False` if the client closed the server."""
+        while True:
+            try:
+                cmd, size = recv_header(conn, REQUEST)
+                payload = bytearray(size)
+                recv_exact(conn, memoryview(payload))
+            except ConnectionError:
+                return True  # the client disconnected
+
+            if cmd == CMD_CLOSE:
+                send_message(conn, RESPONSE, STATUS_OK, [])
+                return False
+
+            try:
+                response = self._handle(cmd, payload)
+            except Exception:
+                send_message(conn, RESPONSE, STATUS_ERROR, [traceback.format_exc().encode()])
+            else:
+                send_message(conn, RESPONSE, STATUS_OK, response)
+
+    def _handle(self, cmd: int, payload: bytearray) -> list:
+        if cmd == CMD_SPEC:
+            spec = dict(
+                num_envs=self.envs.num_envs,
+                observation_space=space_to_dict(self.envs.single_observation_space),
+                action_space=space_to_dict(self.envs.single_action_space),
+            )
+            return [json.dumps(spec).encode()]
+
+        elif cmd == CMD_RESET:
+            observations, infos = self.envs.reset(**json.loads(payload))
+            return [np.ascontiguousarray(observations)] + pack_arrays(flatten_info(infos))
+
+        elif cmd == CMD_STEP:
+            actions = unpack_arrays(payload)
+            actions = actions[""] if "" in actions else actions  # `Dict` action spaces are sent as several arrays
+            observations, rewards, terminations, truncations, infos = self.envs.step(actions)
+            results = {"@reward": rewards, "@terminated": terminations, "@truncated": truncations}
+            return [np.ascontiguousarray(observations)] + pack_arrays(results | flatten_info(infos))
+
+        raise ValueError(f"Unknown command: {cmd}")
+
+
+class RemoteVectorEnv(VectorEnv):
+    """A Gymnasium vector environment whose sub-environments run in one or more `EnvServer`s (e.g., started with `python -m craftium.serve`), possibly in different hosts. The requests are sent to all the servers before waiting for any response, so all the servers work concurrently.
+
+    :param addresses: The address (`"host:port"`) of a server, or a list of them. The sub-environments are ordered as the servers in this list.
+    :param copy: If `True`, `reset` and `step` return a copy of the observations.
+    :param close_servers: If `True`, closing this environment also closes the servers (and their environments).
+    """
+    def __init__(
+            self,
+            addresses: Union[str, list[str]],
+            copy: bool = True,
+            close_servers: bool = True,
+    ):
+        if isinstance(addresses, str):
+            addresses = [addresses]
+
+        self.socks = []
+        for address in addresses:
+            host, port = address.rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socks.append(sock)
+
+        # get the number of environments and the spaces of each server
+        specs = []
+        for sock in self.socks:
+            send_message(sock, REQUEST, CMD_SPEC, [])
+        for sock in self.socks:
+            specs.append(json.loads(self._recv_response(sock)))
+        assert all(s["observation_space"] == specs[0]["observation_space"] and s["action_space"] == specs[0]["action_space"]
+                   for s in specs), "All the servers must serve environments with the same spaces"
+
+        observation_space = space_from_dict(specs[0]["observation_space"])
+        action_space = space_from_dict(specs[0]["action_space"])
+        assert isinstance(observation_space, Box), "Only `Box` observation spaces are supported"
+        super().__init__(sum(s["num_envs"] for s in specs), observation_space, action_space)
+
+        # range of environments served by each server
+        bounds = np.cumsum([0] + [s["num_envs"] for s in specs])
+        self.ranges = list(zip(bounds[:-1], bounds[1:]))
+
+        # observations are received directly into this buffer
+        self.observations = np.empty((self.num_envs,) + observation_space.shape, dtype=observation_space.dtype)
+        self.copy = copy
+        self.close_servers = close_servers
+
+    def _recv_response(self, sock: socket.socket, observations: Optional[np.ndarray] = None) -> bytearray:
+        """Receives a response. If `observations` is given, the first part of the payload is received into it."""
+        status, size = recv_header(sock, RESPONSE)
+        if status == STATUS_OK and observations is not None:
+            recv_exact(sock, memoryview(observations).cast("B"))
+            size -= observations.nbytes
+        payload = bytearray(size)
+        recv_exact(sock, memoryview(payload))
+        if status != STATUS_OK:
+            raise RuntimeError(f"Error in the remote environment:\n{payload.decode()}")
+        return payload
+
+    def _recv_results(self) -> dict[str, np.ndarray]:
+        """Receives the observations and the results of all the servers, concatenating the results. If any server failed, the error is raised once the responses of all the servers have been received, so that none is left queued (and taken as the response of the next request)."""
+        results, errors = {}, []
+        for (start, end), sock in zip(self.ranges, self.socks):
+            try:
+                arrays = unpack_arrays(self._recv_response(sock, self.observations[start:end]))
+            except RuntimeError as e:
+                errors.append(e)
+                continue
+            for key, value in arrays.items():
+                if key not in results:  # missing entries are filled with zeros (and masked as False)
+                    results[key] = np.zeros((self.num_envs,) + value.shape[1:], dtype=value.dtype)
+                results[key][start:end] = value
+        if errors:
+            raise errors[0]
+        return results
+
+    def _get_observations(self) -> np.ndarray:
+        return self.observations.copy() if self.copy else self.observations
+
+    def reset_async(
+            self,
+            seed: Optional[Union[int, list[int]]] = None,
+            options: Optional[dict] = None,
+    ):
+        for (start, end), sock in zip(self.ranges, self.socks):
+            if isinstance(seed, list):
+                server_seed = seed[start:end]
+            else:
+                server_seed = None if seed is None else int(seed) + int(start)
+            request = json.dumps(dict(seed=server_seed, options=options)).encode()
+            send_message(sock, REQUEST, CMD_RESET, [request])
+
+    def reset_wait(
+            self,
+            seed: Optional[Union[int, list[int]]] = None,
+            options: Optional[dict] = None,
+    ):
+        infos = unflatten_info(self._recv_results())
+        return self._get_observations(), infos
+
+    def step_async(self, actions):
+        for (start, end), sock in zip(self.ranges, self.socks):
+            if isinstance(self.single_action_space, Dict):
+                arrays = {k: np.asarray(v)[start:end] for k, v in actions.items()}
+            else:
+                arrays = {"": np.asarray(actions)[start:end]}
+            send_message(sock, REQUEST, CMD_STEP, pack_arrays(arrays))
+
+    def step_wait(self, **kwargs):
+        infos = self._recv_results()
+        rewards = infos.pop("@reward")
+        terminations = infos.pop("@terminated")
+        truncations = infos.pop("@truncated")
+        return self._get_observations(), rewards, terminations, truncations, unflatten_info(infos)
+
+    def close_extras(self, **kwargs):
+        """Closes the connections with the servers (and the servers, if `close_servers` is `True`)."""
+        for sock in self.socks:
+            if self.close_servers:
+                send_message(sock, REQUEST, CMD_CLOSE, [])
+                self._recv_response(sock)
+            sock.close()
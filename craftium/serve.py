@@ -0,0 +1,40 @@
+import argparse
+import json
+
+import gymnasium as gym
+
+from .remote_env import EnvServer
+from .vector_env import ThreadedVectorEnv, BatchedVectorEnv
+
+# vector environments that can be served
+VECTOR_ENVS = {
+    "sync": gym.vector.SyncVectorEnv,
+    "threaded": ThreadedVectorEnv,
+    "batched": BatchedVectorEnv,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m craftium.serve",
+        description="Serves a pool of craftium environments, to be used with `craftium.RemoteVectorEnv`.")
+    parser.add_argument("--env-id", type=str, required=True, help="the id of the environment to serve")
+    parser.add_argument("--num-envs", type=int, default=1, help="number of environments to serve")
+    parser.add_argument("--vector-env", type=str, default="threaded", choices=list(VECTOR_ENVS.keys()),
+                        help="vector environment implementation used to run the environments")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="address where the server listens")
+    parser.add_argument("--port", type=int, default=5555, help="port where the server listens")
+    parser.add_argument("--env-kwargs", type=json.loads, default=dict(),
+                        help="extra arguments of the environments as a JSON dict, e.g., '{\"frameskip\": 4}'")
+    args = parser.parse_args()
+
+    envs = VECTOR_ENVS[args.vector_env](
+        [lambda: gym.make(args.env_id, **args.env_kwargs) for _ in range(args.num_envs)])
+    server = EnvServer(envs, host=args.host, port=args.port)
+
+    print(f"==> Serving {args.num_envs} {args.env_id} environments at {args.host}:{server.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
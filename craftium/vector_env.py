@@ -0,0 +1,229 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from gymnasium import Env, Wrapper, ActionWrapper
+from gymnasium.spaces import Space
+from gymnasium.vector import SyncVectorEnv
+from gymnasium.vector.utils import concatenate
+
+from .craftium_env import CraftiumEnv
+from .mt_channel import MtChannel, step_batch
+
+
+def unwrap_action(env: Env, action):
+    """Applies the transformations of all the `ActionWrapper`s wrapping a craftium environment to the given action."""
+    while isinstance(env, Wrapper):
+        if isinstance(env, ActionWrapper):
+            action = env.action(action)
+        env = env.env
+    return action
+
+
+class ThreadedVectorEnv(SyncVectorEnv):
+    """A Gymnasium vector environment that steps all its sub-environments concurrently, using a pool of threads inside the current process.
+
+    Craftium environments spend most of their step time waiting for Luanti, and the communication with Luanti releases the GIL while waiting. Thus, a single process can keep several Luanti instances busy at the same time without the pickling and subprocess overhead of [`AsyncVectorEnv`](https://gymnasium.farama.org/api/vector/#gymnasium.vector.AsyncVectorEnv). The API and the autoreset behavior are the same as in [`SyncVectorEnv`](https://gymnasium.farama.org/api/vector/#gymnasium.vector.SyncVectorEnv).
+
+    :param env_fns: Functions that create the environments.
+    :param observation_space: Observation space of a single environment. If `None`, the observation space of the first environment is used.
+    :param action_space: Action space of a single environment. If `None`, the action space of the first environment is used.
+    :param copy: If `True`, `reset` and `step` return a copy of the observations.
+    :param max_workers: Number of threads used to step the environments. Defaults to the number of environments.
+    """
+    def __init__(
+            self,
+            env_fns: Iterable[Callable[[], Env]],
+            observation_space: Optional[Space] = None,
+            action_space: Optional[Space] = None,
+            copy: bool = True,
+            max_workers: Optional[int] = None,
+    ):
+        super().__init__(env_fns, observation_space, action_space, copy)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.num_envs if max_workers is None else max_workers,
+            thread_name_prefix="craftium-env",
+        )
+
+    def _reset_env(self, env, seed, options):
+        kwargs = {}
+        if seed is not None:
+            kwargs["seed"] = seed
+        if options is not None:
+            kwargs["options"] = options
+        return env.reset(**kwargs)
+
+    def _step_env(self, env, action):
+        observation, reward, terminated, truncated, info = env.step(action)
+
+        if terminated or truncated:
+            old_observation, old_info = observation, info
+            observation, info = env.reset()
+            info["final_observation"] = old_observation
+            info["final_info"] = old_info
+
+        return observation, reward, terminated, truncated, info
+
+    def reset_wait(
+        self,
+        seed: Optional[int | list[int]] = None,
+        options: Optional[dict] = None,
+    ):
+        """Resets all the sub-environments concurrently.
+
+        :param seed: The seed of the first environment (the rest use consecutive seeds) or a list with one seed per environment.
+        :param options: Options dictionary passed to every environment's `reset`.
+        """
+        if seed is None:
+            seed = [None for _ in range(self.num_envs)]
+        if isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._terminateds[:] = False
+        self._truncateds[:] = False
+
+        results = self.executor.map(self._reset_env, self.envs, seed, [options]*self.num_envs)
+
+        observations, infos = [], {}
+        for i, (observation, info) in enumerate(results):
+            observations.append(observation)
+            infos = self._add_info(infos, info, i)
+
+        self.observations = concatenate(
+            self.single_observation_space, observations, self.observations
+        )
+
+        return (deepcopy(self.observations) if self.copy else self.observations), infos
+
+    def step_wait(self):
+        """Waits until all the sub-environments have been stepped (concurrently) and returns the batched results."""
+        results = self.executor.map(self._step_env, self.envs, self._actions)
+
+        observations, infos = [], {}
+        for i, (observation, reward, terminated, truncated, info) in enumerate(results):
+            self._rewards[i] = reward
+            self._terminateds[i] = terminated
+            self._truncateds[i] = truncated
+            observations.append(observation)
+            infos = self._add_info(infos, info, i)
+
+        self.observations = concatenate(
+            self.single_observation_space, observations, self.observations
+        )
+
+        return (
+            deepcopy(self.observations) if self.copy else self.observations,
+            np.copy(self._rewards),
+            np.copy(self._terminateds),
+            np.copy(self._truncateds),
+            infos,
+        )
+
+    def close_extras(self, **kwargs):
+        """Closes the thread pool and all the sub-environments."""
+        self.executor.shutdown(wait=True)
+        super().close_extras(**kwargs)
+
+
+class BatchedVectorEnv(ThreadedVectorEnv):
+    """A Gymnasium vector environment that steps all its craftium sub-environments with a single native call: the actions are sent to every Luanti instance first, and then all the observations are received (as they arrive) directly into a stacked `(N, H, W, C)` buffer. Thus, all the instances render concurrently and there is no per-environment python overhead in the communication.
+
+    Sub-environments must be `CraftiumEnv`s using the `"tcp"` or `"unix"` transports and the `"raw"` frame encoding, without delta encoded voxels nor pipelining. As steps bypass the `step` method of the sub-environments, only their `ActionWrapper`s (e.g., `DiscreteActionWrapper`) are applied; other wrappers should be applied to the vector environment instead. Resets (including autoresets) go through the sub-environments as usual, concurrently, as in `ThreadedVectorEnv`.
+
+    :param env_fns: Functions that create the environments.
+    :param observation_space: Observation space of a single environment. If `None`, the observation space of the first environment is used.
+    :param action_space: Action space of a single environment. If `None`, the action space of the first environment is used.
+    :param copy: If `True`, `reset` and `step` return a copy of the observations.
+    :param max_workers: Number of threads used to reset the environments. Defaults to the number of environments.
+    """
+    def __init__(
+            self,
+            env_fns: Iterable[Callable[[], Env]],
+            observation_space: Optional[Space] = None,
+            action_space: Optional[Space] = None,
+            copy: bool = True,
+            max_workers: Optional[int] = None,
+    ):
+        super().__init__(env_fns, observation_space, action_space, copy, max_workers)
+
+        self.craftium_envs = [env.unwrapped for env in self.envs]
+        assert all(isinstance(env, CraftiumEnv) for env in self.craftium_envs), \
+            "BatchedVectorEnv can only be used with craftium environments"
+        assert all(env.mt_chann.transport != "shm" for env in self.craftium_envs), \
+            "BatchedVectorEnv doesn't support the \"shm\" transport"
+        assert all(env.mt_chann.frame_encoding == "raw" for env in self.craftium_envs), \
+            "BatchedVectorEnv only supports the \"raw\" frame encoding"
+        assert all(env.mt_chann.prev_voxels is None for env in self.craftium_envs), \
+            "BatchedVectorEnv doesn't support delta encoded voxels (voxel_obs_delta=True)"
+        assert not any(env.pipelined for env in self.craftium_envs), \
+            "BatchedVectorEnv doesn't support pipelined environments (pipelined=True), use ThreadedVectorEnv instead"
+
+        # buffers where the messages of all the environments are received
+        self._frames, self._voxels, self._states = self.craftium_envs[0].mt_chann.make_buffers(batch_size=self.num_envs)
+        self._extras = self.craftium_envs[0].mt_chann.make_extra_buffers(batch_size=self.num_envs)
+
+        # with registered action tables (see `CraftiumEnv.register_actions`) only the indices are sent
+        self._indexed_actions = self.craftium_envs[0].mt_chann.action_table is not None
+        assert all((env.mt_chann.action_table is not None) == self._indexed_actions for env in self.craftium_envs), \
+            "Either all or none of the sub-environments must have a registered action table"
+        if self._indexed_actions:
+            self._action_msgs = np.zeros(self.num_envs, dtype="<u2")
+        else:
+            self._action_msgs = np.zeros((self.num_envs, len(MtChannel.encode_action([0]*21, 0, 0))), dtype=np.uint8)
+
+    def step_wait(self):
+        """Steps all the sub-environments with a single native call and returns the batched results."""
+        for i, (env, action) in enumerate(zip(self.envs, self._actions)):
+            action = unwrap_action(env, action)
+            if self._indexed_actions:
+                self._action_msgs[i] = action
+            else:
+                keys, mouse_x, mouse_y = self.craftium_envs[i]._action_to_keys(action)
+                self._action_msgs[i] = np.frombuffer(MtChannel.encode_action(keys, mouse_x, mouse_y), dtype=np.uint8)
+
+        step_batch([env.mt_chann for env in self.craftium_envs], self._action_msgs,
+                   self._frames, self._voxels, self._states, self._extras)
+
+        observations, env_infos = [], []
+        for i, env in enumerate(self.craftium_envs):
+            env.timesteps += 1
+            pos, vel, pitch, yaw, dtime, reward, terminated = MtChannel.unpack_state(self._states[i])
+            # the batch buffers are overwritten in the next step, so the frame (kept as the env's
+            # last_observation, e.g., for render), the voxels and the optional sections (returned in the
+            # observation or the info, which callers may keep) are copied out of them
+            extra = {name: buffer[i].copy() for name, buffer in self._extras.items()}
+            observation, info = env._process_observation(self._frames[i].copy(), self._voxels[i].copy(), pos, vel,
+                                                          pitch, yaw, dtime, extra)
+
+            self._rewards[i] = reward
+            self._terminateds[i] = terminated
+            self._truncateds[i] = env.max_timesteps is not None and env.timesteps >= env.max_timesteps
+            observations.append(observation)
+            env_infos.append(info)
+
+        # reset the environments that finished (concurrently)
+        done = np.flatnonzero(self._terminateds | self._truncateds)
+        for i, (observation, info) in zip(done, self.executor.map(lambda i: self.envs[i].reset(), done)):
+            # the batch buffers are overwritten in the next step, copy the final observation
+            info["final_observation"] = deepcopy(observations[i])
+            info["final_info"] = env_infos[i]
+            observations[i], env_infos[i] = observation, info
+
+        infos = {}
+        for i, info in enumerate(env_infos):
+            infos = self._add_info(infos, info, i)
+
+        self.observations = concatenate(
+            self.single_observation_space, observations, self.observations
+        )
+
+        return (
+            deepcopy(self.observations) if self.copy else self.observations,
+            np.copy(self._rewards),
+            np.copy(self._terminateds),
+            np.copy(self._truncateds),
+            infos,
+        )
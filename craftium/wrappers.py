@@ -2,7 +2,7 @@ import numpy as np
 from gymnasium import Wrapper, ActionWrapper, Env
 from gymnasium.spaces import MultiBinary, Discrete
 
-from .craftium_env import ACTION_ORDER
+from .craftium_env import ACTION_ORDER, CraftiumEnv
 
 
 def check_actions_valid(actions):
@@ -16,6 +16,15 @@ def check_actions_valid(actions):
         f"Invalid action given. Valid actions are: {valid_actions}"
 
 
+def can_register_actions(env):
+    """Checks if `env` wraps a craftium environment without any other `ActionWrapper` in between, where a table of actions can still be registered (see `CraftiumEnv.register_actions`)."""
+    while isinstance(env, Wrapper):
+        if isinstance(env, ActionWrapper):
+            return False
+        env = env.env
+    return isinstance(env, CraftiumEnv) and env.mt_chann.action_table is None and not env.mt_chann.is_open()
+
+
 def clip_mouse(m):
     mouse_mov = np.clip(m, 0., 1.)
     if m != mouse_mov:
@@ -73,6 +82,8 @@ class BinaryActionWrapper(ActionWrapper):
 class DiscreteActionWrapper(ActionWrapper):
     """A Gymnasium `ActionWrapper` that translates craftium's `Dict` action space into a discretized action space [`Discrete`](https://gymnasium.farama.org/api/spaces/fundamental/#gymnasium.spaces.Discrete).
 
+    If the wrapped environment is a `CraftiumEnv` (and the environment hasn't been reset yet), the actions are registered in Luanti (see `CraftiumEnv.register_actions`), so that only the index of the action is sent in each step.
+
     Unlike `DiscreteActionWrapper`, this wrapper adds an additional action to the action space in order to include the `NOP` action. This action is equivalent to `{}` in the `Dict` space or to a list of zeros in the `MultiBinary` space. The `NOP` action has index `0`, and the rest of the actions have the consecutive idexes. Thus, the number of actions of the environment will be `len(actions)+1`.
 
     :param env: The environment to wrap.
@@ -88,6 +99,10 @@ class DiscreteActionWrapper(ActionWrapper):
         self.action_space = Discrete(len(actions)+1)
         self.mouse_mov = clip_mouse(mouse_mov)
 
+        self.registered = can_register_actions(env)
+        if self.registered:
+            env.unwrapped.register_actions([self.process(i) for i in range(len(actions)+1)])
+
     def process(self, action):
         assert action >= 0 and action <= len(self.actions), \
             f"Action out of bound, got {action} but expected 0 <= action <= {len(self.actions)}"
@@ -120,6 +135,11 @@ class DiscreteActionWrapper(ActionWrapper):
     def action(self, action):
         if isinstance(action, list) or isinstance(action, np.ndarray):
             return [self.process(act) for act in action]
+        if self.registered:
+            # the environment takes the index of the action directly
+            assert action >= 0 and action <= len(self.actions), \
+                f"Action out of bound, got {action} but expected 0 <= action <= {len(self.actions)}"
+            return int(action)
         return self.process(action)
 
 def enu_to_nue(east, north, up):
@@ -128,7 +148,7 @@ def enu_to_nue(east, north, up):
 class NueToEnuVoxelObs(Wrapper):
     """A Gymnasium `Wrapper` that changes the order of the axes of the voxel_obs returned by info from NUE to ENU.
 
-    The voxel_obs is a 4D numpy array with shape (x, y, z, vox_channels) returned by Craftium environments.
+    The voxel_obs is a 4D numpy array with shape (x, y, z, vox_channels) returned by Craftium environments (3D without the channels, in the "packed" format).
     The original order of the axes  is (North, Up, East). This wrapper changes the order of the axes to (East, North, Up).
     :param env: The environment to wrap.
     """
@@ -153,8 +173,9 @@ class NueToEnuVoxelObs(Wrapper):
         return obs, reward, term, trunc, info
 
     def _apply_wrapper_single_env(self, info):
-        # NUEC -> ENUC
-        info["voxel_obs"] = info["voxel_obs"].transpose(2, 0, 1, 3)
+        # NUEC -> ENUC (or NUE -> ENU in the "packed" format)
+        voxel_obs = info["voxel_obs"]
+        info["voxel_obs"] = voxel_obs.transpose(2, 0, 1, *range(3, voxel_obs.ndim))
         # (3[nue],) -> (3[enu],)
         info["player_pos"] = info["player_pos"][[2, 0, 1]]
         info["player_vel"] = info["player_vel"][[2, 0, 1]]
@@ -164,7 +185,8 @@ class NueToEnuVoxelObs(Wrapper):
 
     def _apply_wrapper_vectorized_env(self, info):
         # need to account for the batch dimension, so BNUEC -> BENUC
-        info["voxel_obs"] = info["voxel_obs"].transpose(0, 3, 1, 2, 4)
+        voxel_obs = info["voxel_obs"]
+        info["voxel_obs"] = voxel_obs.transpose(0, 3, 1, 2, *range(4, voxel_obs.ndim))
         # (B, 3[nue]) -> (B, 3[enu])
         info["player_pos"] = info["player_pos"][:, [2, 0, 1]]
         info["player_vel"] = info["player_vel"][:, [2, 0, 1]]
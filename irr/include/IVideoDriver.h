@@ -1070,6 +1070,15 @@ class IVideoDriver : public virtual IReferenceCounted
 	/** \return An image created from the last rendered frame. */
 	virtual IImage *createScreenShot(video::ECOLOR_FORMAT format = video::ECF_UNKNOWN, video::E_RENDER_TARGET target = video::ERT_FRAME_BUFFER) = 0;
 
+	//! Read the last rendered frame into a caller-owned buffer.
+	/** Unlike createScreenShot(), no image is allocated: the pixels are
+	written as packed 8-bit RGB triplets, row by row from the top-left
+	corner of the screen.
+	\param dst Buffer of at least 3 * width * height bytes, where width
+	and height are given by getScreenSize().
+	\return True if successful, false if the driver doesn't support it. */
+	virtual bool readScreenRGB(u8 *dst) = 0;
+
 	//! Check if the image is already loaded.
 	/** Works similar to getTexture(), but does not load the texture
 	if it is not currently loaded.
@@ -1681,6 +1681,12 @@ IImage *CNullDriver::createScreenShot(video::ECOLOR_FORMAT format, video::E_REND
 	return 0;
 }
 
+//! Reads the last rendered frame as packed RGB
+bool CNullDriver::readScreenRGB(u8 *dst)
+{
+	return false;
+}
+
 // prints renderer version
 void CNullDriver::printVersion()
 {
@@ -491,6 +491,9 @@ class CNullDriver : public IVideoDriver, public IGPUProgrammingServices
 	//! Returns an image created from the last rendered frame.
 	IImage *createScreenShot(video::ECOLOR_FORMAT format = video::ECF_UNKNOWN, video::E_RENDER_TARGET target = video::ERT_FRAME_BUFFER) override;
 
+	//! Reads the last rendered frame as packed RGB
+	bool readScreenRGB(u8 *dst) override;
+
 	//! Writes the provided image to disk file
 	bool writeImageToFile(IImage *image, const io::path &filename, u32 param = 0) override;
 
@@ -2874,6 +2874,45 @@ IImage *COpenGLDriver::createScreenShot(video::ECOLOR_FORMAT format, video::E_RE
 	return newImage;
 }
 
+//! Reads the last rendered frame as packed RGB
+bool COpenGLDriver::readScreenRGB(u8 *dst)
+{
+	const u32 pitch = ScreenSize.Width * 3;
+	bool inverted = false;
+
+	// allows to read pixels in top-to-bottom order
+#ifdef GL_MESA_pack_invert
+	inverted = FeatureAvailable[IRR_MESA_pack_invert];
+	if (inverted)
+		glPixelStorei(GL_PACK_INVERT_MESA, GL_TRUE);
+#endif
+
+	glReadBuffer(Params.Doublebuffer ? GL_BACK : GL_FRONT);
+	glReadPixels(0, 0, ScreenSize.Width, ScreenSize.Height, GL_RGB, GL_UNSIGNED_BYTE, dst);
+	glReadBuffer(GL_BACK);
+
+#ifdef GL_MESA_pack_invert
+	if (inverted)
+		glPixelStorei(GL_PACK_INVERT_MESA, GL_FALSE);
+#endif
+
+	if (testGLError(__LINE__))
+		return false;
+
+	// opengl images are vertically flipped, so we have to fix that here.
+	if (!inverted && ScreenSize.Height > 1) {
+		ReadbackRow.resize(pitch);
+		u8 *p1 = dst;
+		u8 *p2 = dst + (ScreenSize.Height - 1) * pitch;
+		for (; p1 < p2; p1 += pitch, p2 -= pitch) {
+			memcpy(ReadbackRow.data(), p1, pitch);
+			memcpy(p1, p2, pitch);
+			memcpy(p2, ReadbackRow.data(), pitch);
+		}
+	}
+	return true;
+}
+
 core::dimension2du COpenGLDriver::getMaxTextureSize() const
 {
 	return core::dimension2du(MaxTextureSize, MaxTextureSize);
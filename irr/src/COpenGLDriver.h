@@ -274,6 +274,9 @@ class COpenGLDriver : public CNullDriver, public IMaterialRendererServices, publ
 	//! Returns an image created from the last rendered frame.
 	IImage *createScreenShot(video::ECOLOR_FORMAT format = video::ECF_UNKNOWN, video::E_RENDER_TARGET target = video::ERT_FRAME_BUFFER) override;
 
+	//! Reads the last rendered frame as packed RGB
+	bool readScreenRGB(u8 *dst) override;
+
 	//! checks if an OpenGL error has happened and prints it (+ some internal code which is usually the line number)
 	//! for performance reasons only available in debug mode
 	bool testGLError(int code = 0);
@@ -364,6 +367,9 @@ class COpenGLDriver : public CNullDriver, public IMaterialRendererServices, publ
 	core::matrix4 Matrices[ETS_COUNT];
 	core::array<u8> ColorBuffer;
 
+	//! row buffer used by readScreenRGB to flip the image
+	std::vector<u8> ReadbackRow;
+
 	//! enumeration for rendering modes such as 2d and 3d for minimizing the switching of renderStates.
 	enum E_RENDER_MODE
 	{
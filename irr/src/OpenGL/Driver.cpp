@@ -1869,6 +1869,31 @@ IImage *COpenGL3DriverBase::createScreenShot(video::ECOLOR_FORMAT format, video:
 	return newImage;
 }
 
+//! Reads the last rendered frame as packed RGB
+bool COpenGL3DriverBase::readScreenRGB(u8 *dst)
+{
+	const u32 width = ScreenSize.Width;
+	const u32 height = ScreenSize.Height;
+
+	// GL_RGBA is the only format that ReadPixels must support under ogl-es
+	ReadbackBuffer.resize(width * height * 4);
+	GL.ReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, ReadbackBuffer.data());
+	if (TEST_GL_ERROR(this))
+		return false;
+
+	// drop the alpha channel, flipping the rows as opengl images are vertically flipped
+	for (u32 y = 0; y < height; y++) {
+		const u8 *src = ReadbackBuffer.data() + (height - 1 - y) * width * 4;
+		u8 *row = dst + y * width * 3;
+		for (u32 x = 0; x < width; x++) {
+			row[3 * x] = src[4 * x];
+			row[3 * x + 1] = src[4 * x + 1];
+			row[3 * x + 2] = src[4 * x + 2];
+		}
+	}
+	return true;
+}
+
 void COpenGL3DriverBase::removeTexture(ITexture *texture)
 {
 	CacheHandler->getTextureCache().remove(texture);
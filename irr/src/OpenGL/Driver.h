@@ -226,6 +226,9 @@ class COpenGL3DriverBase : public CNullDriver, public IMaterialRendererServices,
 	//! Returns an image created from the last rendered frame.
 	IImage *createScreenShot(video::ECOLOR_FORMAT format = video::ECF_UNKNOWN, video::E_RENDER_TARGET target = video::ERT_FRAME_BUFFER) override;
 
+	//! Reads the last rendered frame as packed RGB
+	bool readScreenRGB(u8 *dst) override;
+
 	//! checks if an OpenGL error has happened and prints it, use via TEST_GL_ERROR().
 	// Does *nothing* unless in debug mode.
 	bool testGLError(const char *file, int line);
@@ -365,6 +368,9 @@ class COpenGL3DriverBase : public CNullDriver, public IMaterialRendererServices,
 
 	IContextManager *ContextManager;
 
+	//! persistent buffer where readScreenRGB reads the (RGBA) pixels
+	std::vector<u8> ReadbackBuffer;
+
 	void printTextureFormats();
 
 	bool EnableErrorTest;
@@ -13,6 +13,9 @@
 #include <unistd.h> // read(), write(), close()
 #include <poll.h>
 #include <stdint.h>
+#include <errno.h>
+#include <sys/epoll.h>
+#include <sys/un.h>
 
 #define SA struct sockaddr
 
@@ -113,6 +116,46 @@ static PyObject* init_server(PyObject* self, PyObject* args) { // , PyObject* ar
   return PyTuple_Pack(2, py_port, py_sockfd);
 }
 
+static PyObject* init_server_unix(PyObject* self, PyObject* args) {
+  int sockfd;
+  const char* path;
+  struct sockaddr_un servaddr;
+
+  if (!PyArg_ParseTuple(args, "s", &path)) {
+    PyErr_SetString(PyExc_TypeError, "Expected a string as argument: path");
+    return NULL;
+  }
+
+  if (strlen(path) >= sizeof(servaddr.sun_path)) {
+    PyErr_Format(PyExc_ValueError, "Unix socket path is too long (max. %d bytes): %s",
+                 (int)sizeof(servaddr.sun_path) - 1, path);
+    return NULL;
+  }
+
+  // socket create and verification
+  sockfd = socket(AF_UNIX, SOCK_STREAM, 0);
+  if (sockfd == -1) {
+    PyErr_SetString(PyExc_Exception, "Server socket creation failed");
+    return NULL;
+  }
+
+  bzero(&servaddr, sizeof(servaddr));
+  servaddr.sun_family = AF_UNIX;
+  strcpy(servaddr.sun_path, path);
+
+  // remove the socket file left by a previous run (if any), otherwise bind fails
+  unlink(path);
+
+  // Binding newly created socket to given path
+  if ((bind(sockfd, (SA*)&servaddr, sizeof(servaddr))) != 0) {
+    close(sockfd);
+    PyErr_SetString(PyExc_Exception, "Server socket bind failed");
+    return NULL;
+  }
+
+  return Py_BuildValue("i", sockfd);
+}
+
 static PyObject* server_listen(PyObject* self, PyObject* args) {
   int sockfd, connfd, len, res, timeout_ms;
   struct sockaddr_in cli;
@@ -132,7 +175,12 @@ static PyObject* server_listen(PyObject* self, PyObject* args) {
   pfd.events = POLLIN;
   pfd.revents = 0;
 
-  if ((res = poll(&pfd, 1, timeout_ms)) <= 0) {
+  // Release the GIL while waiting, so other python threads can keep running
+  Py_BEGIN_ALLOW_THREADS
+  res = poll(&pfd, 1, timeout_ms);
+  Py_END_ALLOW_THREADS
+
+  if (res <= 0) {
     if (res < 0)
       PyErr_SetString(PyExc_Exception, "Server socket poll failed");
     else
@@ -141,7 +189,9 @@ static PyObject* server_listen(PyObject* self, PyObject* args) {
   }
 
   len = sizeof(cli);
+  Py_BEGIN_ALLOW_THREADS
   connfd = accept(sockfd, (SA*)&cli, &len);
+  Py_END_ALLOW_THREADS
   if (connfd < 0) {
     PyErr_SetString(PyExc_Exception, "Server socket accept failed");
     return NULL;
@@ -152,6 +202,79 @@ static PyObject* server_listen(PyObject* self, PyObject* args) {
 
 #define BUFFER_SIZE 8192
 
+/*
+  Python<->MT message protocol (must match the definitions in src/client/craftium.h)
+
+  When MT connects, it sends a hello message with the protocol version and the sections it can
+  provide, and python answers with the sections it wants to receive. Then, every message sent by
+  MT starts with a fixed-size header with the protocol version, the sections included in the
+  message (a bit per section), a step counter and the size of each section, followed by the
+  included sections in increasing order of their index.
+
+  Right after its answer, python sends a table of actions (a u16 with the number of entries,
+  followed by the entries). If the table isn't empty, python sends the (u16) index of an action of
+  the table in each step instead of the full action.
+
+  The frame delta section holds the image XOR-ed with the previous one of the connection, encoded
+  as a sequence of runs: a u16 with the number of unchanged bytes, a u16 with the number of literal
+  bytes, and the literal bytes. Its size varies from message to message.
+
+  The voxels delta section holds the voxel observation relative to the previous one of the
+  connection: a msg_voxels_delta_t followed either by the whole grid (a keyframe), or by the voxels
+  that changed after translating the previous grid by `shift`, each as its (u32) index in the grid
+  and its new value. Its size varies from message to message too.
+
+  The node vocabulary section, only sent on request (in a message without any other section), holds
+  the names of the nodes separated by '\n', the i-th name being the one of content ID i (empty if
+  the ID isn't registered). Its size is only bounded by the size of the buffer it's received into.
+*/
+#define MSG_MAGIC 0x54465243u  // "CRFT"
+#define MSG_VERSION 1
+#define MSG_MAX_SECTIONS 16
+#define MSG_SECTION_FRAME_DELTA 3
+#define MSG_SECTION_VOXELS_DELTA 10
+#define MSG_SECTION_NODE_VOCABULARY 11
+
+// Upper bound of the size of the encoded delta of an image of n bytes
+#define MSG_DELTA_MAX_BYTES(n) ((n) + 4 * ((n) / 0xFFFF + 2))
+
+typedef struct {
+  uint32_t magic;
+  uint16_t version;
+  uint16_t sections;
+} msg_hello_t;
+
+typedef struct {
+  uint32_t magic;
+  uint16_t version;
+  uint16_t flags;
+  uint64_t step;
+  uint32_t sizes[MSG_MAX_SECTIONS];
+} msg_header_t;
+
+typedef struct {
+  uint8_t keyframe;    // 1 if the whole grid follows
+  uint8_t voxel_bytes; // size of each voxel
+  int16_t shift[3];    // translation (x, y, z) of the grid since the previous message
+  uint16_t dims[3];    // size (x, y, z) of the grid
+  uint16_t reserved;
+  uint32_t n_changes;  // number of changed voxels that follow, if not a keyframe
+} msg_voxels_delta_t;
+
+// Upper bound of the size of the voxels delta of a grid of n bytes (MT sends a keyframe instead
+// of a larger delta)
+#define MSG_VOXELS_DELTA_MAX_BYTES(n) ((Py_ssize_t)sizeof(msg_voxels_delta_t) + (n))
+
+// Status codes of the functions that receive messages from MT
+#define MSG_SOCKET_ERROR -1
+#define MSG_OK 0
+#define MSG_CLOSED 1
+#define MSG_BAD_MAGIC 2
+#define MSG_BAD_VERSION 3
+#define MSG_BAD_STEP 4
+#define MSG_BAD_SECTIONS 5
+#define MSG_BAD_SIZE 6
+
 int read_large_from_socket(int socket_fd, char *buffer, int total_size) {
     int bytes_received = 0;
     int total_bytes = 0;
@@ -180,136 +303,747 @@ int read_large_from_socket(int socket_fd, char *buffer, int total_size) {
     return total_bytes;
 }
 
-static PyObject* server_recv(PyObject* self, PyObject* args) {
-  int connfd, n_bytes, obs_width, obs_height, n_read, n_channels, n_vox_channels, voxel_x, voxel_y, voxel_z;
-  float dtime;
-  double reward;
-  int32_t yaw, pitch;
-  char *buff;
+// Reads exactly `size` bytes. Returns MSG_OK, MSG_SOCKET_ERROR or MSG_CLOSED.
+static int read_exact(int fd, char *buff, Py_ssize_t size) {
+  int n_read = read_large_from_socket(fd, buff, size);
+  if (n_read < 0)
+    return MSG_SOCKET_ERROR;
+  return n_read < size ? MSG_CLOSED : MSG_OK;
+}
+
+// Writes the whole buffer to the socket, retrying on partial writes
+static int write_all(int fd, const char *buff, Py_ssize_t size) {
+  Py_ssize_t total = 0, n;
+
+  while (total < size) {
+    n = write(fd, buff + total, size - total);
+    if (n < 0 && errno == EINTR)
+      continue;
+    if (n <= 0)
+      return -1;
+    total += n;
+  }
+  return 0;
+}
+
+/*
+  Checks that `h` is the header of the message python expects: the step counter must be `step`,
+  and the i-th section must be included only if `views[i]` isn't empty, with a size of
+  `views[i].len / n_rows` bytes (each buffer holds `n_rows` messages). The views of the frame and
+  voxels delta sections are the decoded image and grid, so these sections can't exceed the size
+  of an encoded image or grid.
+*/
+static int check_header(const msg_header_t *h, uint64_t step, const Py_buffer *views, int n_views, Py_ssize_t n_rows) {
+  Py_ssize_t size;
+
+  if (h->magic != MSG_MAGIC)
+    return MSG_BAD_MAGIC;
+  if (h->version != MSG_VERSION)
+    return MSG_BAD_VERSION;
+  if (h->step != step)
+    return MSG_BAD_STEP;
 
-  if (!PyArg_ParseTuple(args, "iiiiiiiii", &connfd, &n_bytes, &obs_width, &obs_height, &n_channels, &n_vox_channels, &voxel_x, &voxel_y, &voxel_z)) {
+  for (int i = 0; i < MSG_MAX_SECTIONS; i++) {
+    size = i < n_views ? views[i].len / n_rows : 0;
+    if (((h->flags >> i) & 1) != (size > 0))
+      return MSG_BAD_SECTIONS;
+    if (size > 0 && i == MSG_SECTION_FRAME_DELTA) {
+      if (h->sizes[i] > MSG_DELTA_MAX_BYTES(size))
+        return MSG_BAD_SIZE;
+    } else if (size > 0 && i == MSG_SECTION_VOXELS_DELTA) {
+      if (h->sizes[i] < sizeof(msg_voxels_delta_t) || h->sizes[i] > MSG_VOXELS_DELTA_MAX_BYTES(size))
+        return MSG_BAD_SIZE;
+    } else if (size > 0 && i == MSG_SECTION_NODE_VOCABULARY) {
+      if (h->sizes[i] > size)
+        return MSG_BAD_SIZE;
+    } else if (size > 0 && h->sizes[i] != size) {
+      return MSG_BAD_SIZE;
+    }
+  }
+  return MSG_OK;
+}
+
+// Sets the python exception corresponding to the given status code. `conn` is the index of
+// the failed connection in batched calls, or -1.
+static void set_msg_error(int status, const msg_header_t *h, uint64_t step, int conn) {
+  char where[32] = "";
+
+  if (conn >= 0)
+    snprintf(where, sizeof(where), " (connection %d)", conn);
+
+  switch (status) {
+  case MSG_SOCKET_ERROR:
+    PyErr_Format(PyExc_ConnectionError, "Failed to receive from MT%s, error reading from socket.", where);
+    break;
+  case MSG_CLOSED:
+    PyErr_Format(PyExc_ConnectionError, "Failed to receive from MT%s. Connection closed by peer: is MT down?", where);
+    break;
+  case MSG_BAD_MAGIC:
+    PyErr_Format(PyExc_ConnectionError, "Desynchronized with MT%s: invalid message header.", where);
+    break;
+  case MSG_BAD_VERSION:
+    PyErr_Format(PyExc_ConnectionError, "MT%s sent a message of protocol version %d, expected version %d.",
+                 where, (int)h->version, MSG_VERSION);
+    break;
+  case MSG_BAD_STEP:
+    PyErr_Format(PyExc_ConnectionError, "Desynchronized with MT%s: expected the message of step %llu, received step %llu.",
+                 where, (unsigned long long)step, (unsigned long long)h->step);
+    break;
+  case MSG_BAD_SECTIONS:
+    PyErr_Format(PyExc_ConnectionError, "Desynchronized with MT%s: received sections (0x%x) don't match the requested ones.",
+                 where, (int)h->flags);
+    break;
+  case MSG_BAD_SIZE:
+    PyErr_Format(PyExc_ConnectionError, "Desynchronized with MT%s: the size of a received section doesn't match its buffer.", where);
+    break;
+  }
+}
+
+#define ACTION_ENTRY_BYTES 8  // keys bitmask (u32), mouse x (i16) and mouse y (i16)
+
+static PyObject* server_handshake(PyObject* self, PyObject* args) {
+  int connfd, sections, status;
+  uint16_t n_actions;
+  msg_hello_t hello, reply;
+  Py_buffer table;
+
+  if (!PyArg_ParseTuple(args, "iiy*", &connfd, &sections, &table)) {
     PyErr_SetString(PyExc_TypeError,
-                    "Arguments must be 9 integers: connection's fd, num. of bytes to read, obs. width and height, num. channels, num. vox channels, voxel_obs x,y and z dims.");
+                    "Arguments are: connection's fd (int), the requested sections (int), and the action table (bytes-like).");
     return NULL;
   }
 
-  // Create the buffer where the received image+data will be stored
-  buff = (char*)malloc(n_bytes);
-  if (buff == NULL) {
-    PyErr_SetString(PyExc_Exception, "Failed to allocate memory for recv buffer");
+  if (table.len % ACTION_ENTRY_BYTES != 0 || table.len / ACTION_ENTRY_BYTES > 0xFFFF) {
+    PyBuffer_Release(&table);
+    PyErr_SetString(PyExc_ValueError, "Invalid action table");
+    return NULL;
+  }
+  n_actions = (uint16_t)(table.len / ACTION_ENTRY_BYTES);
+
+  // MT starts by telling the protocol version and the sections it can provide
+  Py_BEGIN_ALLOW_THREADS
+  status = read_exact(connfd, (char*)&hello, sizeof(hello));
+  Py_END_ALLOW_THREADS
+
+  if (status != MSG_OK) {
+    PyBuffer_Release(&table);
+    set_msg_error(status, NULL, 0, -1);
+    return NULL;
+  }
+  if (hello.magic != MSG_MAGIC) {
+    PyBuffer_Release(&table);
+    PyErr_SetString(PyExc_ConnectionError, "Invalid hello message received from MT");
+    return NULL;
+  }
+  if (hello.version != MSG_VERSION) {
+    PyBuffer_Release(&table);
+    PyErr_Format(PyExc_ConnectionError, "MT uses protocol version %d, but version %d is expected",
+                 (int)hello.version, MSG_VERSION);
+    return NULL;
+  }
+  if ((sections & ~(int)hello.sections) != 0) {
+    PyBuffer_Release(&table);
+    PyErr_Format(PyExc_ValueError, "MT can't provide the requested sections (requested: 0x%x, available: 0x%x)",
+                 sections, (int)hello.sections);
+    return NULL;
+  }
+
+  // Answer with the sections to be included in every message, and the action table
+  reply.magic = MSG_MAGIC;
+  reply.version = MSG_VERSION;
+  reply.sections = (uint16_t)sections;
+
+  Py_BEGIN_ALLOW_THREADS
+  status = write_all(connfd, (const char*)&reply, sizeof(reply));
+  if (status == 0)
+    status = write_all(connfd, (const char*)&n_actions, sizeof(n_actions));
+  if (status == 0)
+    status = write_all(connfd, (const char*)table.buf, table.len);
+  Py_END_ALLOW_THREADS
+
+  PyBuffer_Release(&table);
+
+  if (status < 0) {
+    PyErr_SetString(PyExc_ConnectionError, "Failed to send data to MT");
+    return NULL;
+  }
+
+  return PyLong_FromLong(hello.sections);
+}
+
+// Requests a writable, C-contiguous view of `obj`. `None` is accepted as an empty buffer.
+static int get_out_buffer(PyObject *obj, Py_buffer *view, const char *name) {
+  if (obj == Py_None) {
+    view->obj = NULL;
+    view->buf = NULL;
+    view->len = 0;
+    return 0;
+  }
+  if (PyObject_GetBuffer(obj, view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) {
+    PyErr_Format(PyExc_TypeError, "The %s buffer must be a writable and C-contiguous array", name);
+    return -1;
+  }
+  return 0;
+}
+
+static void release_out_buffers(Py_buffer *views, int n) {
+  for (int i = 0; i < n; i++) {
+    if (views[i].obj != NULL)
+      PyBuffer_Release(&views[i]);
+  }
+}
+
+// Gets the writable views of the buffers where the sections of a message are received. `buffers`
+// is a sequence indexed by section, with `None` (or an empty buffer) for the sections not received.
+static int get_section_buffers(PyObject *buffers, Py_buffer *views, int *n_views) {
+  PyObject *seq;
+  int n;
+
+  seq = PySequence_Fast(buffers, "The section buffers must be a sequence");
+  if (seq == NULL)
+    return -1;
+
+  n = PySequence_Fast_GET_SIZE(seq);
+  if (n > MSG_MAX_SECTIONS) {
+    Py_DECREF(seq);
+    PyErr_Format(PyExc_ValueError, "At most %d section buffers can be given", MSG_MAX_SECTIONS);
+    return -1;
+  }
+
+  for (int i = 0; i < n; i++) {
+    if (get_out_buffer(PySequence_Fast_GET_ITEM(seq, i), &views[i], "section") < 0) {
+      release_out_buffers(views, i);
+      Py_DECREF(seq);
+      return -1;
+    }
+  }
+  Py_DECREF(seq);
+
+  *n_views = n;
+  return 0;
+}
+
+// Returns true if the frame delta section is requested in `views`. Only supported by
+// `server_recv_into`.
+static int has_delta_view(const Py_buffer *views, int n_views) {
+  return n_views > MSG_SECTION_FRAME_DELTA && views[MSG_SECTION_FRAME_DELTA].len > 0;
+}
+
+// Same for the voxels delta section
+static int has_voxels_delta_view(const Py_buffer *views, int n_views) {
+  return n_views > MSG_SECTION_VOXELS_DELTA && views[MSG_SECTION_VOXELS_DELTA].len > 0;
+}
+
+// Applies the encoded delta `enc` to the `n` bytes image `ref`, in place. It doesn't need the
+// temporary buffer `tmp`.
+static int decode_frame_delta(const uint8_t *enc, Py_ssize_t enc_len, uint8_t *ref, Py_ssize_t n,
+                              uint8_t *tmp, Py_ssize_t tmp_len) {
+  Py_ssize_t i = 0, o = 0;
+  uint16_t run[2];
+
+  while (i < enc_len) {
+    if (i + (Py_ssize_t)sizeof(run) > enc_len)
+      return MSG_BAD_SIZE;
+    memcpy(run, enc + i, sizeof(run));
+    i += sizeof(run);
+
+    o += run[0];  // unchanged bytes
+    if (o + run[1] > n || i + run[1] > enc_len)
+      return MSG_BAD_SIZE;
+    for (int k = 0; k < run[1]; k++)
+      ref[o+k] ^= enc[i+k];
+    o += run[1];
+    i += run[1];
+  }
+  return MSG_OK;
+}
+
+// Applies the voxels delta `enc` to the `n` bytes grid `ref` (the previous one), in place. The
+// grid is copied into `tmp` to translate it, if it has at least `n` bytes, or into a temporary
+// buffer otherwise.
+static int decode_voxels_delta(const uint8_t *enc, Py_ssize_t enc_len, uint8_t *ref, Py_ssize_t n,
+                               uint8_t *tmp, Py_ssize_t tmp_len) {
+  msg_voxels_delta_t d;
+  Py_ssize_t vb, dx, dy, dz, x0, x1, pz, py;
+  uint32_t index;
+  uint8_t *prev;
+
+  if (enc_len < (Py_ssize_t)sizeof(d))
+    return MSG_BAD_SIZE;
+  memcpy(&d, enc, sizeof(d));
+  enc += sizeof(d);
+  enc_len -= sizeof(d);
+
+  vb = d.voxel_bytes;
+  dx = d.dims[0], dy = d.dims[1], dz = d.dims[2];
+  if (vb == 0 || dx*dy*dz*vb != n)
+    return MSG_BAD_SIZE;
+
+  if (d.keyframe) {
+    if (enc_len != n)
+      return MSG_BAD_SIZE;
+    memcpy(ref, enc, n);
+    return MSG_OK;
+  }
+  if (enc_len != (Py_ssize_t)d.n_changes * (Py_ssize_t)(sizeof(index) + vb))
+    return MSG_BAD_SIZE;
+
+  // Translate the grid: the voxel at (x, y, z) is the previous one at (x, y, z) + shift. The
+  // voxels without a previous value are always in the changes.
+  if (d.shift[0] != 0 || d.shift[1] != 0 || d.shift[2] != 0) {
+    if (tmp_len >= n)
+      prev = tmp;
+    else if ((prev = (uint8_t*)malloc(n)) == NULL)
+      return MSG_SOCKET_ERROR;
+    memcpy(prev, ref, n);
+    x0 = d.shift[0] < 0 ? -d.shift[0] : 0;
+    x1 = d.shift[0] > 0 ? dx - d.shift[0] : dx;
+    for (Py_ssize_t z = 0; z < dz && x0 < x1; z++) {
+      pz = z + d.shift[2];
+      if (pz < 0 || pz >= dz)
+        continue;
+      for (Py_ssize_t y = 0; y < dy; y++) {
+        py = y + d.shift[1];
+        if (py < 0 || py >= dy)
+          continue;
+        memcpy(ref + ((z*dy + y)*dx + x0)*vb, prev + ((pz*dy + py)*dx + x0 + d.shift[0])*vb, (x1 - x0)*vb);
+      }
+    }
+    if (prev != tmp)
+      free(prev);
+  }
+
+  for (uint32_t k = 0; k < d.n_changes; k++) {
+    memcpy(&index, enc, sizeof(index));
+    if ((Py_ssize_t)index >= dx*dy*dz)
+      return MSG_BAD_SIZE;
+    memcpy(ref + index*vb, enc + sizeof(index), vb);
+    enc += sizeof(index) + vb;
+  }
+  return MSG_OK;
+}
+
+typedef int (*delta_decoder_t)(const uint8_t *enc, Py_ssize_t enc_len, uint8_t *ref, Py_ssize_t n,
+                               uint8_t *tmp, Py_ssize_t tmp_len);
+
+// Receives a delta section of `size` bytes, decoding it with `decode` into `ref` (the previous
+// image or grid, updated in place) and copying the decoded one into `out`. The encoded section is
+// received into `scratch` if it fits, or into a temporary buffer otherwise, and the rest of
+// `scratch` is left to the decoder.
+static int recv_delta(int fd, uint32_t size, delta_decoder_t decode, Py_buffer *ref, Py_buffer *out,
+                      Py_buffer *scratch) {
+  int status;
+  uint8_t *enc, *tmp = (uint8_t*)scratch->buf;
+  Py_ssize_t tmp_len = scratch->len;
+
+  if (scratch->len >= (Py_ssize_t)size) {
+    enc = (uint8_t*)scratch->buf;
+    tmp += size;
+    tmp_len -= size;
+  } else if ((enc = (uint8_t*)malloc(size > 0 ? size : 1)) == NULL) {
+    return MSG_SOCKET_ERROR;
+  }
+
+  status = read_exact(fd, (char*)enc, size);
+  if (status == MSG_OK)
+    status = decode(enc, size, (uint8_t*)ref->buf, ref->len, tmp, tmp_len);
+  if (status == MSG_OK && out->buf != ref->buf)
+    memcpy(out->buf, ref->buf, out->len);
+
+  if (enc != scratch->buf)
+    free(enc);
+  return status;
+}
+
+// Receives the next message of step `step` from MT into the section buffers. The frame and voxels
+// delta sections are decoded against `ref` and `vox_ref`, receiving them into `scratch`. It doesn't
+// use the python API, so it can (and should) be called without holding the GIL.
+static int recv_message(int fd, uint64_t step, Py_buffer *views, int n_views, Py_buffer *ref, Py_buffer *vox_ref,
+                        Py_buffer *scratch, msg_header_t *h) {
+  int status;
+
+  status = read_exact(fd, (char*)h, sizeof(*h));
+  if (status == MSG_OK)
+    status = check_header(h, step, views, n_views, 1);
+
+  for (int i = 0; i < n_views && status == MSG_OK; i++) {
+    if (views[i].len > 0 && i == MSG_SECTION_FRAME_DELTA)
+      status = recv_delta(fd, h->sizes[i], decode_frame_delta, ref, &views[i], scratch);
+    else if (views[i].len > 0 && i == MSG_SECTION_VOXELS_DELTA)
+      status = recv_delta(fd, h->sizes[i], decode_voxels_delta, vox_ref, &views[i], scratch);
+    else if (views[i].len > 0 && i == MSG_SECTION_NODE_VOCABULARY)
+      status = read_exact(fd, (char*)views[i].buf, h->sizes[i]);
+    else if (views[i].len > 0)
+      status = read_exact(fd, (char*)views[i].buf, views[i].len);
+  }
+  return status;
+}
+
+// Returns the total size in bytes of the message with header `h`
+static PyObject* message_size(const msg_header_t *h) {
+  unsigned long long size = sizeof(*h);
+
+  for (int i = 0; i < MSG_MAX_SECTIONS; i++)
+    size += h->sizes[i];
+  return PyLong_FromUnsignedLongLong(size);
+}
+
+static PyObject* server_recv_into(PyObject* self, PyObject* args) {
+  int connfd, n_views, status;
+  unsigned long long step;
+  PyObject *buffers, *ref_obj = Py_None, *vox_ref_obj = Py_None, *scratch_obj = Py_None;
+  msg_header_t h;
+  Py_buffer ref, vox_ref, scratch, views[MSG_MAX_SECTIONS];
+
+  if (!PyArg_ParseTuple(args, "iKO|OOO", &connfd, &step, &buffers, &ref_obj, &vox_ref_obj, &scratch_obj)) {
+    PyErr_SetString(PyExc_TypeError,
+                    "Arguments are: connection's fd (int), the expected step (int), the sequence of section buffers, the previous frame (optional), the previous voxels (optional), and a scratch buffer for the delta sections (optional).");
+    return NULL;
+  }
+
+  if (get_section_buffers(buffers, views, &n_views) < 0)
+    return NULL;
+
+  // The frame delta section is decoded against the previous frame
+  if (get_out_buffer(ref_obj, &ref, "previous frame") < 0) {
+    release_out_buffers(views, n_views);
+    return NULL;
+  }
+  if (has_delta_view(views, n_views) && ref.len != views[MSG_SECTION_FRAME_DELTA].len) {
+    release_out_buffers(&ref, 1);
+    release_out_buffers(views, n_views);
+    PyErr_SetString(PyExc_ValueError, "The previous frame must have the size of the frame buffer");
+    return NULL;
+  }
+
+  // And the voxels delta section against the previous voxels
+  if (get_out_buffer(vox_ref_obj, &vox_ref, "previous voxels") < 0) {
+    release_out_buffers(&ref, 1);
+    release_out_buffers(views, n_views);
+    return NULL;
+  }
+  if (has_voxels_delta_view(views, n_views) && vox_ref.len != views[MSG_SECTION_VOXELS_DELTA].len) {
+    release_out_buffers(&vox_ref, 1);
+    release_out_buffers(&ref, 1);
+    release_out_buffers(views, n_views);
+    PyErr_SetString(PyExc_ValueError, "The previous voxels must have the size of the voxels buffer");
+    return NULL;
+  }
+
+  // The scratch buffer saves allocating one for each delta section received
+  if (get_out_buffer(scratch_obj, &scratch, "scratch") < 0) {
+    release_out_buffers(&vox_ref, 1);
+    release_out_buffers(&ref, 1);
+    release_out_buffers(views, n_views);
+    return NULL;
+  }
+
+  // The buffers are exported until released, so it's safe to fill them without the GIL
+  Py_BEGIN_ALLOW_THREADS
+  status = recv_message(connfd, step, views, n_views, &ref, &vox_ref, &scratch, &h);
+  Py_END_ALLOW_THREADS
+
+  release_out_buffers(&scratch, 1);
+  release_out_buffers(&vox_ref, 1);
+  release_out_buffers(&ref, 1);
+  release_out_buffers(views, n_views);
+
+  if (status != MSG_OK) {
+    if (status == MSG_CLOSED)
+      close(connfd);
+    set_msg_error(status, &h, step, -1);
+    return NULL;
+  }
+
+  return message_size(&h);
+}
+
+static PyObject* server_recv_shm_into(PyObject* self, PyObject* args) {
+  int connfd, n_bytes, n_views, status;
+  unsigned long long step;
+  unsigned char slot;
+  const char *msg;
+  PyObject *buffers;
+  msg_header_t h;
+  Py_buffer shm, views[MSG_MAX_SECTIONS];
+
+  if (!PyArg_ParseTuple(args, "iy*iKO", &connfd, &shm, &n_bytes, &step, &buffers)) {
+    PyErr_SetString(PyExc_TypeError,
+                    "Arguments are: connection's fd (int), the shared memory buffer, the slot size in bytes (int), the expected step (int), and the sequence of section buffers.");
+    return NULL;
+  }
+
+  if (get_section_buffers(buffers, views, &n_views) < 0) {
+    PyBuffer_Release(&shm);
+    return NULL;
+  }
+  if (has_delta_view(views, n_views) || has_voxels_delta_view(views, n_views)) {
+    release_out_buffers(views, n_views);
+    PyBuffer_Release(&shm);
+    PyErr_SetString(PyExc_ValueError, "The delta sections aren't supported with shared memory");
+    return NULL;
+  }
+
+  // MT writes the message into a slot of the shared ring and sends the slot's index
+  Py_BEGIN_ALLOW_THREADS
+  status = read_exact(connfd, (char*)&slot, 1);
+  if (status == MSG_OK && (Py_ssize_t)(slot + 1) * n_bytes > shm.len)
+    status = MSG_BAD_SIZE;
+  if (status == MSG_OK) {
+    msg = (const char*)shm.buf + (Py_ssize_t)slot * n_bytes;
+    memcpy(&h, msg, sizeof(h));
+    status = check_header(&h, step, views, n_views, 1);
+    msg += sizeof(h);
+  }
+  for (int i = 0; i < n_views && status == MSG_OK; i++) {
+    if (msg + views[i].len > (const char*)shm.buf + (Py_ssize_t)(slot + 1) * n_bytes) {
+      status = MSG_BAD_SIZE;
+      break;
+    }
+    if (views[i].len > 0)
+      memcpy(views[i].buf, msg, views[i].len);
+    msg += views[i].len;
+  }
+  Py_END_ALLOW_THREADS
+
+  release_out_buffers(views, n_views);
+  PyBuffer_Release(&shm);
+
+  if (status != MSG_OK) {
+    if (status == MSG_CLOSED)
+      close(connfd);
+    set_msg_error(status, &h, step, -1);
+    return NULL;
+  }
+
+  return message_size(&h);
+}
+
+#define MAX_EPOLL_EVENTS 64
+
+/*
+  Receives one message from each of the `n` connections, using epoll to read from whichever
+  connection has data available. The header of the message of the i-th connection is stored in
+  `headers[i]`, and its sections in the i-th row of the corresponding buffer in `views`. The
+  header is checked as soon as it's received, expecting the step counter in `steps[i]`, which is
+  incremented if all the messages are received successfully.
+
+  Returns a status code (MSG_OK on success). On failure, the index of the connection is stored in
+  `failed`.
+*/
+static int recv_batch(const int *fds, int n, uint64_t *steps, Py_buffer *views, int n_views,
+                      msg_header_t *headers, Py_ssize_t *progress, int *failed) {
+  struct epoll_event ev, events[MAX_EPOLL_EVENTS];
+  Py_ssize_t sizes[MSG_MAX_SECTIONS], msg_size, off, len, n_read;
+  int epfd, n_events, i, k, pending = n, status = MSG_OK;
+  char *dst;
+
+  msg_size = sizeof(msg_header_t);
+  for (k = 0; k < n_views; k++) {
+    sizes[k] = views[k].len / n;
+    msg_size += sizes[k];
+  }
+
+  if ((epfd = epoll_create1(0)) < 0)
+    return MSG_SOCKET_ERROR;
+
+  for (i = 0; i < n; i++) {
+    progress[i] = 0;
+    ev.events = EPOLLIN;
+    ev.data.u32 = i;
+    if (epoll_ctl(epfd, EPOLL_CTL_ADD, fds[i], &ev) < 0) {
+      *failed = i;
+      close(epfd);
+      return MSG_SOCKET_ERROR;
+    }
+  }
+
+  while (pending > 0 && status == MSG_OK) {
+    n_events = epoll_wait(epfd, events, MAX_EPOLL_EVENTS, -1);
+    if (n_events < 0) {
+      if (errno == EINTR)
+        continue;
+      status = MSG_SOCKET_ERROR;
+      break;
+    }
+
+    for (int e = 0; e < n_events && status == MSG_OK; e++) {
+      i = events[e].data.u32;
+
+      // Read everything available for this connection without blocking
+      while (progress[i] < msg_size) {
+        // Find the part of the message (the header or a section) where the next bytes go
+        off = progress[i];
+        if (off < (Py_ssize_t)sizeof(msg_header_t)) {
+          dst = (char*)&headers[i] + off;
+          len = sizeof(msg_header_t) - off;
+        } else {
+          off -= sizeof(msg_header_t);
+          k = 0;
+          while (off >= sizes[k]) {
+            off -= sizes[k];
+            k++;
+          }
+          dst = (char*)views[k].buf + i*sizes[k] + off;
+          len = sizes[k] - off;
+        }
+
+        n_read = recv(fds[i], dst, len, MSG_DONTWAIT);
+        if (n_read < 0) {
+          if (errno == EINTR)
+            continue;
+          if (errno != EAGAIN && errno != EWOULDBLOCK) {
+            status = MSG_SOCKET_ERROR;
+            *failed = i;
+          }
+          break;
+        } else if (n_read == 0) {
+          status = MSG_CLOSED;
+          *failed = i;
+          break;
+        }
+        progress[i] += n_read;
+
+        // Check the header before reading the sections
+        if (progress[i] == sizeof(msg_header_t)) {
+          status = check_header(&headers[i], steps[i], views, n_views, n);
+          if (status != MSG_OK) {
+            *failed = i;
+            break;
+          }
+        }
+      }
+
+      if (status == MSG_OK && progress[i] == msg_size) {
+        epoll_ctl(epfd, EPOLL_CTL_DEL, fds[i], NULL);
+        pending--;
+      }
+    }
+  }
+
+  close(epfd);
+
+  if (status == MSG_OK) {
+    for (i = 0; i < n; i++)
+      steps[i]++;
+  }
+  return status;
+}
+
+static PyObject* server_step_batch(PyObject* self, PyObject* args) {
+  int n, n_views, status, sent, failed = -1;
+  int *fds;
+  Py_ssize_t action_size, *progress;
+  PyObject *fds_obj, *fds_seq, *steps_obj, *buffers;
+  msg_header_t *headers;
+  Py_buffer actions, steps, views[MSG_MAX_SECTIONS];
+
+  if (!PyArg_ParseTuple(args, "Oy*OO", &fds_obj, &actions, &steps_obj, &buffers)) {
+    PyErr_SetString(PyExc_TypeError,
+                    "Arguments are: a sequence of connection fds, the actions matrix, the expected steps (uint64 array), and the sequence of section buffers.");
+    return NULL;
+  }
+
+  fds_seq = PySequence_Fast(fds_obj, "The connection fds must be a sequence of integers");
+  if (fds_seq == NULL) {
+    PyBuffer_Release(&actions);
     return NULL;
   }
-
-  n_read = read_large_from_socket(connfd, buff, n_bytes);
-
-  if (n_read < 0) {
-    free(buff);
-    PyErr_SetString(PyExc_ConnectionError, "Failed to receive from MT, error reading from socket.");
-    return NULL;
-  } else if (n_read == 0) {
-    free(buff);
-    close(connfd);
-    PyErr_SetString(PyExc_ConnectionError, "Failed to receive from MT. Connection closed by peer: is MT down?");
-    return NULL;
-  }
-
-  // Retrieve the termination flag and reward
-  int termination = (int) buff[n_bytes-1];
-  PyObject* py_termination = PyBool_FromLong(termination);
-
-  memcpy(&reward, &buff[n_bytes-9], sizeof(reward));
-  PyObject* py_reward = PyFloat_FromDouble(reward);
-
-  // Retrieve the delta time
-  memcpy(&dtime, &buff[n_bytes-13], sizeof(dtime));
-  PyObject* py_dtime = PyFloat_FromDouble((double)dtime);
-
-  // Retrieve backwards the yaw [4], pitch [4], velocity [12] and position [12] = 32 bytes
-  float* array_pos_data = (float*)malloc(3 * sizeof(float));
-  float* array_vel_data = (float*)malloc(3 * sizeof(float));
-  memcpy(&yaw, &buff[n_bytes-17], sizeof(int32_t));
-  memcpy(&pitch, &buff[n_bytes-21], sizeof(int32_t));
-  memcpy(array_vel_data, &buff[n_bytes-33], 3 * sizeof(float));
-  memcpy(array_pos_data, &buff[n_bytes-45], 3 * sizeof(float));
-  npy_intp dims_v3f[1] = {3};
-  PyObject* pyarray_pos = PyArray_SimpleNewFromData(1, dims_v3f, NPY_FLOAT32, array_pos_data);
-  PyObject* pyarray_vel = PyArray_SimpleNewFromData(1, dims_v3f, NPY_FLOAT32, array_vel_data);
-  PyObject* py_pitch = PyLong_FromSsize_t(pitch);
-  PyObject* py_yaw = PyLong_FromSsize_t(yaw);
-
-  // Create separate memory allocations for the RGB and voxel data
-  char* array_rgb_data = (char*)malloc(obs_height * obs_width * n_channels);
-  uint32_t* array_vox_data = (uint32_t*)malloc(voxel_x * voxel_y * voxel_z * n_vox_channels * sizeof(uint32_t));
-
-  if (!array_rgb_data || !array_vox_data) {
-    free(buff);
-    free(array_rgb_data);
-    free(array_vox_data);
-    free(array_pos_data);
-    free(array_vel_data);
-    Py_XDECREF(py_termination);
-    Py_XDECREF(py_reward);
-    Py_XDECREF(py_dtime);
-    Py_XDECREF(pyarray_pos);
-    Py_XDECREF(pyarray_vel);
-    Py_XDECREF(py_pitch);
-    Py_XDECREF(py_yaw);
-    PyErr_SetString(PyExc_Exception, "Failed to allocate memory for array data");
-    return NULL;
-  }
-
-  // Copy the RGB data
-  memcpy(array_rgb_data, buff, obs_height * obs_width * n_channels);
-  // Copy the voxel data, converting from bytes to uint32_t
-  memcpy(array_vox_data, buff + obs_height * obs_width * n_channels,
-         voxel_x * voxel_y * voxel_z * n_vox_channels * sizeof(uint32_t));
-
-  // Free the original buffer as we no longer need it
-  free(buff);
-
-  // Create the numpy arrays with their own separate memory
-  npy_intp dims[3] = {obs_height, obs_width, n_channels};
-  PyObject* pyarray_rgb = PyArray_SimpleNewFromData(3, dims, NPY_UINT8, array_rgb_data);
-
-  npy_intp dims_vox[4] = {voxel_z, voxel_y, voxel_x, n_vox_channels};
-  PyObject* pyarray_vox = PyArray_SimpleNewFromData(4, dims_vox, NPY_UINT32, array_vox_data);
-
-  if (!pyarray_rgb || !pyarray_vox) {
-    free(array_rgb_data);
-    free(array_vox_data);
-    Py_XDECREF(pyarray_rgb);
-    Py_XDECREF(pyarray_vox);
-    Py_XDECREF(py_termination);
-    Py_XDECREF(py_reward);
-    Py_XDECREF(py_dtime);
-    Py_XDECREF(pyarray_pos);
-    Py_XDECREF(pyarray_vel);
-    Py_XDECREF(py_pitch);
-    Py_XDECREF(py_yaw);
-    PyErr_SetString(PyExc_RuntimeError, "Failed to create NumPy array");
-    return NULL;
-  }
-
-  // Now it's safe to enable OWNDATA as each array has its own allocation
-  PyArray_ENABLEFLAGS((PyArrayObject*)pyarray_pos, NPY_ARRAY_OWNDATA);
-  PyArray_ENABLEFLAGS((PyArrayObject*)pyarray_vel, NPY_ARRAY_OWNDATA);
-  PyArray_ENABLEFLAGS((PyArrayObject*)pyarray_rgb, NPY_ARRAY_OWNDATA);
-  PyArray_ENABLEFLAGS((PyArrayObject*)pyarray_vox, NPY_ARRAY_OWNDATA);
-
-  PyObject* tuple = PyTuple_Pack(9, pyarray_rgb, pyarray_vox, pyarray_pos, pyarray_vel, py_pitch, py_yaw, py_dtime, py_reward, py_termination);
-
-  // Safe to DECREF everything as tuple has increased their reference counts
-  Py_DECREF(py_reward);
-  Py_DECREF(py_dtime);
-  Py_DECREF(py_termination);
-  Py_DECREF(pyarray_pos);
-  Py_DECREF(pyarray_vel);
-  Py_DECREF(py_pitch);
-  Py_DECREF(py_yaw);
-  Py_DECREF(pyarray_rgb);
-  Py_DECREF(pyarray_vox);
-
-  return tuple;
+
+  n = PySequence_Fast_GET_SIZE(fds_seq);
+  if (n == 0 || actions.len % n != 0) {
+    Py_DECREF(fds_seq);
+    PyBuffer_Release(&actions);
+    PyErr_SetString(PyExc_ValueError, "The actions matrix must have one row per connection");
+    return NULL;
+  }
+  action_size = actions.len / n;
+
+  fds = (int*)malloc(n * sizeof(int));
+  progress = (Py_ssize_t*)malloc(n * sizeof(Py_ssize_t));
+  headers = (msg_header_t*)malloc(n * sizeof(msg_header_t));
+  if (!fds || !progress || !headers) {
+    free(fds);
+    free(progress);
+    free(headers);
+    Py_DECREF(fds_seq);
+    PyBuffer_Release(&actions);
+    return PyErr_NoMemory();
+  }
+
+  for (int i = 0; i < n; i++)
+    fds[i] = (int)PyLong_AsLong(PySequence_Fast_GET_ITEM(fds_seq, i));
+  Py_DECREF(fds_seq);
+
+  if (PyErr_Occurred())
+    goto fail_args;
+
+  if (get_out_buffer(steps_obj, &steps, "steps") < 0)
+    goto fail_args;
+  if (steps.len != (Py_ssize_t)(n * sizeof(uint64_t))) {
+    release_out_buffers(&steps, 1);
+    PyErr_SetString(PyExc_ValueError, "The steps buffer must have one uint64 per connection");
+    goto fail_args;
+  }
+
+  if (get_section_buffers(buffers, views, &n_views) < 0) {
+    release_out_buffers(&steps, 1);
+    goto fail_args;
+  }
+  for (int k = 0; k < n_views; k++) {
+    if (views[k].len % n != 0) {
+      release_out_buffers(views, n_views);
+      release_out_buffers(&steps, 1);
+      PyErr_SetString(PyExc_ValueError, "The section buffers must have one row per connection");
+      goto fail_args;
+    }
+  }
+  if (has_delta_view(views, n_views) || has_voxels_delta_view(views, n_views)) {
+    release_out_buffers(views, n_views);
+    release_out_buffers(&steps, 1);
+    PyErr_SetString(PyExc_ValueError, "The delta sections aren't supported in batched steps");
+    goto fail_args;
+  }
+
+  Py_BEGIN_ALLOW_THREADS
+  // Send all the actions first, so every MT instance works concurrently while we wait
+  status = MSG_OK;
+  for (int i = 0; i < n && status == MSG_OK; i++) {
+    if (write_all(fds[i], (const char*)actions.buf + i*action_size, action_size) < 0) {
+      status = MSG_SOCKET_ERROR;
+      failed = i;
+    }
+  }
+  sent = status == MSG_OK;
+  if (sent)
+    status = recv_batch(fds, n, (uint64_t*)steps.buf, views, n_views, headers, progress, &failed);
+  Py_END_ALLOW_THREADS
+
+  if (status != MSG_OK) {
+    if (!sent)
+      PyErr_Format(PyExc_ConnectionError, "Failed to send data to MT (connection %d)", failed);
+    else
+      set_msg_error(status, failed >= 0 ? &headers[failed] : NULL,
+                    failed >= 0 ? ((uint64_t*)steps.buf)[failed] : 0, failed);
+  }
+
+  release_out_buffers(views, n_views);
+  release_out_buffers(&steps, 1);
+  PyBuffer_Release(&actions);
+  free(fds);
+  free(progress);
+  free(headers);
+
+  if (status != MSG_OK)
+    return NULL;
+  return Py_BuildValue("");
+
+fail_args:
+  PyBuffer_Release(&actions);
+  free(fds);
+  free(progress);
+  free(headers);
+  return NULL;
 }
 
 static PyObject* server_send(PyObject* self, PyObject* args) {
@@ -335,7 +1069,10 @@ static PyObject* server_send(PyObject* self, PyObject* args) {
     return NULL;
   }
 
+  // `bytes_obj` is kept alive by `args`, so `buff` stays valid without the GIL
+  Py_BEGIN_ALLOW_THREADS
   n_send = write(connfd, buff, size);
+  Py_END_ALLOW_THREADS
   if (n_send <= 0) {
     PyErr_SetString(PyExc_ConnectionError, "Failed to send data to MT");
     return NULL;
@@ -346,9 +1083,13 @@ static PyObject* server_send(PyObject* self, PyObject* args) {
 // Method definitions
 static PyMethodDef MyMethods[] = {
     {"init_server", init_server, METH_VARARGS, "Initialize the MT server"},
+    {"init_server_unix", init_server_unix, METH_VARARGS, "Initialize the MT server on a unix domain socket"},
     {"server_listen", server_listen, METH_VARARGS, "Listen for MT to connect"},
-    {"server_recv", server_recv, METH_VARARGS, "Receive message from MT"},
+    {"server_handshake", server_handshake, METH_VARARGS, "Negotiate the message sections with MT"},
+    {"server_recv_into", server_recv_into, METH_VARARGS, "Receive message from MT into preallocated buffers"},
+    {"server_recv_shm_into", server_recv_shm_into, METH_VARARGS, "Receive message from MT through shared memory into preallocated buffers"},
     {"server_send", server_send, METH_VARARGS, "Sends a message to MT"},
+    {"server_step_batch", server_step_batch, METH_VARARGS, "Sends an action to each of several MT instances and receives all their messages"},
     {NULL, NULL, 0, NULL}
 };
 
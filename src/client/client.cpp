@@ -59,6 +59,9 @@
 #include "craftium.h"
 #include "gui/mainmenumanager.h"
 #include <chrono>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <sys/un.h>
 
 extern gui::IGUIEnvironment* guienv;
 
@@ -149,10 +152,25 @@ void Client::startPyConn()
 {
     // Get the frameskip parameter from the settings
     frameskip = g_settings->getU32("frameskip");
+    skip_frame_rendering = !g_settings->getBool("render_skipped_frames");
+    frameskip_pool = std::clamp<int>(g_settings->getU32("frameskip_max_pool"), 1, std::max(frameskip, 1));
+    frameskip_reward_sum = g_settings->getBool("frameskip_reward_sum");
+    lockstep_dtime = std::max(g_settings->getFloat("lockstep_dtime"), 0.0f);
 
     // Get the craftium port from the config file
     py_port = g_settings->getU32("craftium_port");
 
+    // Observations are sent through the socket unless the shm transport is selected
+    py_shm = g_settings->get("craftium_transport") == "shm";
+
+    // A unix domain socket is used instead of TCP if a socket path is given
+    std::string socket_path = g_settings->get("craftium_socket_path");
+    if (!socket_path.empty()) {
+        startPyConnUnix(socket_path);
+        pyConnHandshake();
+        return;
+    }
+
     printf("[*] Minetest using port %d to communicate with craftium\n", py_port);
 
     // Create socket file descriptor
@@ -161,10 +179,42 @@ void Client::startPyConn()
         exit(EXIT_FAILURE);
     }
 
-    /*
+    setPySocketTimeouts();
+
+    py_servaddr = (struct sockaddr_in*) malloc(sizeof(struct sockaddr_in));
+
+    memset(py_servaddr, 0, sizeof(*py_servaddr));
+
+    py_servaddr->sin_family = AF_INET; // IPv4
+    py_servaddr->sin_addr.s_addr = inet_addr("127.0.0.1");
+    py_servaddr->sin_port = htons(py_port);
+
+    // sending connection request
+    if (::connect(py_sockfd, (struct sockaddr*)py_servaddr, sizeof(struct sockaddr_in)) < 0) {
+        perror("[ERROR] PyConn failed to connect to server");
+        exit(EXIT_FAILURE);
+    }
+
+    printf("\n[INFO] PyConn started in port %d\n\n", py_port);
+
+    pyConnHandshake();
+}
+
+/*
+  Sets the send and receive timeouts of the socket connected with Python (the
+  craftium_socket_timeout setting, in seconds), so a stalled peer makes MT quit
+  instead of waiting forever. Disabled if the setting is 0, as the agent might
+  take arbitrarily long to compute each action
+*/
+void Client::setPySocketTimeouts()
+{
+    float seconds = g_settings->getFloat("craftium_socket_timeout");
+    if (seconds <= 0)
+        return;
+
     struct timeval timeout;
-    timeout.tv_sec = 2;  // timeout time in seconds
-    timeout.tv_usec = 0;
+    timeout.tv_sec = (time_t)seconds;
+    timeout.tv_usec = (suseconds_t)((seconds - timeout.tv_sec) * 1e6);
     if (setsockopt(py_sockfd, SOL_SOCKET, SO_RCVTIMEO, (const char*)&timeout, sizeof(timeout)) < 0) {
         perror("[ERROR] PyConn setsockopt failed");
         exit(EXIT_FAILURE);
@@ -173,29 +223,468 @@ void Client::startPyConn()
         perror("[ERROR] PyConn setsockopt failed");
         exit(EXIT_FAILURE);
     }
-    */
+}
 
-    py_servaddr = (struct sockaddr_in*) malloc(sizeof(struct sockaddr_in));
+void Client::startPyConnUnix(const std::string &path)
+{
+    printf("[*] Minetest using unix socket %s to communicate with craftium\n", path.c_str());
 
-    memset(py_servaddr, 0, sizeof(*py_servaddr));
+    struct sockaddr_un addr;
+    if (path.size() >= sizeof(addr.sun_path)) {
+        fprintf(stderr, "[ERROR] PyConn unix socket path is too long: %s\n", path.c_str());
+        exit(EXIT_FAILURE);
+    }
 
-    py_servaddr->sin_family = AF_INET; // IPv4
-    py_servaddr->sin_addr.s_addr = inet_addr("127.0.0.1");
-    py_servaddr->sin_port = htons(py_port);
+    // Create socket file descriptor
+    if ( (py_sockfd = socket(AF_UNIX, SOCK_STREAM, 0)) < 0 ) {
+        perror("[ERROR] PyConn socket creation failed");
+        exit(EXIT_FAILURE);
+    }
+
+    setPySocketTimeouts();
+
+    memset(&addr, 0, sizeof(addr));
+    addr.sun_family = AF_UNIX;
+    strncpy(addr.sun_path, path.c_str(), sizeof(addr.sun_path) - 1);
 
     // sending connection request
-    if (::connect(py_sockfd, (struct sockaddr*)py_servaddr, sizeof(struct sockaddr_in)) < 0) {
+    if (::connect(py_sockfd, (struct sockaddr*)&addr, sizeof(addr)) < 0) {
         perror("[ERROR] PyConn failed to connect to server");
         exit(EXIT_FAILURE);
     }
 
-    printf("\n[INFO] PyConn started in port %d\n\n", py_port);
+    printf("\n[INFO] PyConn started in unix socket %s\n\n", path.c_str());
+}
+
+void Client::pyConnHandshake()
+{
+    // Tell Python the protocol version and the sections this instance can provide
+    PyMsgHello hello;
+    hello.magic = PY_MSG_MAGIC;
+    hello.version = PY_MSG_VERSION;
+    hello.sections = (1 << PY_SECTION_FRAME) | (1 << PY_SECTION_STATE) | (1 << PY_SECTION_FULL_FRAME)
+        | (1 << PY_SECTION_DEPTH) | (1 << PY_SECTION_SEGMENTATION)
+        | (1 << PY_SECTION_LIDAR_DISTANCE) | (1 << PY_SECTION_LIDAR_NODES)
+        | (1 << PY_SECTION_TIMING) | (1 << PY_SECTION_NODE_VOCABULARY);
+    if (g_settings->getBool("voxel_obs"))
+        hello.sections |= 1 << PY_SECTION_VOXELS;
+    if (!py_shm) { // encoded sections have a variable size, which doesn't fit the shm slots
+        hello.sections |= 1 << PY_SECTION_FRAME_DELTA;
+        if (g_settings->getBool("voxel_obs"))
+            hello.sections |= 1 << PY_SECTION_VOXELS_DELTA;
+    }
+
+    if (send(py_sockfd, &hello, sizeof(hello), 0) != sizeof(hello)) {
+        perror("[ERROR] PyConn failed to send the hello message");
+        exit(EXIT_FAILURE);
+    }
+
+    // Python answers with the sections to include in every message
+    PyMsgHello reply;
+    if (recv(py_sockfd, &reply, sizeof(reply), MSG_WAITALL) != sizeof(reply)
+            || reply.magic != PY_MSG_MAGIC || reply.version != PY_MSG_VERSION) {
+        fprintf(stderr, "[ERROR] PyConn handshake with craftium failed\n");
+        exit(EXIT_FAILURE);
+    }
+    py_sections = (reply.sections & hello.sections) | (1 << PY_SECTION_STATE); // the state is always sent
+    py_frame_requested = py_sections & ((1 << PY_SECTION_FRAME) | (1 << PY_SECTION_FRAME_DELTA));
+    py_timing_enabled = py_sections & (1 << PY_SECTION_TIMING);
+    std::fill(py_timing, py_timing + PY_TIMING_PHASES, 0.0f);
+    py_step = 0;
+    py_prev_frame.clear(); // the first image is encoded against an all zeros one
+    py_prev_voxels.clear(); // and the first voxel grid is a keyframe
+
+    // Followed by the table of actions (if any)
+    u16 n_actions;
+    if (recv(py_sockfd, &n_actions, sizeof(n_actions), MSG_WAITALL) != sizeof(n_actions)) {
+        fprintf(stderr, "[ERROR] PyConn failed to receive the action table\n");
+        exit(EXIT_FAILURE);
+    }
+    py_action_table.resize(n_actions);
+    ssize_t table_size = n_actions * sizeof(PyActionEntry);
+    if (n_actions > 0 && recv(py_sockfd, py_action_table.data(), table_size, MSG_WAITALL) != table_size) {
+        fprintf(stderr, "[ERROR] PyConn failed to receive the action table\n");
+        exit(EXIT_FAILURE);
+    }
+}
+
+void Client::openPyShm(int slot_size)
+{
+    std::string name = g_settings->get("craftium_shm_name");
+    py_shm_slots = g_settings->getU32("craftium_shm_slots");
+    size_t size = (size_t)slot_size * py_shm_slots;
+
+    // The shared memory object is created (and sized) by Python, just map it here
+    int fd = shm_open(name.c_str(), O_RDWR, 0);
+    if (fd < 0) {
+        perror("[ERROR] PyConn failed to open the shared memory object");
+        exit(EXIT_FAILURE);
+    }
+
+    struct stat st;
+    if (fstat(fd, &st) < 0 || (size_t)st.st_size < size) {
+        printf("[ERROR] PyConn shared memory object '%s' is smaller than %zu bytes\n",
+               name.c_str(), size);
+        exit(EXIT_FAILURE);
+    }
+
+    void *addr = mmap(nullptr, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    close(fd); // the mapping stays valid after closing the descriptor
+    if (addr == MAP_FAILED) {
+        perror("[ERROR] PyConn failed to map the shared memory object");
+        exit(EXIT_FAILURE);
+    }
+
+    py_shm_base = (unsigned char*)addr;
+    py_shm_slot = 0;
+
+    printf("[INFO] PyConn using shared memory '%s' (%u slots of %d bytes)\n",
+           name.c_str(), py_shm_slots, slot_size);
+}
+
+/*
+  Size of the frames sent to Python: the craftium_obs_w and craftium_obs_h
+  settings, or the screen's size if they're not set
+*/
+core::dimension2du Client::getPyFrameSize()
+{
+    auto dims = m_rendering_engine->get_video_driver()->getScreenSize();
+    u32 W = g_settings->getU32("craftium_obs_w");
+    u32 H = g_settings->getU32("craftium_obs_h");
+    return core::dimension2du(W > 0 ? W : dims.Width, H > 0 ? H : dims.Height);
+}
+
+/*
+  Writes the last rendered frame into `frame` (of W x H pixels), as packed RGB
+  or grayscale pixels. The screen is read in bulk into `frame` (or into
+  py_capture to convert it to grayscale), without allocating an image in
+  every step. If the frame is smaller than the screen, the screen is read into
+  py_full_frame and downsampled into `frame`.
+*/
+bool Client::capturePyFrame(unsigned char *frame, int W, int H, bool rgb)
+{
+    irr::video::IVideoDriver *driver = m_rendering_engine->get_video_driver();
+    auto dims = driver->getScreenSize();
+    int SW = dims.Width;
+    int SH = dims.Height;
+    int C = rgb ? 3 : 1;
+
+    unsigned char *screen = frame;
+    if (SW != W || SH != H || (py_sections & (1 << PY_SECTION_FULL_FRAME))) {
+        py_full_frame.resize(SW*SH*C);
+        screen = py_full_frame.data();
+    }
+    unsigned char *pixels = screen;
+    if (!rgb) {
+        py_capture.resize(SW*SH*3);
+        pixels = py_capture.data();
+    }
+
+    if (!driver->readScreenRGB(pixels)) {
+        /* Fall back to a screenshot for the drivers that can't read the screen directly */
+        irr::video::IImage* const raw_image = driver->createScreenShot();
+        if (!raw_image)
+            return false;
+
+        u32 c; // stores the RGBA pixel color
+        int k = 0;
+        for (int h=0; h<SH; h++) {
+            for (int w=0; w<SW; w++) {
+                c = raw_image->getPixel(w, h).color;
+                pixels[k] = (c>>16) & 0xff;  // R
+                pixels[k+1] = (c>>8) & 0xff; // G
+                pixels[k+2] = c & 0xff;      // B
+                k = k + 3;
+            }
+        }
+        raw_image->drop();
+    }
+
+    if (!rgb) {
+        for (int k=0; k<SW*SH; k++)
+            screen[k] = (pixels[3*k] / 3) + (pixels[3*k+1] / 3) + (pixels[3*k+2] / 3);
+    }
+
+    if (screen != frame)
+        downsamplePyFrame(screen, SW, SH, frame, W, H, C);
+    return true;
+}
+
+/*
+  Max-pools the last rendered frame into py_pool. Called in the last
+  skipped frames of each step, see the frameskip_max_pool setting.
+*/
+void Client::poolPyFrame()
+{
+    PyPhaseTimer timer(PY_TIMING_CAPTURE);
+    auto dims = getPyFrameSize();
+    bool rgb = g_settings->getBool("rgb_frames");
+    size_t size = dims.Width * dims.Height * (rgb ? 3 : 1);
+
+    if (py_pooled_frames == 0) {
+        py_pool.resize(size);
+        if (capturePyFrame(py_pool.data(), dims.Width, dims.Height, rgb))
+            py_pooled_frames++;
+        return;
+    }
+
+    py_pool_frame.resize(size);
+    if (py_pool.size() != size || !capturePyFrame(py_pool_frame.data(), dims.Width, dims.Height, rgb))
+        return;
+    for (size_t k=0; k<size; k++)
+        py_pool[k] = std::max(py_pool[k], py_pool_frame[k]);
+    py_pooled_frames++;
+}
+
+/*
+  Answers a PY_CMD_FULL_FRAME request, sending the last captured frame at the
+  screen's resolution
+*/
+void Client::sendPyFullFrame()
+{
+    PyMsgHeader header = {};
+    header.magic = PY_MSG_MAGIC;
+    header.version = PY_MSG_VERSION;
+    header.flags = 1 << PY_SECTION_FULL_FRAME;
+    header.step = py_step - 1; // the step of the last message
+    header.sizes[PY_SECTION_FULL_FRAME] = py_full_frame.size();
+
+    if (send(py_sockfd, &header, sizeof(header), 0) != sizeof(header)
+            || send(py_sockfd, py_full_frame.data(), py_full_frame.size(), 0) != (ssize_t)py_full_frame.size()) {
+        printf("[!!] Python client disconnected. Shutting down...\n");
+        exit(EXIT_FAILURE);
+    }
+}
+
+/*
+  Answers a PY_CMD_NODE_VOCABULARY request, sending the names of the nodes
+  separated by '\n', the i-th name being the one of content ID i (or empty if
+  the ID isn't registered), up to the last registered ID
+*/
+void Client::sendPyNodeVocabulary()
+{
+    const ContentFeatures *unknown = &m_nodedef->get(CONTENT_UNKNOWN);
+    std::string vocabulary;
+    u32 last = 0; // ID of the last name
+    for (u32 c=0; c<(1 << 16); c++) {
+        const ContentFeatures &f = m_nodedef->get(c);
+        if (&f != unknown || c == CONTENT_UNKNOWN) {
+            vocabulary.append(c - last, '\n'); // the unregistered IDs since the previous name
+            vocabulary += f.name;
+            last = c;
+        }
+    }
+
+    PyMsgHeader header = {};
+    header.magic = PY_MSG_MAGIC;
+    header.version = PY_MSG_VERSION;
+    header.flags = 1 << PY_SECTION_NODE_VOCABULARY;
+    header.step = py_step - 1; // the step of the last message
+    header.sizes[PY_SECTION_NODE_VOCABULARY] = vocabulary.size();
+
+    if (send(py_sockfd, &header, sizeof(header), 0) != sizeof(header)
+            || send(py_sockfd, vocabulary.data(), vocabulary.size(), 0) != (ssize_t)vocabulary.size()) {
+        printf("[!!] Python client disconnected. Shutting down...\n");
+        exit(EXIT_FAILURE);
+    }
+}
+
+/*
+  Fills py_node_classes with the class of every content ID, see the
+  craftium_node_classes setting
+*/
+void Client::buildPyNodeClasses()
+{
+    auto classes = parsePyNodeClasses(g_settings->get("craftium_node_classes"));
+
+    py_node_classes.resize(1 << 16);
+    for (size_t c=0; c<py_node_classes.size(); c++) {
+        if (classes.empty()) {
+            py_node_classes[c] = c;
+            continue;
+        }
+        const std::string &name = m_nodedef->get(c).name;
+        py_node_classes[c] = 0;
+        for (const auto &cls : classes) {
+            if (matchPyNodePattern(cls.first.c_str(), name.c_str())) {
+                py_node_classes[c] = cls.second;
+                break;
+            }
+        }
+    }
+}
+
+/*
+  Casts a ray through the client's map from `origin` along `dir` (in nodes),
+  visiting the nodes it crosses until one that isn't airlike is found.
+  Returns the ray parameter t of the hit, i.e., the node is hit at
+  origin + t * dir, and writes its content into `content`. If no node is hit
+  before max_t (or the ray reaches an unloaded block), returns max_t and
+  CONTENT_AIR. Nodes are approximated by full cubes.
+*/
+float Client::castPyRay(v3f origin, v3f dir, float max_t, u16 *content)
+{
+    Map &map = m_env.getMap();
+    v3s16 p = floatToInt(origin, 1.0f);
+    v3s16 step;
+    v3f t_next, t_delta;
+    for (u32 a=0; a<3; a++) {
+        step[a] = dir[a] > 0 ? 1 : -1;
+        // t of the next boundary between nodes along each axis (nodes span [p-0.5, p+0.5])
+        t_next[a] = dir[a] != 0 ? (p[a] + 0.5f * step[a] - origin[a]) / dir[a] : INFINITY;
+        t_delta[a] = dir[a] != 0 ? std::fabs(1.0f / dir[a]) : INFINITY;
+    }
+
+    MapBlock *block = nullptr;
+    v3s16 block_pos;
+    float t = 0.0f;
+    while (t < max_t) {
+        v3s16 bp = getNodeBlockPos(p);
+        if (!block || bp != block_pos) {
+            block = map.getBlockNoCreateNoEx(bp);
+            block_pos = bp;
+            if (!block)
+                break;
+        }
+
+        MapNode n = block->getNodeNoCheck(p - bp * MAP_BLOCKSIZE);
+        if (m_nodedef->get(n).drawtype != NDT_AIRLIKE) {
+            *content = n.getContent();
+            return t;
+        }
+
+        u32 a = t_next.X < t_next.Y ? (t_next.X < t_next.Z ? 0 : 2) : (t_next.Y < t_next.Z ? 1 : 2);
+        t = t_next[a];
+        t_next[a] += t_delta[a];
+        p[a] += step[a];
+    }
+
+    *content = CONTENT_AIR;
+    return max_t;
+}
+
+/*
+  Computes the depth (distance from the camera's plane, in nodes) and the
+  class of the node seen through each pixel of a W x H frame, casting a ray
+  from the camera through the center of every pixel (see castPyRay). Pixels
+  where nothing is hit within craftium_depth_max_range get that depth.
+  Either output can be null.
+*/
+void Client::castPyCameraRays(int W, int H, float *depth, u16 *segmentation)
+{
+    float max_range = g_settings->getFloat("craftium_depth_max_range");
+    if (segmentation && py_node_classes.empty() && m_nodedef_received)
+        buildPyNodeClasses();
+
+    if (!m_camera) {
+        if (depth)
+            std::fill(depth, depth + W*H, max_range);
+        if (segmentation)
+            std::fill(segmentation, segmentation + W*H, 0);
+        return;
+    }
+
+    v3f origin = m_camera->getPosition() / BS;
+    v3f forward = m_camera->getDirection();
+    v3f right = v3f(0, 1, 0).crossProduct(forward).normalize();
+    v3f up = forward.crossProduct(right);
+    float tan_x = std::tan(m_camera->getFovX() / 2);
+    float tan_y = std::tan(m_camera->getFovY() / 2);
+
+    for (int y=0; y<H; y++) {
+        v3f dir_y = forward + up * ((1.0f - 2.0f * (y + 0.5f) / H) * tan_y);
+        for (int x=0; x<W; x++) {
+            // the ray has a unit component along the camera's axis, so t is the depth
+            v3f dir = dir_y + right * ((2.0f * (x + 0.5f) / W - 1.0f) * tan_x);
+            u16 c;
+            float t = castPyRay(origin, dir, max_range, &c);
+            if (depth)
+                depth[y*W + x] = t;
+            if (segmentation)
+                segmentation[y*W + x] = py_node_classes.empty() ? c : py_node_classes[c];
+        }
+    }
+}
+
+/*
+  Casts craftium_lidar_rays rays from the player's eyes, in the horizontal
+  plane, evenly spread over craftium_lidar_fov degrees centered on the
+  player's yaw (from left to right). Writes the distance (in nodes) to the
+  first node hit by each ray, or craftium_lidar_max_range if none, and the
+  class of the hit node. Either output can be null.
+*/
+void Client::castPyLidarRays(LocalPlayer *player, int n_rays, float *distance, u16 *nodes)
+{
+    float max_range = g_settings->getFloat("craftium_lidar_max_range");
+    float fov = g_settings->getFloat("craftium_lidar_fov");
+    if (nodes && py_node_classes.empty() && m_nodedef_received)
+        buildPyNodeClasses();
+
+    v3f origin = player->getEyePosition() / BS;
+    float yaw = player->getYaw();
+    for (int k=0; k<n_rays; k++) {
+        v3f dir(0, 0, 1);
+        dir.rotateXZBy(yaw + fov * (0.5f - (k + 0.5f) / n_rays));
+        u16 c;
+        float t = castPyRay(origin, dir, max_range, &c);
+        if (distance)
+            distance[k] = t;
+        if (nodes)
+            nodes[k] = py_node_classes.empty() ? c : py_node_classes[c];
+    }
+}
+
+/*
+  Writes the voxel observation of the (2*radius+1) sized window of the
+  client's map centered on `center` into `dst`: for every node (x varies
+  fastest, then y, and then z), its content ID, param1 (light) and param2 as
+  u32's, as a u16 and two u8's (PY_VOXELS_PACKED), or just the class of the
+  node as a u8 (PY_VOXELS_CLASSES). Nodes of blocks that aren't loaded are
+  CONTENT_IGNORE.
+*/
+void Client::packPyVoxels(v3s16 center, v3s16 radius, PyVoxelFormat format, unsigned char *dst)
+{
+    if (format == PY_VOXELS_CLASSES && py_node_classes.empty())
+        buildPyNodeClasses();
+
+    Map &map = m_env.getMap();
+    v3s16 minp = center - radius;
+    v3s16 maxp = center + radius;
+
+    MapBlock *block = nullptr;
+    v3s16 block_pos;
+    bool block_valid = false;
+    v3s16 p;
+    for (p.Z=minp.Z; p.Z<=maxp.Z; p.Z++)
+    for (p.Y=minp.Y; p.Y<=maxp.Y; p.Y++)
+    for (p.X=minp.X; p.X<=maxp.X; p.X++) {
+        v3s16 bp = getNodeBlockPos(p);
+        if (!block_valid || bp != block_pos) {
+            block = map.getBlockNoCreateNoEx(bp);
+            block_pos = bp;
+            block_valid = true;
+        }
+
+        MapNode n = block ? block->getNodeNoCheck(p - bp * MAP_BLOCKSIZE) : MapNode(CONTENT_IGNORE);
+        if (format == PY_VOXELS_CLASSES) {
+            *dst++ = std::min<u16>(py_node_classes[n.getContent()], 255);
+        } else if (format == PY_VOXELS_PACKED) {
+            u16 content = n.getContent();
+            memcpy(dst, &content, sizeof(content));
+            dst[2] = n.getParam1();
+            dst[3] = n.getParam2();
+            dst += PY_VOXEL_PACKED_BYTES;
+        } else {
+            uint32_t values[3] = {n.getContent(), n.getParam1(), n.getParam2()};
+            memcpy(dst, values, sizeof(values));
+            dst += sizeof(values);
+        }
+    }
 }
 
 void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
     // NOTE: the `actions` array is defined in craftium.h
     int n_send, n_recv, W, H, Xv, Yv, Zv, obs_rwd_buffer_size;
-    u32 c; // stores the RGBA pixel color
     bool kill;
 
 	/* Clear all virtual key presses except the movement ones (WASD) and dig (L click) */
@@ -217,8 +706,14 @@ void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
 
 	// Update and check the frameskip condition
     frameskip_count++;
-    if (frameskip_count != frameskip)
+    if (frameskip_count != frameskip) {
+        /* The skipped frames can still contribute to the step's reward and observation */
+        if (frameskip_reward_sum)
+            g_skipped_reward += takeFrameReward();
+        if (py_frame_requested && frameskip_count > frameskip - frameskip_pool)
+            poolPyFrame();
         return;
+    }
     frameskip_count = 0;
 
 	/* Clear missing virtual key presses (WASD + L click) */
@@ -228,79 +723,134 @@ void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
     virtual_key_presses[KeyType::RIGHT] = false;
     virtual_key_presses[KeyType::DIG] = false;
 
-    /* Take the screenshot */
-    irr::video::IVideoDriver *driver = m_rendering_engine->get_video_driver();
-    irr::video::IImage* const raw_image = driver->createScreenShot();
-
     /* Get the dimensions of the image */
-    auto dims = raw_image->getDimension();
+    auto dims = getPyFrameSize();
     W = dims.Width;
     H = dims.Height;
 
     /*
-      W*H*3 for the WxH RGB image, +8 for the reward value (a double),
-      and +1 for the episode termination flag
+      The message is [header, frame, voxels, state], where the frame and
+      voxels are only included if requested by Python (see craftium.h)
     */
-    // [RGB, (pos,vel,pitch,yaw), dtime, reward, termination]
-    if (g_settings->getBool("rgb_frames")) {
-        obs_rwd_buffer_size = W*H*3 + 32 + 4 + 8 + 1; // full RGB images
-    } else {
-        obs_rwd_buffer_size = W*H + 32 + 4 + 8 + 1; // grayscale images
-    }
-
 	Xv = 2 * g_settings->getU32("voxel_obs_rx") + 1;
 	Yv = 2 * g_settings->getU32("voxel_obs_ry") + 1;
 	Zv = 2 * g_settings->getU32("voxel_obs_rz") + 1;
-	if (g_settings->getBool("voxel_obs")) {
-        obs_rwd_buffer_size += Xv*Yv*Zv*3*4; // voxel observation
-	}
 
-    /* If obs_rwd_buffer is not initialized, allocate memory for it now */
-    if (!obs_rwd_buffer) {
+    bool rgb_frames = g_settings->getBool("rgb_frames");
+    int frame_size = rgb_frames ? W*H*3 : W*H;
+    bool frame_delta = py_sections & (1 << PY_SECTION_FRAME_DELTA);
+
+    PyMsgHeader header = {};
+    header.magic = PY_MSG_MAGIC;
+    header.version = PY_MSG_VERSION;
+    header.flags = py_sections & ~PY_SECTIONS_ON_REQUEST;
+    if (py_sections & (1 << PY_SECTION_FRAME)) // full RGB or grayscale images
+        header.sizes[PY_SECTION_FRAME] = frame_size;
+    PyVoxelFormat voxel_format = g_settings->getBool("voxel_obs_classes") ? PY_VOXELS_CLASSES
+        : g_settings->getBool("voxel_obs_packed") ? PY_VOXELS_PACKED : PY_VOXELS_LEGACY;
+    int voxel_bytes = pyVoxelBytes(voxel_format);
+    bool voxels_delta = py_sections & (1 << PY_SECTION_VOXELS_DELTA);
+    if (py_sections & (1 << PY_SECTION_VOXELS)) // voxel observation
+        header.sizes[PY_SECTION_VOXELS] = Xv*Yv*Zv*voxel_bytes;
+    if (voxels_delta) // the actual size is known after encoding the grid
+        header.sizes[PY_SECTION_VOXELS_DELTA] = PY_VOXELS_DELTA_MAX_BYTES(Xv*Yv*Zv*voxel_bytes);
+    header.sizes[PY_SECTION_STATE] = PY_STATE_BYTES;
+    if (frame_delta) // the actual size is known after encoding the image
+        header.sizes[PY_SECTION_FRAME_DELTA] = PY_DELTA_MAX_BYTES(frame_size);
+    bool depth_obs = py_sections & (1 << PY_SECTION_DEPTH);
+    bool segmentation_obs = py_sections & (1 << PY_SECTION_SEGMENTATION);
+    if (depth_obs)
+        header.sizes[PY_SECTION_DEPTH] = W*H*sizeof(float);
+    if (segmentation_obs)
+        header.sizes[PY_SECTION_SEGMENTATION] = W*H*sizeof(u16);
+    bool lidar_distance = py_sections & (1 << PY_SECTION_LIDAR_DISTANCE);
+    bool lidar_nodes = py_sections & (1 << PY_SECTION_LIDAR_NODES);
+    int n_rays = g_settings->getU32("craftium_lidar_rays");
+    if (lidar_distance)
+        header.sizes[PY_SECTION_LIDAR_DISTANCE] = n_rays*sizeof(float);
+    if (lidar_nodes)
+        header.sizes[PY_SECTION_LIDAR_NODES] = n_rays*sizeof(u16);
+    if (py_timing_enabled)
+        header.sizes[PY_SECTION_TIMING] = sizeof(py_timing);
+
+    obs_rwd_buffer_size = sizeof(PyMsgHeader);
+    for (int s=0; s<PY_MSG_MAX_SECTIONS; s++)
+        obs_rwd_buffer_size += header.sizes[s];
+
+    /* If obs_rwd_buffer is not initialized, allocate memory for it now.
+       With the shm transport, the buffer is the next slot of the shared ring */
+    if (py_shm) {
+        if (!py_shm_base)
+            openPyShm(obs_rwd_buffer_size);
+        obs_rwd_buffer = py_shm_base + (size_t)py_shm_slot * obs_rwd_buffer_size;
+    } else if (!obs_rwd_buffer) {
         obs_rwd_buffer = (unsigned char*) malloc(obs_rwd_buffer_size);
     }
 
-    if (!raw_image)
-        return;
+    int i = sizeof(PyMsgHeader);
 
-    /* Copy RGB image into a flat u8 array (obs_rwd_buffer) */
-    int i = 0;
-    if (g_settings->getBool("rgb_frames")) {
-        for (int h=0; h<H; h++) {
-            for (int w=0; w<W; w++) {
-                c = raw_image->getPixel(w, h).color;
-                obs_rwd_buffer[i] = (c>>16) & 0xff;  // R
-                obs_rwd_buffer[i+1] = (c>>8) & 0xff; // G
-                obs_rwd_buffer[i+2] = c & 0xff;      // B
-                i = i + 3;
-            }
+    /* Read the image straight into the message (or into py_frame if it's delta
+       encoded, as the encoded image goes after the state) */
+    if (py_sections & ((1 << PY_SECTION_FRAME) | (1 << PY_SECTION_FRAME_DELTA))) {
+        PyPhaseTimer timer(PY_TIMING_CAPTURE);
+        unsigned char *frame = &obs_rwd_buffer[i];
+        if (frame_delta) {
+            py_frame.resize(frame_size);
+            frame = py_frame.data();
         }
-    } else {
-        for (int h=0; h<H; h++) {
-            for (int w=0; w<W; w++) {
-                c = raw_image->getPixel(w, h).color;
-                obs_rwd_buffer[i] = (((c>>16) & 0xff) / 3) + (((c>>8) & 0xff) / 3) + ((c & 0xff) / 3);
-                i++;
-            }
+
+        if (!capturePyFrame(frame, W, H, rgb_frames))
+            return;
+
+        /* Max-pool the image with the last skipped ones */
+        if (py_pooled_frames > 0 && py_pool.size() == (size_t)frame_size) {
+            for (int k=0; k<frame_size; k++)
+                frame[k] = std::max(frame[k], py_pool[k]);
+        }
+        py_pooled_frames = 0;
+        if (!frame_delta)
+            i += frame_size;
+    }
+    header.step = py_step++;
+
+    if (py_sections & ((1 << PY_SECTION_VOXELS) | (1 << PY_SECTION_VOXELS_DELTA))) {
+        PyPhaseTimer timer(PY_TIMING_VOXELS);
+        /* Crop the voxel observation around the player straight from the map
+           (the same values as VoxelManip:get_data(), get_light_data() and
+           get_param2_data()) */
+        v3s16 center = floatToInt(myplayer->getPosition(), BS);
+        v3s16 radius((Xv - 1) / 2, (Yv - 1) / 2, (Zv - 1) / 2);
+        if (!voxels_delta) {
+            packPyVoxels(center, radius, voxel_format, &obs_rwd_buffer[i]);
+            i += header.sizes[PY_SECTION_VOXELS];
+        } else {
+            /* Encode the grid against the previous one (sent after the
+               timings, as the section goes last) */
+            size_t grid_size = (size_t)Xv*Yv*Zv*voxel_bytes;
+            py_voxels.resize(grid_size);
+            packPyVoxels(center, radius, voxel_format, py_voxels.data());
+
+            int dims[3] = {Xv, Yv, Zv};
+            v3s16 shift = center - py_voxels_center;
+            int shift_xyz[3] = {shift.X, shift.Y, shift.Z};
+            u32 interval = g_settings->getU32("voxel_obs_keyframe_interval");
+            bool keyframe = py_voxels_keyframe || py_prev_voxels.size() != grid_size
+                || (interval > 0 && py_voxels_since_keyframe + 1 >= interval);
+
+            py_voxels_delta.resize(PY_VOXELS_DELTA_MAX_BYTES(grid_size));
+            size_t n = encodePyVoxelsDelta(py_voxels.data(), py_prev_voxels.data(), dims,
+                                           shift_xyz, voxel_bytes, keyframe, py_voxels_delta.data());
+            py_voxels_delta.resize(n);
+            if (((PyVoxelsDeltaHeader*)py_voxels_delta.data())->keyframe)
+                py_voxels_since_keyframe = 0;
+            else
+                py_voxels_since_keyframe++;
+            py_voxels_keyframe = false;
+            py_voxels.swap(py_prev_voxels);
+            py_voxels_center = center;
+            header.sizes[PY_SECTION_VOXELS_DELTA] = n;
         }
     }
-
-    if (g_settings->getBool("voxel_obs")) {
-		/* Encode the voxel observation as 3 arrays,
-		VoxelManip:get_data(), VoxelManip:get_light_data(), VoxelManip:get_param2_data() */
-		int j = 0;
-		for (int z=0; z<Zv; z++) {
-			for (int y=0; y<Yv; y++) {
-				for (int x=0; x<Xv; x++) {
-                    memcpy(&obs_rwd_buffer[i], &g_voxel_data[j], sizeof(uint32_t));
-                    memcpy(&obs_rwd_buffer[i+4], &g_voxel_light_data[j], sizeof(uint32_t));
-                    memcpy(&obs_rwd_buffer[i+8], &g_voxel_param2_data[j], sizeof(uint32_t));
-                    i = i + 12; // Advance by 12 bytes (3 * sizeof(uint32_t))
-					j++;
-				}
-			}
-		}
-	}
 
 	// Encode the player position (3 floats), velocity (3 floats), pitch (1 u32), yaw (1 u32)
 	v3f pf           = myplayer->getPosition() * 100;
@@ -321,19 +871,16 @@ void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
 	memcpy(&obs_rwd_buffer[i], &dtime, sizeof(float));
 	i = i + 4;
 
-    /* Encode the reward (double) as  8 bytes at the end of the buffer */
-    char *rewardBytes = (char*)&g_reward;
+    /* Encode the reward (double) as  8 bytes at the end of the buffer, resetting
+       it for the next iteration if needed */
+    double reward = takeFrameReward() + g_skipped_reward;
+    g_skipped_reward = 0.0;
+    char *rewardBytes = (char*)&reward;
     for (int j=0; j<8; j++) {
         obs_rwd_buffer[i] = rewardBytes[j];
         i++;
     }
 
-    /* Reset the reward for the next iteration if needed */
-    if (g_reward_reset) {
-        g_reward_reset = false;
-        g_reward = g_reward_reset_value;
-    }
-
     /* Encode the termination signal */
     if (g_termination) {
         g_termination = false;  /* Reset the flag to false */
@@ -341,12 +888,94 @@ void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
     } else {
         obs_rwd_buffer[i] = 0;
     }
+    i++;
+
+    /* Encode the image against the previous one */
+    if (frame_delta) {
+        if (py_prev_frame.size() != (size_t)frame_size)
+            py_prev_frame.assign(frame_size, 0);
+        size_t n = encodePyFrameDelta(py_frame.data(), py_prev_frame.data(), frame_size, &obs_rwd_buffer[i]);
+        header.sizes[PY_SECTION_FRAME_DELTA] = n;
+        i += n;
+    }
+
+    /* Depth and segmentation maps, from the rays cast through each pixel */
+    if (depth_obs || segmentation_obs) {
+        PyPhaseTimer timer(PY_TIMING_RAYCAST);
+        py_depth.resize(depth_obs ? W*H : 0);
+        py_segmentation.resize(segmentation_obs ? W*H : 0);
+        castPyCameraRays(W, H, depth_obs ? py_depth.data() : nullptr,
+                         segmentation_obs ? py_segmentation.data() : nullptr);
+        memcpy(&obs_rwd_buffer[i], py_depth.data(), header.sizes[PY_SECTION_DEPTH]);
+        i += header.sizes[PY_SECTION_DEPTH];
+        memcpy(&obs_rwd_buffer[i], py_segmentation.data(), header.sizes[PY_SECTION_SEGMENTATION]);
+        i += header.sizes[PY_SECTION_SEGMENTATION];
+    }
 
-    /* Send the obs_rwd_buffer over TCP to Python */
-    n_send = send(py_sockfd, obs_rwd_buffer, obs_rwd_buffer_size, 0);
+    /* Lidar distances and hit nodes */
+    if (lidar_distance || lidar_nodes) {
+        PyPhaseTimer timer(PY_TIMING_RAYCAST);
+        py_lidar_distance.resize(lidar_distance ? n_rays : 0);
+        py_lidar_nodes.resize(lidar_nodes ? n_rays : 0);
+        castPyLidarRays(myplayer, n_rays, lidar_distance ? py_lidar_distance.data() : nullptr,
+                        lidar_nodes ? py_lidar_nodes.data() : nullptr);
+        memcpy(&obs_rwd_buffer[i], py_lidar_distance.data(), header.sizes[PY_SECTION_LIDAR_DISTANCE]);
+        i += header.sizes[PY_SECTION_LIDAR_DISTANCE];
+        memcpy(&obs_rwd_buffer[i], py_lidar_nodes.data(), header.sizes[PY_SECTION_LIDAR_NODES]);
+        i += header.sizes[PY_SECTION_LIDAR_NODES];
+    }
 
-    /* Receive a buffer of bytes with the actions to take */
-    n_recv = recv(py_sockfd, &actions, sizeof(actions), 0);
+    /* Timings accumulated since the previous message, restarted for the next one */
+    if (py_timing_enabled) {
+        memcpy(&obs_rwd_buffer[i], py_timing, sizeof(py_timing));
+        i += sizeof(py_timing);
+        std::fill(py_timing, py_timing + PY_TIMING_PHASES, 0.0f);
+    }
+
+    /* The voxel grid encoded against the previous one */
+    if (voxels_delta) {
+        memcpy(&obs_rwd_buffer[i], py_voxels_delta.data(), py_voxels_delta.size());
+        i += py_voxels_delta.size();
+    }
+    memcpy(obs_rwd_buffer, &header, sizeof(PyMsgHeader));
+
+    {
+        PyPhaseTimer timer(PY_TIMING_SEND);
+        if (py_shm) {
+            /* The observation is already in shared memory, ring the doorbell with the slot index */
+            unsigned char slot = py_shm_slot;
+            n_send = send(py_sockfd, &slot, 1, 0);
+            py_shm_slot = (py_shm_slot + 1) % py_shm_slots;
+        } else {
+            /* Send the obs_rwd_buffer over TCP to Python (the encoded image might be
+               smaller than its upper bound, so only the first i bytes are sent) */
+            n_send = send(py_sockfd, obs_rwd_buffer, i, 0);
+        }
+    }
+
+    /* Receive a buffer of bytes with the actions to take, or just the index
+       of the action if an action table is registered. Before the action,
+       Python might request the full resolution frame or the node vocabulary
+       (if negotiated) */
+    {
+        PyPhaseTimer timer(PY_TIMING_WAIT);
+        while (true) {
+            if (py_action_table.empty()) {
+                n_recv = recv(py_sockfd, &actions, sizeof(actions), MSG_WAITALL);
+            } else {
+                u16 action_index = PY_ACTION_NOP;
+                n_recv = recv(py_sockfd, &action_index, sizeof(action_index), MSG_WAITALL);
+                expandPyAction(py_action_table, action_index);
+            }
+            if (n_recv <= 0 || (actions[26] != PY_CMD_FULL_FRAME && actions[26] != PY_CMD_NODE_VOCABULARY))
+                break;
+            if (actions[26] == PY_CMD_FULL_FRAME && (py_sections & (1 << PY_SECTION_FULL_FRAME)))
+                sendPyFullFrame();
+            if (actions[26] == PY_CMD_NODE_VOCABULARY && (py_sections & (1 << PY_SECTION_NODE_VOCABULARY)))
+                sendPyNodeVocabulary();
+            actions[26] = 0;
+        }
+    }
 
     virtual_key_presses[KeyType::FORWARD] = actions[0];
     virtual_key_presses[KeyType::BACKWARD] = actions[1];
@@ -429,6 +1058,7 @@ void Client::pyConnStep(LocalPlayer *myplayer, float dtime){
     /* Set soft_reset only if the flag is true */
     if (actions[25]) {
         g_soft_reset = true;
+        py_voxels_keyframe = true; // the player might be teleported
     }
 
     /* Check the kill flag. If soft_reset is not enabled, kill the current MT process */
@@ -696,9 +1326,13 @@ void Client::connect(const Address &address, const std::string &address_name)
 
 void Client::step(float dtime)
 {
-    syncClientStep();
+	auto step_start = std::chrono::steady_clock::now();
+    syncClientStep(m_simple_singleplayer_mode);
 
-	dtime -= m_craftium_lag;
+	// In lockstep mode dtime is already fixed, so Python's latency doesn't
+	// have to be hidden
+	if (lockstep_dtime <= 0.0f)
+		dtime -= m_craftium_lag;
 
 	// printf("client dtime: %f, LIM: %f\n", dtime, DTIME_LIMIT);
 	// Limit a bit
@@ -1092,6 +1726,10 @@ void Client::step(float dtime)
 		Handle environment
 	*/
 	auto begin = std::chrono::steady_clock::now();
+	if (py_timing_enabled) {
+		std::chrono::duration<float, std::milli> sim_time = begin - step_start;
+		py_timing[PY_TIMING_SIM] += sim_time.count();
+	}
     pyConnStep(player, dtime);
 	auto end = std::chrono::steady_clock::now();
 	std::chrono::duration<float> duration = end - begin;
@@ -22,6 +22,7 @@
 #include "util/numeric.h"
 #include "util/string.h" // StringMap
 #include "config.h"
+#include "craftium.h"
 
 #if !IS_CLIENT_BUILD
 #error Do not include in server builds
@@ -491,7 +492,65 @@ class Client : public con::PeerHandler, public InventoryManager, public IGameDef
         int py_sockfd = 0;
         struct sockaddr_in *py_servaddr = nullptr;
         unsigned char *obs_rwd_buffer = 0;
+        /* Shared-memory transport: frames are written into a ring of slots
+           created by Python, and only the slot index is sent over the socket */
+        bool py_shm = false;
+        unsigned char *py_shm_base = nullptr;
+        u32 py_shm_slots = 0;
+        u32 py_shm_slot = 0;
+        /* Sections of the messages requested by Python (see craftium.h) and
+           the step counter of the next message */
+        u16 py_sections = 0;
+        u64 py_step = 0;
+        /* Actions registered by Python, if any, sent by their index */
+        std::vector<PyActionEntry> py_action_table;
+        /* With PY_SECTION_FRAME_DELTA, the image is first written into
+           py_frame and then encoded against the previous one, py_prev_frame */
+        std::vector<u8> py_frame;
+        std::vector<u8> py_prev_frame;
+        /* With PY_SECTION_VOXELS_DELTA, the voxel grid is packed into
+           py_voxels and encoded into py_voxels_delta against py_prev_voxels,
+           the grid of the previous message, centered at py_voxels_center.
+           py_voxels_keyframe forces sending the whole grid in the next message */
+        std::vector<u8> py_voxels;
+        std::vector<u8> py_prev_voxels;
+        std::vector<u8> py_voxels_delta;
+        v3s16 py_voxels_center;
+        bool py_voxels_keyframe = true;
+        u32 py_voxels_since_keyframe = 0;
+        /* RGB screen pixels, reused between steps for the grayscale images */
+        std::vector<u8> py_capture;
+        /* Last captured frame at the screen's resolution, if the frames are
+           downsampled or PY_SECTION_FULL_FRAME is requested */
+        std::vector<u8> py_full_frame;
+        /* Max-pool of the last skipped frames of the current step (see
+           poolPyFrame), and the last captured frame */
+        std::vector<u8> py_pool;
+        std::vector<u8> py_pool_frame;
+        int py_pooled_frames = 0;
+        /* Depth and segmentation maps of the observed frame, and the class of
+           each content ID (see the craftium_node_classes setting) */
+        std::vector<float> py_depth;
+        std::vector<u16> py_segmentation;
+        std::vector<u16> py_node_classes;
+        /* Distances and hit node classes of the lidar rays */
+        std::vector<float> py_lidar_distance;
+        std::vector<u16> py_lidar_nodes;
         void startPyConn();
+        void startPyConnUnix(const std::string &path);
+        void setPySocketTimeouts();
+        void pyConnHandshake();
+        void openPyShm(int slot_size);
+        core::dimension2du getPyFrameSize();
+        bool capturePyFrame(unsigned char *frame, int W, int H, bool rgb);
+        void poolPyFrame();
+        void sendPyFullFrame();
+        void sendPyNodeVocabulary();
+        void buildPyNodeClasses();
+        float castPyRay(v3f origin, v3f dir, float max_t, u16 *content);
+        void castPyCameraRays(int W, int H, float *depth, u16 *segmentation);
+        void castPyLidarRays(LocalPlayer *player, int n_rays, float *distance, u16 *nodes);
+        void packPyVoxels(v3s16 center, v3s16 radius, PyVoxelFormat format, unsigned char *dst);
         void pyConnStep(LocalPlayer *player, float dtime);
 
 	std::unique_ptr<MeshUpdateManager> m_mesh_update_manager;
@@ -13,13 +13,408 @@
 #include <semaphore.h>
 #include <fcntl.h>
 
+#include <algorithm>
+#include <chrono>
+#include <condition_variable>
 #include <cstdint>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <utility>
+#include <vector>
 
 #include "../settings.h"
 
 
 inline char actions[27];
 
+/*
+
+  Python<->MT message protocol
+  ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+  Must match the definitions in mt_server.c. When connecting, MT sends a
+  PyMsgHello with the sections it can provide, and Python answers with
+  another PyMsgHello containing the sections it wants to receive. Every
+  message sent to Python starts with a PyMsgHeader, followed by the included
+  sections in increasing order of their index.
+
+  After its PyMsgHello, Python sends a table of actions: a u16 with the
+  number of entries followed by the PyActionEntry's. If the table isn't
+  empty, Python sends the u16 index of an action of the table in every step
+  (expanded with expandPyAction) instead of the full 27 bytes action.
+
+  Instead of the action, Python can request the last frame at the screen's
+  resolution (if the frames are downsampled, see downsamplePyFrame) with
+  PY_CMD_FULL_FRAME in the last byte of the action, or the
+  PY_ACTION_FULL_FRAME index. This is only answered if PY_SECTION_FULL_FRAME
+  was requested in the handshake, with a message that only includes that
+  section (and the step of the last message). Then, MT keeps waiting for the
+  action. In the same way, PY_CMD_NODE_VOCABULARY (or the
+  PY_ACTION_NODE_VOCABULARY index) requests the names of the nodes, answered
+  with a message that only includes PY_SECTION_NODE_VOCABULARY (see
+  Client::sendPyNodeVocabulary).
+
+*/
+#define PY_MSG_MAGIC 0x54465243u // "CRFT"
+#define PY_MSG_VERSION 1
+#define PY_MSG_MAX_SECTIONS 16
+
+enum PyMsgSection {
+    PY_SECTION_FRAME = 0,  // the (RGB or grayscale) image
+    PY_SECTION_VOXELS = 1, // the voxel observation
+    PY_SECTION_STATE = 2,  // pos, vel, pitch, yaw, dtime, reward and termination
+    PY_SECTION_FRAME_DELTA = 3, // the image, delta encoded (see encodePyFrameDelta)
+    PY_SECTION_FULL_FRAME = 4, // the image at the screen's resolution, only sent on request
+    PY_SECTION_DEPTH = 5, // depth of each pixel of the image (floats, see castPyCameraRays)
+    PY_SECTION_SEGMENTATION = 6, // class of the node seen through each pixel (u16)
+    PY_SECTION_LIDAR_DISTANCE = 7, // distance travelled by each lidar ray (floats, see castPyLidarRays)
+    PY_SECTION_LIDAR_NODES = 8, // class of the node hit by each lidar ray (u16)
+    PY_SECTION_TIMING = 9, // time spent in each phase of the step (floats, see PyTimingPhase)
+    PY_SECTION_VOXELS_DELTA = 10, // the voxel observation, delta encoded (see encodePyVoxelsDelta)
+    PY_SECTION_NODE_VOCABULARY = 11, // the names of the content IDs, only sent on request
+};
+
+// Sections that are only sent on request, never in the message of a step
+#define PY_SECTIONS_ON_REQUEST ((1 << PY_SECTION_FULL_FRAME) | (1 << PY_SECTION_NODE_VOCABULARY))
+
+// Size of each voxel in the packed voxel observation (voxel_obs_packed
+// setting): content ID (u16), param1 (u8) and param2 (u8)
+#define PY_VOXEL_PACKED_BYTES 4
+
+/* Layouts of the voxel observation: the content ID, param1 and param2 of
+   each voxel as u32's, packed into PY_VOXEL_PACKED_BYTES (voxel_obs_packed
+   setting), or just the class of the node as a u8 (voxel_obs_classes
+   setting, see craftium_node_classes) */
+enum PyVoxelFormat {
+    PY_VOXELS_LEGACY,
+    PY_VOXELS_PACKED,
+    PY_VOXELS_CLASSES,
+};
+
+inline int pyVoxelBytes(PyVoxelFormat format)
+{
+    switch (format) {
+    case PY_VOXELS_PACKED:
+        return PY_VOXEL_PACKED_BYTES;
+    case PY_VOXELS_CLASSES:
+        return 1;
+    default:
+        return 3*4;
+    }
+}
+
+// Size of the state section: pos (3 floats), vel (3 floats), pitch (s32),
+// yaw (s32), dtime (float), reward (double) and termination (u8)
+#define PY_STATE_BYTES (32 + 4 + 8 + 1)
+
+struct PyMsgHello {
+    uint32_t magic;
+    uint16_t version;
+    uint16_t sections;
+};
+
+struct PyMsgHeader {
+    uint32_t magic;
+    uint16_t version;
+    uint16_t flags;    // a bit for each section included in the message
+    uint64_t step;     // message counter, to detect desynchronization
+    uint32_t sizes[PY_MSG_MAX_SECTIONS]; // size in bytes of each section
+};
+
+struct PyActionEntry {
+    uint32_t keys;   // bit i is set if the i-th key of the actions array is pressed
+    int16_t mouse_x;
+    int16_t mouse_y;
+};
+
+// Values of the last byte of the actions array
+#define PY_CMD_KILL 1
+#define PY_CMD_FULL_FRAME 2
+#define PY_CMD_NODE_VOCABULARY 3
+
+// Action indices with a reserved meaning
+#define PY_ACTION_NODE_VOCABULARY 0xFFFB
+#define PY_ACTION_FULL_FRAME 0xFFFC
+#define PY_ACTION_NOP 0xFFFD
+#define PY_ACTION_SOFT_RESET 0xFFFE
+#define PY_ACTION_KILL 0xFFFF
+
+// Fills the actions array with the action of the given index of the table
+inline void expandPyAction(const std::vector<PyActionEntry> &table, uint16_t index)
+{
+    memset(actions, 0, sizeof(actions));
+
+    if (index == PY_ACTION_SOFT_RESET) {
+        actions[25] = 1;
+    } else if (index == PY_ACTION_KILL) {
+        actions[26] = PY_CMD_KILL;
+    } else if (index == PY_ACTION_FULL_FRAME) {
+        actions[26] = PY_CMD_FULL_FRAME;
+    } else if (index == PY_ACTION_NODE_VOCABULARY) {
+        actions[26] = PY_CMD_NODE_VOCABULARY;
+    } else if (index < table.size()) { // otherwise, PY_ACTION_NOP
+        const PyActionEntry &entry = table[index];
+        for (int k=0; k<21; k++)
+            actions[k] = (entry.keys >> k) & 1;
+        // each mouse position is stored in 2 bytes (little-endian)
+        memcpy(&actions[21], &entry.mouse_x, sizeof(int16_t));
+        memcpy(&actions[23], &entry.mouse_y, sizeof(int16_t));
+    }
+}
+
+/*
+
+  Step timings
+  ~~~~~~~~~~~~
+
+  If PY_SECTION_TIMING is requested, the time (in milliseconds) spent in
+  each phase since the previous message is accumulated in py_timing (over
+  all the frames of the step, with frameskip) and sent as an array of
+  PY_TIMING_PHASES floats. As the message is sent before waiting for the
+  action, the send and wait times of a step are reported in the next
+  message. Must match TIMING_PHASES in mt_channel.py.
+
+*/
+enum PyTimingPhase {
+    PY_TIMING_RENDER = 0,  // drawing the scene
+    PY_TIMING_CAPTURE = 1, // reading, converting, downsampling and pooling the image
+    PY_TIMING_VOXELS = 2,  // extracting the voxel observation from the map
+    PY_TIMING_RAYCAST = 3, // depth, segmentation and lidar rays
+    PY_TIMING_SEND = 4,    // sending the message
+    PY_TIMING_WAIT = 5,    // waiting for the action
+    PY_TIMING_SIM = 6,     // Client::step (incl. the sync with the server and its Lua globalsteps)
+    PY_TIMING_PHASES
+};
+
+// Set in Client::pyConnHandshake if Python requests the timings
+inline bool py_timing_enabled = false;
+inline float py_timing[PY_TIMING_PHASES] = {};
+
+// Adds the time elapsed from its construction to its destruction to a phase
+class PyPhaseTimer {
+public:
+    PyPhaseTimer(PyTimingPhase phase): m_phase(phase), m_start(std::chrono::steady_clock::now()) {}
+    ~PyPhaseTimer()
+    {
+        if (py_timing_enabled) {
+            std::chrono::duration<float, std::milli> elapsed = std::chrono::steady_clock::now() - m_start;
+            py_timing[m_phase] += elapsed.count();
+        }
+    }
+
+private:
+    PyTimingPhase m_phase;
+    std::chrono::steady_clock::time_point m_start;
+};
+
+/*
+
+  Frame delta encoding
+  ~~~~~~~~~~~~~~~~~~~~
+
+  The image is XOR-ed with the previous one (all zeros for the first image
+  of a connection), and the result is encoded as a sequence of runs. Each
+  run is a u16 with the number of zero bytes to skip, a u16 with the number
+  of literal bytes, and the literal (XOR-ed) bytes. Consecutive images are
+  very similar, so the encoded image is usually a small fraction of the raw
+  one. Must match the decoder in mt_server.c.
+
+*/
+// Number of unchanged bytes that end a literal run
+#define PY_DELTA_MIN_ZEROS 8
+// Upper bound of the size of an encoded image of n bytes
+#define PY_DELTA_MAX_BYTES(n) ((n) + 4 * ((n) / 0xFFFF + 2))
+
+// Encodes `frame` against `prev` into `out`, and updates `prev` with
+// `frame`. Returns the size of the encoded image.
+inline size_t encodePyFrameDelta(const uint8_t *frame, uint8_t *prev, size_t n, uint8_t *out)
+{
+    size_t i = 0, o = 0;
+
+    while (i < n) {
+        // unchanged bytes
+        size_t zeros = 0;
+        while (i < n && zeros < 0xFFFF && frame[i] == prev[i]) {
+            zeros++;
+            i++;
+        }
+
+        // changed bytes, until PY_DELTA_MIN_ZEROS unchanged bytes are found
+        size_t lits = 0, eq = 0;
+        while (i + lits < n && lits < 0xFFFF) {
+            eq = frame[i+lits] == prev[i+lits] ? eq + 1 : 0;
+            if (eq == PY_DELTA_MIN_ZEROS) {
+                lits -= eq - 1;
+                break;
+            }
+            lits++;
+        }
+
+        uint16_t run[2] = { (uint16_t)zeros, (uint16_t)lits };
+        memcpy(&out[o], run, sizeof(run));
+        o += sizeof(run);
+        for (size_t k=0; k<lits; k++)
+            out[o+k] = frame[i+k] ^ prev[i+k];
+        o += lits;
+        i += lits;
+    }
+
+    memcpy(prev, frame, n);
+    return o;
+}
+
+/*
+
+  Voxels delta encoding
+  ~~~~~~~~~~~~~~~~~~~~~
+
+  Between steps the voxel observation's window moves by a few nodes at most,
+  and only a few nodes change. The section starts with a PyVoxelsDeltaHeader
+  with the (integer) translation of the window since the previous message,
+  followed either by the whole grid (a keyframe), or by the voxels that
+  differ from the previous grid once translated, each as its u32 index in
+  the grid and its new value. Keyframes are sent for the first message of a
+  connection, after a soft reset, every voxel_obs_keyframe_interval messages
+  (if not 0), and whenever they're smaller than the delta. Must match the
+  decoder in mt_server.c.
+
+*/
+struct PyVoxelsDeltaHeader {
+    uint8_t keyframe;    // 1 if the whole grid follows
+    uint8_t voxel_bytes; // size of each voxel
+    int16_t shift[3];    // translation (x, y, z) of the window since the previous message
+    uint16_t dims[3];    // size (x, y, z) of the window
+    uint16_t reserved;
+    uint32_t n_changes;  // number of changed voxels that follow, if not a keyframe
+};
+
+// Upper bound of the size of the delta of a grid of n bytes
+#define PY_VOXELS_DELTA_MAX_BYTES(n) (sizeof(PyVoxelsDeltaHeader) + (n))
+
+/*
+  Encodes the voxel grid `grid` (of dims[0] x dims[1] x dims[2] voxels of
+  voxel_bytes bytes, x varying fastest) against `prev`, the grid of the
+  previous message, whose window was `shift` nodes behind. Writes the section
+  into `out`, that must hold PY_VOXELS_DELTA_MAX_BYTES, and returns its size.
+*/
+inline size_t encodePyVoxelsDelta(const uint8_t *grid, const uint8_t *prev, const int dims[3],
+        const int shift[3], int voxel_bytes, bool keyframe, uint8_t *out)
+{
+    size_t n = (size_t)dims[0] * dims[1] * dims[2] * voxel_bytes;
+    size_t entry_bytes = sizeof(uint32_t) + voxel_bytes;
+    size_t max_changes = n / entry_bytes; // more changes than these take more than a keyframe
+
+    PyVoxelsDeltaHeader h = {};
+    h.voxel_bytes = voxel_bytes;
+    for (int a=0; a<3; a++) {
+        h.dims[a] = dims[a];
+        h.shift[a] = shift[a];
+        // a larger translation than the window can't reuse any voxel
+        keyframe = keyframe || std::abs(shift[a]) >= dims[a];
+    }
+
+    uint8_t *o = out + sizeof(h);
+    uint32_t index = 0;
+    for (int z=0; z<dims[2] && !keyframe; z++)
+    for (int y=0; y<dims[1] && !keyframe; y++)
+    for (int x=0; x<dims[0] && !keyframe; x++, index++) {
+        // position of the voxel in the previous grid
+        int px = x + shift[0], py = y + shift[1], pz = z + shift[2];
+        const uint8_t *voxel = grid + (size_t)index * voxel_bytes;
+        if (px >= 0 && px < dims[0] && py >= 0 && py < dims[1] && pz >= 0 && pz < dims[2]) {
+            size_t prev_index = ((size_t)pz * dims[1] + py) * dims[0] + px;
+            if (memcmp(voxel, prev + prev_index * voxel_bytes, voxel_bytes) == 0)
+                continue;
+        }
+        if (h.n_changes == max_changes) {
+            keyframe = true;
+            break;
+        }
+        memcpy(o, &index, sizeof(index));
+        memcpy(o + sizeof(index), voxel, voxel_bytes);
+        o += entry_bytes;
+        h.n_changes++;
+    }
+
+    if (keyframe) {
+        h.keyframe = 1;
+        h.n_changes = 0;
+        memcpy(out + sizeof(h), grid, n);
+        o = out + sizeof(h) + n;
+    }
+    memcpy(out, &h, sizeof(h));
+    return o - out;
+}
+
+/*
+
+  Frame downsampling
+  ~~~~~~~~~~~~~~~~~~
+
+  If the observed frames are smaller than the screen (see the craftium_obs_w
+  and craftium_obs_h settings), the scene is rendered once at the screen's
+  resolution and each pixel of the frame is the average of the screen pixels
+  of its area.
+
+*/
+inline void downsamplePyFrame(const uint8_t *src, int SW, int SH, uint8_t *dst, int W, int H, int C)
+{
+    for (int y=0; y<H; y++) {
+        int y0 = y * SH / H;
+        int y1 = std::max((y + 1) * SH / H, y0 + 1);
+        for (int x=0; x<W; x++) {
+            int x0 = x * SW / W;
+            int x1 = std::max((x + 1) * SW / W, x0 + 1);
+            uint32_t n = (y1 - y0) * (x1 - x0);
+            for (int c=0; c<C; c++) {
+                uint32_t sum = 0;
+                for (int sy=y0; sy<y1; sy++)
+                    for (int sx=x0; sx<x1; sx++)
+                        sum += src[(sy * SW + sx) * C + c];
+                dst[(y * W + x) * C + c] = (sum + n / 2) / n;
+            }
+        }
+    }
+}
+
+/*
+
+  Node classes
+  ~~~~~~~~~~~~
+
+  The craftium_node_classes setting maps node names to the classes reported
+  in the segmentation maps, the lidar and the voxel_obs_classes voxel
+  observation (clamped to 255), as a comma separated list of `pattern=class`
+  entries, where '*' matches any sequence of characters in the pattern (e.g.,
+  "default:stone=1,default:*tree=2"). The first matching pattern gives the
+  class of a node, and nodes that don't match any pattern are of class 0. If
+  the setting is empty, nodes are reported by their content ID.
+
+*/
+inline bool matchPyNodePattern(const char *pattern, const char *name)
+{
+    if (*pattern == '\0')
+        return *name == '\0';
+    if (*pattern == '*')
+        return matchPyNodePattern(pattern + 1, name) || (*name && matchPyNodePattern(pattern, name + 1));
+    return *name == *pattern && matchPyNodePattern(pattern + 1, name + 1);
+}
+
+inline std::vector<std::pair<std::string, uint16_t>> parsePyNodeClasses(const std::string &setting)
+{
+    std::vector<std::pair<std::string, uint16_t>> classes;
+    std::stringstream ss(setting);
+    std::string entry;
+    while (std::getline(ss, entry, ',')) {
+        size_t eq = entry.rfind('=');
+        if (eq == std::string::npos || eq == 0)
+            continue;
+        classes.emplace_back(entry.substr(0, eq), (uint16_t)std::stoul(entry.substr(eq + 1)));
+    }
+    return classes;
+}
+
 /*
 
   Frameskip
@@ -31,6 +426,38 @@ inline int frameskip_count = 0;
 // The value of this variable is set in the Client::startPyConn
 // method according to the frameskip setting
 inline int frameskip = 0;
+// If true, the frames thrown away by frameskip aren't drawn (set in
+// Client::startPyConn from the render_skipped_frames setting)
+inline bool skip_frame_rendering = false;
+// Number of frames at the end of each step that are max-pooled into the
+// observation (1 if disabled), from the frameskip_max_pool setting
+inline int frameskip_pool = 1;
+// False if Python doesn't request any frame (set in Client::pyConnHandshake),
+// then the scene isn't rendered at all
+inline bool py_frame_requested = true;
+
+// Returns true if the frame drawn in the current iteration of the game loop
+// has to be rendered, as it's read by the next call to pyConnStep
+inline bool pyFrameObserved()
+{
+    if (!py_frame_requested)
+        return false;
+    if (!skip_frame_rendering || init_skip_count < 10)
+        return true;
+    return frameskip_count + frameskip_pool >= frameskip;
+}
+
+// Returns true if the next call to pyConnStep sends an observation to Python,
+// i.e., it's the last frame of the step. Mods can use it (through the
+// get_observation_due Lua function) to only compute observation-related data
+// when it's going to be consumed, instead of every frame. Only registered for
+// client mods, as it reads the state of the client thread
+inline bool pyObservationDue()
+{
+    if (init_skip_count < 10)
+        return false;
+    return frameskip_count + 1 >= frameskip;
+}
 
 /*
 
@@ -48,8 +475,63 @@ inline int virtual_mouse_y = 0;
   Synchronization between minetest's server and client
   ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+  Enabled by the sync_env_mode setting or by the lockstep mode. If the server
+  runs in the same process as the client (singleplayer), both threads meet at
+  an in-process barrier every step. Otherwise (a dedicated server with remote
+  clients) they're synchronized with named semaphores.
+
 */
 
+// Simulated seconds advanced by every iteration of the game loop and every
+// server step in lockstep mode, regardless of the wall clock (from the
+// lockstep_dtime setting). 0 if disabled. Only dtime is fixed: the server
+// doesn't wait for the client's packets, so the simulation isn't
+// deterministic.
+inline float lockstep_dtime = 0.0f;
+
+inline bool stepSyncEnabled()
+{
+    static const bool enabled = g_settings->getBool("sync_env_mode")
+        || g_settings->getFloat("lockstep_dtime") > 0.0f;
+    return enabled;
+}
+
+// Two-party barrier between the client's game loop and the server thread
+struct LocalStepBarrier {
+    std::mutex mutex;
+    std::condition_variable cv;
+    uint64_t generation = 0;
+    bool waiting = false;
+    bool released = false;
+
+    void arrive()
+    {
+        std::unique_lock<std::mutex> lock(mutex);
+        if (released)
+            return;
+        if (waiting) {
+            waiting = false;
+            generation++;
+            cv.notify_one();
+            return;
+        }
+        waiting = true;
+        const uint64_t gen = generation;
+        cv.wait(lock, [&] { return generation != gen || released; });
+    }
+
+    // Unblocks the waiting thread (if any) and disables the barrier, used
+    // when the server is stopped
+    void release()
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        released = true;
+        cv.notify_all();
+    }
+};
+inline LocalStepBarrier local_step_barrier;
+
+
 inline char *srv_sem_name_A;
 inline char *srv_sem_name_B;
 inline sem_t *srv_sem_A = nullptr;
@@ -111,8 +593,14 @@ inline int syncClientInit() {
     return 0;
 }
 
-inline void syncServerStep() {
-    if (!g_settings->getBool("sync_env_mode")) {
+// local_client is true if the client runs in the same process (singleplayer)
+inline void syncServerStep(bool local_client) {
+    if (!stepSyncEnabled()) {
+        return;
+    }
+
+    if (local_client) {
+        local_step_barrier.arrive();
         return;
     }
 
@@ -135,8 +623,14 @@ inline void syncServerStep() {
     // printf("=> SRV end\n");
 }
 
-inline void syncClientStep() {
-    if (!g_settings->getBool("sync_env_mode")) {
+// local_server is true if the server runs in the same process (singleplayer)
+inline void syncClientStep(bool local_server) {
+    if (!stepSyncEnabled()) {
+        return;
+    }
+
+    if (local_server) {
+        local_step_barrier.arrive();
         return;
     }
     // printf("> CLI start\n");
@@ -169,17 +663,31 @@ inline double g_reward = 0.0; /* Global variable of the reward value */
 inline bool g_reward_reset = false;  /* Whether to reset the reward value after one iteration */
 inline double g_reward_reset_value = 0.0; /* The value to reset the reward to */
 
+/* If true (frameskip_reward_sum setting), the rewards of the frames skipped
+   by frameskip are accumulated in g_skipped_reward and added to the reward
+   of the step, instead of only reporting the reward of the observed frame */
+inline bool frameskip_reward_sum = false;
+inline double g_skipped_reward = 0.0;
+
 inline bool g_termination = false; /* Global variable with the termination flag */
 inline bool g_soft_reset = false; /* Global variable with the termination flag */
 
-inline std::vector<uint32_t> g_voxel_data = std::vector<uint32_t>(1,0);
-inline std::vector<uint32_t> g_voxel_light_data = std::vector<uint32_t>(1,0);
-inline std::vector<uint32_t> g_voxel_param2_data = std::vector<uint32_t>(1,0);
-
 extern "C" {
 #include <lualib.h>
 }
 
+/* Returns the reward of the current frame, resetting it for the next frame
+   if it was set by `lua_set_reward_once` */
+inline double takeFrameReward()
+{
+    double reward = g_reward;
+    if (g_reward_reset) {
+        g_reward_reset = false;
+        g_reward = g_reward_reset_value;
+    }
+    return reward;
+}
+
 /* Implementation of the Lua functions to get/set the global reward value */
 inline static int lua_set_reward(lua_State *L) {
     double d = lua_tonumber(L, 1);  /* get argument */
@@ -226,39 +734,23 @@ inline static int lua_get_soft_reset(lua_State *L) {
     return 1; /* number of results */
 }
 
-inline static std::vector<uint32_t> lua_set_array_uint32_t(lua_State* L) {
-
-    // Get the returned table
-    std::vector<uint32_t> result;
-
-    if (!lua_istable(L, -1)) {
-        throw std::runtime_error("Expected table return when calling lua_set_array_uint32_t");
-    }
-
-    // Iterate through the table
-    lua_pushnil(L);  // First key
-    while (lua_next(L, -2) != 0) {
-        // Value is at -1, key at -2
-        result.push_back(lua_tointeger(L, -1));
-        lua_pop(L, 1);  // Remove value, keep key for next iteration
-    }
-
-    // Clean up the stack
-    lua_pop(L, 1);
-    return result;
+/* Whether the client sends an observation to Python in its next step (see pyObservationDue) */
+inline static int lua_get_observation_due(lua_State *L) {
+    lua_pushnumber(L, (int)pyObservationDue());
+    return 1; /* number of results */
 }
 
+/* The voxel observation is extracted by the client straight from the map
+   (see Client::packPyVoxels), so the Lua functions that used to provide it
+   are no-ops, only kept for compatibility with older mods */
 inline static int lua_set_voxel_data(lua_State* L) {
-	g_voxel_data = lua_set_array_uint32_t(L);
 	return 0;
 }
 
 inline static int lua_set_voxel_light_data(lua_State* L) {
-	g_voxel_light_data = lua_set_array_uint32_t(L);
 	return 0;
 }
 
 inline static int lua_set_voxel_param2_data(lua_State* L) {
-	g_voxel_param2_data = lua_set_array_uint32_t(L);
 	return 0;
 }
@@ -1037,7 +1037,11 @@ void Game::run()
 		// Calculate dtime =
 		//    m_rendering_engine->run() from this iteration
 		//  + Sleep time until the wanted FPS are reached
-		draw_times.limit(device, &dtime);
+		// In lockstep mode, dtime is fixed and the FPS aren't limited
+		if (lockstep_dtime > 0.0f)
+			dtime = lockstep_dtime;
+		else
+			draw_times.limit(device, &dtime);
 
 		framemarker.start();
 
@@ -4033,8 +4037,12 @@ void Game::updateFrame(ProfilerGraph *graph, RunStats *stats, f32 dtime,
 	/*
 		==================== Drawing begins ====================
 	*/
-	if (device->isWindowVisible())
+	// Frames thrown away by craftium's frameskip (or all of them, if Python
+	// doesn't observe frames) might not be drawn at all
+	if (device->isWindowVisible() && pyFrameObserved()) {
+		PyPhaseTimer timer(PY_TIMING_RENDER);
 		drawScene(graph, stats);
+	}
 	/*
 		==================== End scene ====================
 	*/
@@ -128,12 +128,31 @@ void set_default_settings()
 	settings->setDefault("enable_raytraced_culling", "true");
 	settings->setDefault("chat_weblink_color", "#8888FF");
 	settings->setDefault("craftium_port", "55555");
+	settings->setDefault("craftium_transport", "tcp");
+	settings->setDefault("craftium_socket_path", "");
+	settings->setDefault("craftium_socket_timeout", "0");
+	settings->setDefault("craftium_shm_name", "");
+	settings->setDefault("craftium_shm_slots", "2");
 	settings->setDefault("frameskip", "1");
+	settings->setDefault("render_skipped_frames", "true");
+	settings->setDefault("frameskip_max_pool", "1");
+	settings->setDefault("frameskip_reward_sum", "false");
+	settings->setDefault("lockstep_dtime", "0");
 	settings->setDefault("rgb_frames", "true");
+	settings->setDefault("craftium_obs_w", "0");
+	settings->setDefault("craftium_obs_h", "0");
+	settings->setDefault("craftium_depth_max_range", "64");
+	settings->setDefault("craftium_node_classes", "");
+	settings->setDefault("craftium_lidar_rays", "16");
+	settings->setDefault("craftium_lidar_fov", "360");
+	settings->setDefault("craftium_lidar_max_range", "32");
 	settings->setDefault("voxel_obs", "false");
 	settings->setDefault("voxel_obs_rx", "20");
 	settings->setDefault("voxel_obs_ry", "10");
 	settings->setDefault("voxel_obs_rz", "20");
+	settings->setDefault("voxel_obs_packed", "false");
+	settings->setDefault("voxel_obs_classes", "false");
+	settings->setDefault("voxel_obs_keyframe_interval", "100");
 
 	// Keymap
 #if USE_SDL2
@@ -126,18 +126,33 @@ void *ServerThread::run()
 
 	float dtime = 0.0f;
 
+	// In lockstep mode every step advances the simulation by a fixed dtime,
+	// and the server doesn't wait for the next step (the sync does). It only
+	// handles the packets that already arrived, without waiting for the
+	// client's ones, so lockstep fixes dtime but isn't deterministic
+	const float fixed_dtime = g_settings->getFloat("lockstep_dtime");
+	const bool lockstep = fixed_dtime > 0.0f;
+	const bool local_client = m_server->isSingleplayer();
+
 	while (!stopRequested()) {
 		framemarker.start();
 		ScopeProfiler spm(g_profiler, "Server::RunStep() (max)", SPT_MAX);
 
                 // Sync before computing t0, such that it does not affect the internal time (dtime)
-                syncServerStep();
+                syncServerStep(local_client);
 
 		u64 t0 = porting::getTimeUs();
 
 		const auto step_settings = m_server->getStepSettings();
 
 		try {
+			if (lockstep) {
+				m_server->AsyncRunStep(step_settings.pause ? 0.0f : fixed_dtime);
+				m_server->Receive(0.0f);
+				framemarker.end();
+				continue;
+			}
+
 			// see explanation inside
 			// (+1 ms, because we don't sleep more fine-grained)
 			if (dtime > step_settings.steplen + 0.001f)
@@ -612,6 +627,8 @@ void Server::stop()
 
 	// Stop threads (set run=false first so both start stopping)
 	m_thread->stop();
+	// The thread might be waiting for a client step that won't come
+	local_step_barrier.release();
 	m_thread->wait();
 
 	infostream<<"Server: Threads stopped"<<std::endl;
@@ -0,0 +1,21 @@
+import pytest
+
+from craftium import CraftiumEnv
+
+
+@pytest.fixture
+def make_env(tmp_path):
+    """Returns a function creating craftium environments that can be constructed (but not reset)
+    without a Luanti build, as MT is only launched on reset."""
+    minetest_dir = tmp_path / "luanti"
+    for name in ["builtin", "fonts", "locale", "textures", "bin", "client"]:
+        (minetest_dir / name).mkdir(parents=True)
+    env_dir = tmp_path / "env"
+    env_dir.mkdir()
+
+    def make_env(**kwargs):
+        kwargs = dict(obs_width=8, obs_height=6, enable_voxel_obs=True, voxel_obs_rx=1, voxel_obs_ry=1,
+                      voxel_obs_rz=1, lidar_rays=4, mt_listen_timeout=5000,
+                      _voxel_obs_available=True) | kwargs
+        return CraftiumEnv(env_dir, run_dir_prefix=tmp_path, minetest_dir=str(minetest_dir), **kwargs)
+    return make_env
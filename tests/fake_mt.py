@@ -0,0 +1,144 @@
+# A fake MT peer: it writes the messages that the client sends to python (see the protocol
+# description in mt_server.c) into one end of a socket pair, the other end being read by mt_server.
+import itertools
+import socket
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+MSG_MAGIC = 0x54465243  # "CRFT"
+MSG_VERSION = 1
+MSG_MAX_SECTIONS = 16
+
+SECTION_FRAME = 0
+SECTION_FRAME_DELTA = 3
+SECTION_VOXELS_DELTA = 10
+
+
+def socket_pair():
+    """Returns the (python, MT) ends of a connected socket pair."""
+    return socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+
+def encode_message(step: int, sections: dict[int, bytes], sizes: Optional[dict[int, int]] = None) -> bytes:
+    """Encodes the message of `step` holding the given sections (as index: payload). The size
+    of a section in the header can be overridden with `sizes`, to send a corrupted message."""
+    sizes = sizes or {}
+    header_sizes = [0] * MSG_MAX_SECTIONS
+    flags = 0
+    for i, payload in sections.items():
+        header_sizes[i] = sizes.get(i, len(payload))
+        flags |= 1 << i
+    header = struct.pack(f"<IHHQ{MSG_MAX_SECTIONS}I", MSG_MAGIC, MSG_VERSION, flags, step, *header_sizes)
+    return header + b"".join(sections[i] for i in sorted(sections))
+
+
+def send_message(sock: socket.socket, step: int, sections: dict[int, bytes], sizes: Optional[dict[int, int]] = None):
+    sock.sendall(encode_message(step, sections, sizes))
+
+
+# Number of unchanged bytes that end a literal run
+DELTA_MIN_ZEROS = 8
+
+
+def encode_frame_delta(frame: bytes, prev: bytes) -> bytes:
+    """Python port of encodePyFrameDelta (src/client/craftium.h)."""
+    n = len(frame)
+    out = bytearray()
+    i = 0
+    while i < n:
+        # unchanged bytes
+        zeros = 0
+        while i < n and zeros < 0xFFFF and frame[i] == prev[i]:
+            zeros += 1
+            i += 1
+
+        # changed bytes, until DELTA_MIN_ZEROS unchanged bytes are found
+        lits = eq = 0
+        while i + lits < n and lits < 0xFFFF:
+            eq = eq + 1 if frame[i+lits] == prev[i+lits] else 0
+            if eq == DELTA_MIN_ZEROS:
+                lits -= eq - 1
+                break
+            lits += 1
+
+        out += struct.pack("<HH", zeros, lits)
+        out += bytes(frame[i+k] ^ prev[i+k] for k in range(lits))
+        i += lits
+    return bytes(out)
+
+
+# Header of the voxels delta section (msg_voxels_delta_t in mt_server.c)
+VOXELS_DELTA_HEADER = struct.Struct("<BB3h3HHI")
+
+
+def encode_voxels_delta(grid: bytes, prev: bytes, dims: tuple[int, int, int], shift: tuple[int, int, int],
+                        voxel_bytes: int, keyframe: bool = False) -> bytes:
+    """Python port of encodePyVoxelsDelta (src/client/craftium.h)."""
+    n = dims[0] * dims[1] * dims[2] * voxel_bytes
+    max_changes = n // (4 + voxel_bytes)
+    # a larger translation than the window can't reuse any voxel
+    keyframe = keyframe or any(abs(s) >= d for s, d in zip(shift, dims))
+
+    changes = bytearray()
+    n_changes = 0
+    positions = itertools.product(range(dims[2]), range(dims[1]), range(dims[0])) if not keyframe else []
+    for index, (z, y, x) in enumerate(positions):
+        # position of the voxel in the previous grid
+        px, py, pz = x + shift[0], y + shift[1], z + shift[2]
+        voxel = grid[index*voxel_bytes:(index+1)*voxel_bytes]
+        if 0 <= px < dims[0] and 0 <= py < dims[1] and 0 <= pz < dims[2]:
+            prev_index = (pz * dims[1] + py) * dims[0] + px
+            if voxel == prev[prev_index*voxel_bytes:(prev_index+1)*voxel_bytes]:
+                continue
+        if n_changes == max_changes:
+            keyframe = True
+            break
+        changes += struct.pack("<I", index) + voxel
+        n_changes += 1
+
+    if keyframe:
+        return VOXELS_DELTA_HEADER.pack(1, voxel_bytes, *shift, *dims, 0, 0) + grid
+    return VOXELS_DELTA_HEADER.pack(0, voxel_bytes, *shift, *dims, 0, n_changes) + bytes(changes)
+
+
+def serve_channel(chan, n_steps: int):
+    """Plays the role of MT for the `MtChannel` `chan`: connects to it, answers the handshake offering
+    every section, and then sends `n_steps` messages, each one after receiving an action. Every byte
+    of the i-th message (but the termination flag) is `i + 1`. Runs until `n_steps` actions were
+    received, so it's meant to be run in a thread while python opens the connection and steps."""
+    # the channel only listens once python opens the connection
+    for _ in range(100):
+        try:
+            sock = socket.create_connection(("127.0.0.1", chan.port))
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    sock.sendall(struct.pack("<IHH", MSG_MAGIC, MSG_VERSION, 0xFFFF))
+    _magic, _version, sections = struct.unpack("<IHH", recv_exact(sock, 8))
+    n_actions, = struct.unpack("<H", recv_exact(sock, 2))
+    recv_exact(sock, 8 * n_actions)
+    action_bytes = 2 if n_actions > 0 else 27
+
+    for step in range(n_steps):
+        recv_exact(sock, action_bytes)
+        frame, voxels, state = chan.make_buffers()
+        extra = chan.make_extra_buffers()
+        for buffer in [frame, voxels, state, *extra.values()]:
+            buffer.view(np.uint8)[...] = step + 1
+        state["termination"] = 0
+        buffers = chan._section_buffers(frame, voxels, state, extra)
+        send_message(sock, step, {i: b.tobytes() for i, b in enumerate(buffers) if b is not None and b.nbytes > 0})
+    sock.close()
+
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        buf += chunk
+    return bytes(buf)
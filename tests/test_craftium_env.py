@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.mark.parametrize("shm_slots", [1, 2])
+def test_pipelined_shm_slots(make_env, shm_slots):
+    kwargs = dict(transport="shm", shm_slots=shm_slots, pipelined=True)
+    if shm_slots < 2:
+        with pytest.raises(AssertionError, match="at least two slots"):
+            make_env(**kwargs)
+    else:
+        make_env(**kwargs).mt_chann.close()
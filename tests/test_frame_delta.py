@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import mt_server
+
+from fake_mt import SECTION_FRAME_DELTA, encode_frame_delta, send_message, socket_pair
+
+# larger than the longest run (0xFFFF bytes), to cover runs split in several
+SHAPE = (120, 200, 3)
+N = int(np.prod(SHAPE))
+MAX_DELTA_BYTES = N + 4 * (N // 0xFFFF + 2)
+
+
+@pytest.fixture
+def conn():
+    py_sock, mt_sock = socket_pair()
+    yield py_sock, mt_sock
+    py_sock.close()
+    mt_sock.close()
+
+
+def frames(n, seed=0):
+    """A random frame followed by `n - 1` slightly modified ones."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, SHAPE, dtype=np.uint8)
+    yield frame.copy()
+    for _ in range(n - 1):
+        y, x = rng.integers(0, SHAPE[0] - 10), rng.integers(0, SHAPE[1] - 10)
+        frame[y:y+10, x:x+10] = rng.integers(0, 256, (10, 10, 3), dtype=np.uint8)
+        frame[rng.integers(0, SHAPE[0]), rng.integers(0, SHAPE[1])] ^= 1
+        yield frame.copy()
+
+
+def recv_frame(py_sock, step, prev_frame, scratch=None):
+    frame = np.empty(SHAPE, dtype=np.uint8)
+    buffers = [None] * SECTION_FRAME_DELTA + [frame]
+    mt_server.server_recv_into(py_sock.fileno(), step, buffers, prev_frame, None, scratch)
+    return frame
+
+
+# the scratch buffer is optional, and sections that don't fit in it are received into a temporary one
+@pytest.mark.parametrize("scratch_bytes", [None, 16, MAX_DELTA_BYTES])
+def test_round_trip(conn, scratch_bytes):
+    py_sock, mt_sock = conn
+    scratch = None if scratch_bytes is None else np.empty(scratch_bytes, dtype=np.uint8)
+    mt_prev = np.zeros(SHAPE, dtype=np.uint8)
+    py_prev = np.zeros(SHAPE, dtype=np.uint8)
+
+    # an unchanged and a fully changed frame are the extreme cases of the runs
+    sequence = list(frames(5)) + [np.zeros(SHAPE, dtype=np.uint8)] * 2 + [np.full(SHAPE, 255, dtype=np.uint8)]
+    for step, frame in enumerate(sequence):
+        delta = encode_frame_delta(frame.tobytes(), mt_prev.tobytes())
+        mt_prev = frame
+        send_message(mt_sock, step, {SECTION_FRAME_DELTA: delta})
+
+        received = recv_frame(py_sock, step, py_prev, scratch)
+        np.testing.assert_array_equal(received, frame)
+        # the previous frame is updated in place, for the next message
+        np.testing.assert_array_equal(py_prev, frame)
+
+
+def test_oversized_section(conn):
+    py_sock, mt_sock = conn
+    delta = bytes(MAX_DELTA_BYTES + 1)
+    send_message(mt_sock, 0, {SECTION_FRAME_DELTA: delta})
+
+    with pytest.raises(ConnectionError, match="size of a received section"):
+        recv_frame(py_sock, 0, np.zeros(SHAPE, dtype=np.uint8))
+
+
+def test_truncated_run(conn):
+    py_sock, mt_sock = conn
+    prev, frame = frames(2)
+    delta = encode_frame_delta(frame.tobytes(), prev.tobytes())
+    # the section ends in the middle of its last run
+    send_message(mt_sock, 0, {SECTION_FRAME_DELTA: delta[:-1]})
+
+    with pytest.raises(ConnectionError, match="size of a received section"):
+        recv_frame(py_sock, 0, prev)
+
+
+def test_run_past_the_frame(conn):
+    py_sock, mt_sock = conn
+    prev, frame = frames(2)
+    delta = encode_frame_delta(frame.tobytes(), prev.tobytes())
+    # one more literal byte than the frame has
+    send_message(mt_sock, 0, {SECTION_FRAME_DELTA: delta + b"\x00\x00\x01\x00\xff"})
+
+    with pytest.raises(ConnectionError, match="size of a received section"):
+        recv_frame(py_sock, 0, prev)
@@ -0,0 +1,43 @@
+import struct
+
+import numpy as np
+import pytest
+
+from craftium.mt_channel import ACTION_ENTRY_DTYPE, ACTION_KILL, ACTION_NODE_VOCABULARY, ACTION_NOP, MtChannel
+
+from fake_mt import socket_pair
+
+TABLE_SIZE = 3
+
+
+@pytest.fixture
+def indexed_chann():
+    """A channel with a registered action table, whose connection is one end of a socket pair."""
+    chann = MtChannel(8, 6)
+    chann.set_action_table(np.zeros(TABLE_SIZE, dtype=ACTION_ENTRY_DTYPE))
+    py_sock, mt_sock = socket_pair()
+    chann.connfd = py_sock.fileno()
+    yield chann, mt_sock
+    chann.connfd = None  # owned by py_sock
+    chann.close()
+    py_sock.close()
+    mt_sock.close()
+
+
+@pytest.mark.parametrize("index", [0, TABLE_SIZE - 1, ACTION_NODE_VOCABULARY, ACTION_NOP, ACTION_KILL])
+def test_send_index(indexed_chann, index):
+    chann, mt_sock = indexed_chann
+    chann.send_index(index)
+    assert mt_sock.recv(16) == struct.pack("<H", index)
+
+
+@pytest.mark.parametrize("index", [-1, TABLE_SIZE, ACTION_NODE_VOCABULARY - 1, ACTION_KILL + 1])
+def test_send_invalid_index(indexed_chann, index):
+    chann, mt_sock = indexed_chann
+    with pytest.raises(ValueError, match="Invalid action index"):
+        chann.send_index(index)
+
+    # nothing was sent
+    mt_sock.setblocking(False)
+    with pytest.raises(BlockingIOError):
+        mt_sock.recv(16)
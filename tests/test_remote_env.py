@@ -0,0 +1,126 @@
+import threading
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium.spaces import Box, Discrete
+from gymnasium.vector import SyncVectorEnv
+
+from craftium import EnvServer, RemoteVectorEnv
+
+ENVS_PER_SERVER = [2, 3]
+FAILING_ACTION = 99  # makes `CounterEnv.step` raise an exception
+
+
+class CounterEnv(gym.Env):
+    """Its observation is filled with a counter that starts at a random value and grows with the
+    actions. Episodes are terminated if the counter reaches 20, or truncated after 6 steps."""
+    observation_space = Box(0, 255, (4, 5, 3), dtype=np.uint8)
+    action_space = Discrete(4)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.t = 0
+        self.counter = int(self.np_random.integers(0, 10))
+        return self._obs(), {"t": self.t}
+
+    def step(self, action):
+        if action == FAILING_ACTION:
+            raise ValueError("Failing action")
+        self.t += 1
+        self.counter += int(action)
+        terminated = self.counter >= 20
+        truncated = self.t >= 6
+        info = {"t": self.t}
+        if self.t % 2 == 0:  # entries holding a dict, only in some steps
+            info["stats"] = {"counter": self.counter, "half": self.counter / 2}
+        return self._obs(), float(action), terminated, truncated, info
+
+    def _obs(self):
+        return np.full(self.observation_space.shape, self.counter, dtype=np.uint8)
+
+
+def make_envs(n):
+    return SyncVectorEnv([CounterEnv for _ in range(n)])
+
+
+@pytest.fixture
+def remote_envs():
+    servers = [EnvServer(make_envs(n)) for n in ENVS_PER_SERVER]
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+    for thread in threads:
+        thread.start()
+
+    envs = RemoteVectorEnv([f"127.0.0.1:{s.port}" for s in servers])
+    yield envs
+    envs.close()
+    for thread in threads:
+        thread.join(timeout=10)
+        assert not thread.is_alive(), "The server wasn't closed"
+
+
+def assert_same_infos(remote, local):
+    np.testing.assert_array_equal(remote["t"], local["t"])
+    np.testing.assert_array_equal(remote["_t"], local["_t"])
+    mask = local.get("_stats", np.zeros(len(local["t"]), dtype=bool))
+    np.testing.assert_array_equal(remote.get("_stats", np.zeros_like(mask)), mask)
+    for i in np.flatnonzero(mask):
+        assert remote["stats"][i] == local["stats"][i]
+    # the final observations are only received for the autoreset environments
+    mask = local.get("_final_observation", np.zeros(len(local["t"]), dtype=bool))
+    np.testing.assert_array_equal(remote.get("_final_observation", np.zeros_like(mask)), mask)
+    for i in np.flatnonzero(mask):
+        np.testing.assert_array_equal(remote["final_observation"][i], local["final_observation"][i])
+
+
+def test_spaces(remote_envs):
+    assert remote_envs.num_envs == sum(ENVS_PER_SERVER)
+    assert remote_envs.single_observation_space == CounterEnv.observation_space
+    assert remote_envs.single_action_space == CounterEnv.action_space
+
+
+def test_matches_local_envs(remote_envs):
+    local_envs = make_envs(sum(ENVS_PER_SERVER))
+    rng = np.random.default_rng(0)
+
+    obs, infos = remote_envs.reset(seed=42)
+    local_obs, local_infos = local_envs.reset(seed=42)
+    np.testing.assert_array_equal(obs, local_obs)
+    assert_same_infos(infos, local_infos)
+
+    autoreset = False
+    for _ in range(20):
+        actions = rng.integers(0, 4, local_envs.num_envs)
+        obs, rewards, terminations, truncations, infos = remote_envs.step(actions)
+        local_obs, local_rewards, local_terminations, local_truncations, local_infos = local_envs.step(actions)
+
+        np.testing.assert_array_equal(obs, local_obs)
+        np.testing.assert_array_equal(rewards, local_rewards)
+        np.testing.assert_array_equal(terminations, local_terminations)
+        np.testing.assert_array_equal(truncations, local_truncations)
+        assert_same_infos(infos, local_infos)
+        autoreset = autoreset or "_final_observation" in local_infos
+
+    local_envs.close()
+    assert autoreset, "No environment was autoreset"
+
+
+def test_error_in_one_server(remote_envs):
+    local_envs = make_envs(sum(ENVS_PER_SERVER))
+    remote_envs.reset(seed=0)
+
+    # only the first server fails
+    actions = np.zeros(remote_envs.num_envs, dtype=np.int64)
+    actions[0] = FAILING_ACTION
+    with pytest.raises(RuntimeError, match="Failing action"):
+        remote_envs.step(actions)
+
+    # the response of the other server isn't taken as the response of the next requests
+    obs, _ = remote_envs.reset(seed=1)
+    local_obs, _ = local_envs.reset(seed=1)
+    np.testing.assert_array_equal(obs, local_obs)
+    obs, rewards, _, _, _ = remote_envs.step(np.ones(remote_envs.num_envs, dtype=np.int64))
+    local_obs, local_rewards, _, _, _ = local_envs.step(np.ones(remote_envs.num_envs, dtype=np.int64))
+    np.testing.assert_array_equal(obs, local_obs)
+    np.testing.assert_array_equal(rewards, local_rewards)
+    local_envs.close()
@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+import pytest
+
+from craftium import BatchedVectorEnv
+
+from fake_mt import serve_channel
+
+NUM_ENVS = 2
+
+
+def connect(envs, n_steps):
+    """Opens the connection of every sub-environment with a fake MT sending `n_steps` messages."""
+    peers = []
+    for env in envs.craftium_envs:
+        peer = threading.Thread(target=serve_channel, args=(env.mt_chann, n_steps), daemon=True)
+        peer.start()
+        env.mt_chann.open_conn()
+        peers.append(peer)
+    return peers
+
+
+def test_batched_infos_outlive_the_step(make_env):
+    envs = BatchedVectorEnv([make_env for _ in range(NUM_ENVS)])
+    peers = connect(envs, 2)
+
+    actions = envs.action_space.sample()
+    _, _, _, _, first = envs.step(actions)
+    _, _, _, _, second = envs.step(actions)
+
+    # the infos of the first step must still hold its values, not the ones of the second step
+    for key in ["voxel_obs", "lidar_distance", "lidar_nodes"]:
+        for i in range(NUM_ENVS):
+            assert np.all(first[key][i].view(np.uint8) == 1), key
+            assert np.all(second[key][i].view(np.uint8) == 2), key
+
+    for peer in peers:
+        peer.join(timeout=10)
+    for env in envs.craftium_envs:
+        env.mt_chann.close_conn()
+    envs.close()
+
+
+@pytest.mark.parametrize("kwargs", [dict(voxel_obs_delta=True), dict(pipelined=True)])
+def test_batched_unsupported_envs(make_env, kwargs):
+    with pytest.raises(AssertionError, match=next(iter(kwargs))):
+        BatchedVectorEnv([lambda: make_env(**kwargs) for _ in range(NUM_ENVS)])
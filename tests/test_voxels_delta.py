@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+import mt_server
+
+from fake_mt import (SECTION_VOXELS_DELTA, VOXELS_DELTA_HEADER, encode_voxels_delta, send_message,
+                     socket_pair)
+
+DIMS = (9, 7, 5)  # x, y, z
+VOXEL_BYTES = 3
+SHAPE = (DIMS[2], DIMS[1], DIMS[0], VOXEL_BYTES)
+
+
+@pytest.fixture
+def conn():
+    py_sock, mt_sock = socket_pair()
+    yield py_sock, mt_sock
+    py_sock.close()
+    mt_sock.close()
+
+
+class World:
+    """A random world observed through a window of DIMS voxels, that can be moved."""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.voxels = self.rng.integers(0, 256, (40, 40, 40, VOXEL_BYTES), dtype=np.uint8)
+        self.origin = np.array([10, 10, 10])  # x, y, z
+
+    def window(self):
+        x, y, z = self.origin
+        return self.voxels[z:z+DIMS[2], y:y+DIMS[1], x:x+DIMS[0]].copy()
+
+    def change(self, n):
+        """Changes `n` random voxels in the window."""
+        for _ in range(n):
+            x, y, z = self.origin + [self.rng.integers(0, d) for d in DIMS]
+            self.voxels[z, y, x] = self.rng.integers(0, 256, VOXEL_BYTES, dtype=np.uint8)
+
+
+def recv_voxels(py_sock, step, prev_voxels, scratch=None):
+    voxels = np.empty(SHAPE, dtype=np.uint8)
+    buffers = [None] * SECTION_VOXELS_DELTA + [voxels]
+    mt_server.server_recv_into(py_sock.fileno(), step, buffers, None, prev_voxels, scratch)
+    return voxels
+
+
+# the scratch buffer is optional, and holds the section and the copy of the grid to translate it
+# if they fit, or only the copy of the grid if the section doesn't fit
+@pytest.mark.parametrize("scratch_bytes", [None, 8, int(np.prod(SHAPE)),
+                                           VOXELS_DELTA_HEADER.size + 2 * int(np.prod(SHAPE))])
+def test_round_trip(conn, scratch_bytes):
+    py_sock, mt_sock = conn
+    scratch = None if scratch_bytes is None else np.empty(scratch_bytes, dtype=np.uint8)
+    world = World()
+    py_prev = np.zeros(SHAPE, dtype=np.uint8)
+
+    # (shift of the window, number of changed voxels) of each step: the first message, large
+    # shifts and many changes are sent as keyframes
+    moves = [((0, 0, 0), 0), ((0, 0, 0), 3), ((1, 0, 0), 0), ((-2, 1, 0), 5), ((0, -1, 3), 2),
+             ((20, 0, 0), 0), ((0, 0, 0), 200), ((1, 1, 1), 1)]
+    mt_prev = world.window()
+    for step, (shift, n_changes) in enumerate(moves):
+        world.origin += shift
+        world.change(n_changes)
+        grid = world.window()
+        delta = encode_voxels_delta(grid.tobytes(), mt_prev.tobytes(), DIMS, shift, VOXEL_BYTES,
+                                    keyframe=step == 0)
+        mt_prev = grid
+        send_message(mt_sock, step, {SECTION_VOXELS_DELTA: delta})
+
+        received = recv_voxels(py_sock, step, py_prev, scratch)
+        np.testing.assert_array_equal(received, grid)
+        # the previous voxels are updated in place, for the next message
+        np.testing.assert_array_equal(py_prev, grid)
+
+
+def test_delta_is_smaller_than_keyframe():
+    world = World()
+    prev = world.window()
+    world.origin += (1, 0, 0)
+    world.change(2)
+    delta = encode_voxels_delta(world.window().tobytes(), prev.tobytes(), DIMS, (1, 0, 0), VOXEL_BYTES)
+
+    assert VOXELS_DELTA_HEADER.unpack_from(delta)[0] == 0  # not a keyframe
+    assert len(delta) < VOXELS_DELTA_HEADER.size + prev.nbytes
+
+
+def corrupted_sections():
+    """Voxels delta sections with sizes that don't match their contents, as (section, size in
+    the header)."""
+    world = World()
+    prev = world.window()
+    world.change(4)
+    delta = encode_voxels_delta(world.window().tobytes(), prev.tobytes(), DIMS, (0, 0, 0), VOXEL_BYTES)
+    keyframe = encode_voxels_delta(prev.tobytes(), prev.tobytes(), DIMS, (0, 0, 0), VOXEL_BYTES, keyframe=True)
+    n = prev.nbytes
+    header = VOXELS_DELTA_HEADER.size
+
+    return {
+        "shorter than its header": (delta[:header - 1], None),
+        "larger than a keyframe": (keyframe + b"\x00", None),
+        "truncated changes": (delta[:-1], None),
+        "truncated keyframe": (keyframe[:-1], None),
+        "wrong dims": (VOXELS_DELTA_HEADER.pack(1, VOXEL_BYTES, 0, 0, 0, DIMS[0] - 1, DIMS[1], DIMS[2], 0, 0)
+                       + bytes(n), None),
+        "index out of the grid": (VOXELS_DELTA_HEADER.pack(0, VOXEL_BYTES, 0, 0, 0, *DIMS, 0, 1)
+                                  + (n // VOXEL_BYTES).to_bytes(4, "little") + bytes(VOXEL_BYTES), None),
+        "section larger than its header size": (delta, len(delta) - 1),
+    }
+
+
+@pytest.mark.parametrize("name", corrupted_sections().keys())
+def test_corrupted_section(conn, name):
+    py_sock, mt_sock = conn
+    section, size = corrupted_sections()[name]
+    sizes = {SECTION_VOXELS_DELTA: size} if size is not None else None
+    send_message(mt_sock, 0, {SECTION_VOXELS_DELTA: section}, sizes)
+
+    with pytest.raises(ConnectionError, match="size of a received section"):
+        recv_voxels(py_sock, 0, np.zeros(SHAPE, dtype=np.uint8))